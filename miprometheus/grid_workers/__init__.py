@@ -1,11 +1,10 @@
-# Grid workers.
-from .grid_worker import GridWorker
-from .grid_trainer_cpu import GridTrainerCPU
-from .grid_trainer_gpu import GridTrainerGPU
-from .grid_tester_cpu import GridTesterCPU
-from .grid_tester_gpu import GridTesterGPU
-from .grid_analyzer import GridAnalyzer
+from miprometheus.utils.lazy_import import lazy_package
 
-
-__all__ = ['GridWorker', 'GridTrainerCPU', 'GridTrainerGPU',
-           'GridTesterCPU', 'GridTesterGPU', 'GridAnalyzer']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'GridWorker': '.grid_worker',
+                                                'GridTrainerCPU': '.grid_trainer_cpu',
+                                                'GridTrainerGPU': '.grid_trainer_gpu',
+                                                'GridTesterCPU': '.grid_tester_cpu',
+                                                'GridTesterGPU': '.grid_tester_gpu',
+                                                'GridAnalyzer': '.grid_analyzer'})
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+device_scheduler.py:
+
+    - Contains the definition of the :py:class:`DeviceSlotScheduler`, assigning the experiments run by the GPU \
+    grid workers to devices.
+    - Every device offers one or more slots (depending on its memory and the memory budget of a single run). \
+    An experiment takes a free slot, is run with ``CUDA_VISIBLE_DEVICES`` set to the device of the slot and \
+    returns the slot when it finishes.
+    - The scheduler does not depend on CUDA: the devices (and their memory) can be simulated, e.g. on CPU-only \
+    machines.
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import os
+import queue
+import logging
+import contextlib
+
+
+def get_visible_devices():
+    """
+    Returns the identifiers and total memory of the CUDA devices visible to the current process.
+
+    .. note::
+
+        If ``CUDA_VISIBLE_DEVICES`` is already set, the identifiers are taken from it, so the experiments \
+        are restricted to the same subset of devices.
+
+    :return: List of tuples (device identifier (str), total memory in MiB).
+
+    """
+    import torch
+
+    memories = [torch.cuda.get_device_properties(i).total_memory // 2**20 for i in range(torch.cuda.device_count())]
+
+    visible = os.environ.get('CUDA_VISIBLE_DEVICES')
+    if visible:
+        ids = [device.strip() for device in visible.split(',') if device.strip() != '']
+    else:
+        ids = [str(i) for i in range(len(memories))]
+
+    return list(zip(ids, memories))
+
+
+def compute_device_slots(devices, memory_per_run=-1, max_slots=-1):
+    """
+    Computes the list of device slots.
+
+    The slots are interleaved (first slots of all devices, then the second ones etc.), so that limiting \
+    their number spreads the experiments over all devices.
+
+    :param devices: List of tuples (device identifier, total memory in MiB).
+    :type devices: list
+
+    :param memory_per_run: Memory budget (in MiB) of a single experiment. If <= 0, one experiment per device.
+    :type memory_per_run: int
+
+    :param max_slots: Maximal number of slots (i.e. concurrent experiments). If <= 0, not limited.
+    :type max_slots: int
+
+    :return: List of device identifiers, one per slot.
+
+    """
+    if memory_per_run > 0:
+        # Every device holds at least one run, even if its memory is lower than the budget.
+        slots_per_device = [max(1, memory // memory_per_run) for _, memory in devices]
+    else:
+        slots_per_device = [1 for _ in devices]
+
+    slots = []
+    for i in range(max(slots_per_device, default=0)):
+        slots.extend(device for (device, _), num_slots in zip(devices, slots_per_device) if i < num_slots)
+
+    if max_slots > 0:
+        slots = slots[:max_slots]
+
+    return slots
+
+
+class DeviceSlotScheduler(object):
+    """
+    Thread-safe scheduler assigning the experiments to free device slots.
+
+    >>> scheduler = DeviceSlotScheduler(compute_device_slots([('0', 16384), ('1', 16384)], memory_per_run=8000))
+    >>> with scheduler.slot() as device:
+    >>>     subprocess.run(command, env=dict(os.environ, **scheduler.get_environment(device)))
+
+    """
+
+    def __init__(self, slots, logger=None):
+        """
+        Initializes the scheduler.
+
+        :param slots: List of device identifiers, one per slot (e.g. returned by :py:func:`compute_device_slots`).
+        :type slots: list
+
+        :param logger: Logger used for reporting (DEFAULT: module logger).
+
+        """
+        self.logger = logger if logger is not None else logging.getLogger('DeviceSlotScheduler')
+        self.slots = list(slots)
+
+        # Queue of free slots.
+        self.free_slots = queue.Queue()
+        for device in self.slots:
+            self.free_slots.put(device)
+
+    def __len__(self):
+        """
+        Returns the total number of slots, i.e. the maximal number of concurrent experiments.
+        """
+        return len(self.slots)
+
+    def acquire(self, timeout=None):
+        """
+        Takes a free slot, blocking until one becomes available.
+
+        :param timeout: Maximal waiting time in seconds (DEFAULT: None, i.e. wait infinitely).
+
+        :return: Identifier of the device of the slot.
+
+        """
+        device = self.free_slots.get(timeout=timeout)
+        self.logger.debug('Acquired a slot on device {}'.format(device))
+        return device
+
+    def release(self, device):
+        """
+        Returns the slot on the given device.
+
+        :param device: Identifier of the device (returned by :py:func:`acquire`).
+
+        """
+        self.logger.debug('Released a slot on device {}'.format(device))
+        self.free_slots.put(device)
+
+    @contextlib.contextmanager
+    def slot(self):
+        """
+        Context manager acquiring a free slot and releasing it at exit (also when an exception occurs).
+        """
+        device = self.acquire()
+        try:
+            yield device
+        finally:
+            self.release(device)
+
+    @staticmethod
+    def get_environment(device):
+        """
+        Returns the environment variables restricting a subprocess to the given device.
+
+        :param device: Identifier of the device.
+
+        :return: Dictionary of environment variables.
+
+        """
+        return {'CUDA_VISIBLE_DEVICES': str(device)}
+
+
+if __name__ == '__main__':
+    """ Simulation of the scheduling of the experiments on devices - does not require CUDA."""
+    import time
+    import random
+    import threading
+    from multiprocessing.pool import ThreadPool
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Simulated devices: two 16GB and one 8GB GPU, 5GB per experiment.
+    simulated_devices = [('0', 16384), ('1', 16384), ('2', 8192)]
+    scheduler = DeviceSlotScheduler(compute_device_slots(simulated_devices, memory_per_run=5000))
+    print('Slots: {}'.format(scheduler.slots))
+
+    lock = threading.Lock()
+    running = {device: 0 for device, _ in simulated_devices}
+    capacity = {device: scheduler.slots.count(device) for device, _ in simulated_devices}
+
+    def experiment(index):
+        with scheduler.slot() as device:
+            with lock:
+                running[device] += 1
+                # Verify that the device is not oversubscribed.
+                assert running[device] <= capacity[device]
+                print('Experiment {:>2} on device {} (running: {})'.format(index, device, dict(running)))
+            time.sleep(random.uniform(0.01, 0.1))
+            with lock:
+                running[device] -= 1
+
+    with ThreadPool(processes=len(scheduler)) as pool:
+        pool.map(experiment, range(20))
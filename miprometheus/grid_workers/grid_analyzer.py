@@ -20,6 +20,11 @@ grid_analyzer.py:
 
     - This script post-processes the output of the ``GridTrainers`` and ``GridTesters``. \
     It gathers the test results into one `.csv` file.
+    - Optionally, the results (and the statistics collected during training and validation by all experiments) \
+    are also stored in typed columnar files (NumPy structured arrays or Parquet tables).
+    - The experiments are analyzed in parallel processes. The results are cached (in \
+    `grid_analysis_cache.json` in the experiments directory), so only new (or modified) experiments are \
+    analyzed when the analyzer is run again.
 
 
 """
@@ -27,11 +32,17 @@ __author__ = "Tomasz Kornuta & Vincent Marois"
 
 import os
 import csv
+import json
 import yaml
 import torch
 import logging
 from datetime import datetime
+from collections import OrderedDict
+from multiprocessing import Pool
 
+from miprometheus.models.model import Model
+from miprometheus.utils.columnar_export import check_columnar_format, to_python_value, to_structured_array, \
+    save_columnar, load_columnar, concatenate_columnar
 from miprometheus.grid_workers.grid_worker import GridWorker
 
 
@@ -61,6 +72,38 @@ class GridAnalyzer(GridWorker):
         # call base constructor
         super(GridAnalyzer, self).__init__(name=name, use_gpu=False)
 
+        self.parser.add_argument('--max_concur_runs',
+                                 dest='max_concurrent_runs',
+                                 type=int,
+                                 default=-1,
+                                 help='Value limiting the number of experiments analyzed concurrently.'
+                                      ' (DEFAULT=-1, meaning that it will be set to the number of CPUs)')
+
+        self.parser.add_argument('--columnar',
+                                 dest='columnar',
+                                 type=str,
+                                 choices=['npy', 'parquet'],
+                                 default=None,
+                                 help='If present, stores the results also in a typed columnar file (NumPy structured '
+                                      'array or Parquet table) and concatenates the columnar training and validation '
+                                      'statistics of all experiments (exported by the trainers with --columnar).'
+                                      ' (Default: None)')
+
+        self.parser.add_argument('--no_cache',
+                                 dest='no_cache',
+                                 action='store_true',
+                                 help='Analyze all experiments, ignoring the results cached by the previous runs.'
+                                      ' (Default: False)')
+
+    def __getstate__(self):
+        """
+        Returns the state of the analyzer passed to the processes analyzing the experiments (without the parser, \
+        which cannot be pickled).
+        """
+        state = self.__dict__.copy()
+        del state['parser']
+        return state
+
     @staticmethod
     def check_if_file_exists(dir_, filename_):
         """
@@ -162,6 +205,15 @@ class GridAnalyzer(GridWorker):
 
         # Get experiment directory.
         self.experiment_rootdir = self.flags.expdir
+        self.max_concurrent_runs = self.flags.max_concurrent_runs
+
+        # Check whether the columnar format can be used.
+        if self.flags.columnar is not None:
+            try:
+                check_columnar_format(self.flags.columnar)
+            except ImportError as e:
+                self.logger.error(e)
+                exit(-3)
 
         # Get all sub-directories paths in expdir.
         self.experiments_list = []
@@ -235,15 +287,14 @@ class GridAnalyzer(GridWorker):
 
         # Load yaml file, to get model name, problem name and random seeds.
         with open(os.path.join(experiment_path, 'training_configuration.yaml'), 'r') as yaml_file:
-            params = yaml.load(yaml_file)
+            params = yaml.safe_load(yaml_file)
 
         # Get problem and model names - from config.
         status_dict['problem'] = params['testing']['problem']['name']
         status_dict['model'] = params['model']['name']
 
-        # Load checkpoint from model file.
-        chkpt = torch.load(os.path.join(experiment_path, 'models/model_best.pt'),
-                           map_location=lambda storage, loc: storage)
+        # Load checkpoint metadata (status, timestamps and statistics).
+        chkpt = self.load_checkpoint_metadata(os.path.join(experiment_path, 'models/model_best.pt'))
 
         status_dict['model_save_timestamp'] = '{0:%Y%m%d_%H%M%S}'.format(chkpt['model_timestamp']) 
         status_dict['training_terminal_status'] = chkpt['status']
@@ -295,7 +346,7 @@ class GridAnalyzer(GridWorker):
 
                 # Load yaml file and get random seeds.
                 with open(os.path.join(experiment_test_path, 'testing_configuration.yaml'), 'r') as yaml_file:
-                    test_params = yaml.load(yaml_file)  
+                    test_params = yaml.safe_load(yaml_file)
                     # Get seeds.             
                     test_dict['test_seed_torch'] = test_params['testing']['seed_torch']
                     test_dict['test_seed_numpy'] = test_params['testing']['seed_numpy']                    
@@ -324,6 +375,89 @@ class GridAnalyzer(GridWorker):
         # Return all dictionaries with lists
         return list_status_dicts, list_train_dicts, list_valid_dicts, list_test_dicts
 
+    def load_checkpoint_metadata(self, checkpoint_file):
+        """
+        Loads the metadata of a checkpoint from the yaml file saved next to it by \
+        :py:func:`miprometheus.models.Model.save_metadata`.
+
+        .. note::
+
+            For the checkpoints saved without the metadata file (i.e. by older versions) the whole checkpoint \
+            is loaded, which might be slow for large models.
+
+
+        :param checkpoint_file: Path to the checkpoint file.
+        :type checkpoint_file: str
+
+        :return: Checkpoint dictionary (without the model state).
+
+        """
+        metadata_file = Model.get_metadata_filename(checkpoint_file)
+
+        if os.path.isfile(metadata_file):
+            with open(metadata_file, 'r') as yaml_file:
+                return yaml.safe_load(yaml_file)
+
+        self.logger.warning('Could not find {}, loading the whole checkpoint'.format(metadata_file))
+        chkpt = torch.load(checkpoint_file, map_location=lambda storage, loc: storage)
+        del chkpt['state_dict']
+        return chkpt
+
+    @staticmethod
+    def get_experiment_signature(experiment_path):
+        """
+        Returns the signature of the experiment folder, i.e. the number of files and the latest modification time \
+        of the files in the folder and its subfolders (e.g. changed by training or by adding a test).
+
+        :param experiment_path: Path to an experiment folder.
+        :type experiment_path: str
+
+        :return: List [number of files, latest modification time].
+
+        """
+        num_files = 0
+        latest = 0.0
+        for root, _, files in os.walk(experiment_path):
+            for name in files:
+                num_files += 1
+                latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+
+        return [num_files, latest]
+
+    def get_cache_filename(self):
+        """
+        Returns the name of the file caching the results of the analysis.
+        """
+        return os.path.join(self.experiment_rootdir, 'grid_analysis_cache.json')
+
+    def load_cache(self):
+        """
+        Loads the results of the previous analyses.
+
+        :return: Dictionary {experiment path: {'signature': ..., 'results': ...}}, empty if there is no (valid) cache.
+
+        """
+        if self.flags.no_cache or not os.path.isfile(self.get_cache_filename()):
+            return {}
+
+        try:
+            with open(self.get_cache_filename(), 'r') as f:
+                return json.load(f)
+        except ValueError:
+            self.logger.warning('Could not parse {}, analyzing all experiments'.format(self.get_cache_filename()))
+            return {}
+
+    def save_cache(self, cache):
+        """
+        Saves the results of the analysis, so they can be reused by the next analysis.
+
+        :param cache: Dictionary {experiment path: {'signature': ..., 'results': ...}}.
+        :type cache: dict
+
+        """
+        with open(self.get_cache_filename(), 'w') as f:
+            json.dump(cache, f)
+
     @staticmethod
     def merge_list_dicts(list_dicts):
         """
@@ -352,6 +486,37 @@ class GridAnalyzer(GridWorker):
         # Return the result.
         return final_dict
 
+    def export_columnar(self, exp_values, results_prefix):
+        """
+        Stores the results in a typed columnar file and concatenates the columnar statistics \
+        (`training_statistics`, `validation_statistics`) of all experiments, adding the 'experiment' column.
+
+        :param exp_values: Merged results {column name: values}, with ' ' denoting the missing values.
+        :type exp_values: dict
+
+        :param results_prefix: Prefix of the names of the created files.
+        :type results_prefix: str
+
+        """
+        # Parse the values, so the numeric columns are stored as numbers.
+        columns = OrderedDict((key, [None if value == ' ' else to_python_value(value) for value in values])
+                              for key, values in exp_values.items())
+        filename = save_columnar(to_structured_array(columns), results_prefix + 'analysis', self.flags.columnar)
+        self.logger.info('Results stored in {}.'.format(filename))
+
+        for statistics in ['training_statistics', 'validation_statistics']:
+            experiments = [exp for exp in self.experiments_list
+                           if self.check_if_file_exists(exp, '{}.{}'.format(statistics, self.flags.columnar))]
+            if len(experiments) == 0:
+                continue
+
+            data = concatenate_columnar(
+                [load_columnar(os.path.join(exp, '{}.{}'.format(statistics, self.flags.columnar)))
+                 for exp in experiments], experiments)
+            filename = save_columnar(data, results_prefix + statistics, self.flags.columnar)
+            self.logger.info('Concatenated {} of {} experiments stored in {}.'.format(
+                statistics, len(experiments), filename))
+
     def run_grid_experiment(self):
         """
         Collects four list of dicts from each experiment path contained in ``self.experiments_lists``.
@@ -360,14 +525,37 @@ class GridAnalyzer(GridWorker):
 
         """
         try:
-            # Go through the experiments one by one and collect data.
+            # Get the experiments which were not analyzed yet (or were changed since).
+            cache = self.load_cache()
+            signatures = {exp: self.get_experiment_signature(exp) for exp in self.experiments_list}
+            new_experiments = [exp for exp in self.experiments_list
+                               if exp not in cache or cache[exp]['signature'] != signatures[exp]]
+            self.logger.info('Number of experiments to analyze: {} (cached: {})'.format(
+                len(new_experiments), len(self.experiments_list) - len(new_experiments)))
+
+            # Analyze them in parallel processes.
+            if len(new_experiments) > 0:
+                if self.max_concurrent_runs <= 0:
+                    max_processes = self.get_available_cpus()
+                else:
+                    max_processes = min(self.get_available_cpus(), self.max_concurrent_runs)
+
+                with Pool(processes=min(max_processes, len(new_experiments))) as pool:
+                    for exp, results in zip(new_experiments, pool.imap(self.run_experiment, new_experiments)):
+                        cache[exp] = {'signature': signatures[exp], 'results': results}
+
+                # Drop the experiments which do not exist anymore and update the cache.
+                cache = {exp: cache[exp] for exp in self.experiments_list}
+                self.save_cache(cache)
+
+            # Collect data.
             list_statuses = []
             list_trains = []
             list_valids = []
             list_tests = []
 
             for exp in self.experiments_list:
-                statuses, trains, valids, tests = self.run_experiment(exp)
+                statuses, trains, valids, tests = cache[exp]['results']
                 list_statuses.extend(statuses)
                 list_trains.extend(trains)
                 list_valids.extend(valids)
@@ -383,8 +571,8 @@ class GridAnalyzer(GridWorker):
             exp_values = {**statuses, **trains, **valids, **tests}
 
             # create results file
-            results_file = os.path.join(self.experiment_rootdir,
-                                        "{0:%Y%m%d_%H%M%S}_grid_analysis.csv".format(datetime.now()))
+            results_prefix = os.path.join(self.experiment_rootdir, "{0:%Y%m%d_%H%M%S}_grid_".format(datetime.now()))
+            results_file = results_prefix + 'analysis.csv'
 
             with open(results_file, "w") as outfile:
                 writer = csv.writer(outfile, delimiter=',')
@@ -394,6 +582,9 @@ class GridAnalyzer(GridWorker):
             self.logger.info('Analysis finished')
             self.logger.info('Results stored in {}.'.format(results_file))
 
+            if self.flags.columnar is not None:
+                self.export_columnar(exp_values, results_prefix)
+
         except KeyboardInterrupt:
             self.logger.info('Grid analysis interrupted!')
 
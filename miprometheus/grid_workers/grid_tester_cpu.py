@@ -24,10 +24,16 @@ grid_tester_cpu.py:
     - The main input is a list of directories for each problem/model e.g. `experiments/serial_recall/dnc`, \
       and executes on every run of the model in that directory.
 
+    - Optionally (``--batch_models``), the models sharing the model and test problem configurations are tested \
+      together by a single :py:class:`miprometheus.workers.Tester`, which creates the test problem and \
+      dataloader once and evaluates all models on the same batches.
+
 """
 __author__ = "Tomasz Kornuta & Vincent Marois"
 
 import os
+import json
+import yaml
 import shutil
 import subprocess
 from functools import partial
@@ -77,6 +83,14 @@ class GridTesterCPU(GridWorker):
                                       'The set limit will be truncated by number of available CPUs/GPUs.'
                                       ' (DEFAULT=-1, meaning that it will be set to the number of CPUs/GPUs)')
 
+        self.parser.add_argument('--batch_models',
+                                 dest='batch_models',
+                                 type=int,
+                                 default=1,
+                                 help='Maximal number of models (sharing the model and test problem configurations) '
+                                      'tested together on the same batches by a single tester, limited by the memory.'
+                                      ' (DEFAULT=1, meaning that every model is tested separately)')
+
     def setup_grid_experiment(self):
         """
          Setups the overall grid of experiments:
@@ -99,32 +113,40 @@ class GridTesterCPU(GridWorker):
         experiment_repetitions = self.flags.experiment_repetitions
         self.max_concurrent_runs = self.flags.max_concurrent_runs
 
-        # get all sub-directories paths in expdir, repeating according to flags.experiment_repetitions
-        self.experiments_list = []
+        # get all sub-directories paths in expdir
+        experiments = []
 
-        for _ in range(experiment_repetitions):
-            for root, dirs, _ in os.walk(self.experiment_rootdir, topdown=True):
-                for name in dirs:
-                    self.experiments_list.append(os.path.join(root, name))
+        for root, dirs, _ in os.walk(self.experiment_rootdir, topdown=True):
+            for name in dirs:
+                experiments.append(os.path.join(root, name))
 
         # Keep only the folders that contain best_model.pt in model subdirectory.
         # We assume that training configuration is there as well.
-        self.experiments_list = [elem for elem in self.experiments_list
-                                 if os.path.isfile(elem + '/model_best.pt')]
+        experiments = [elem for elem in experiments if os.path.isfile(elem + '/model_best.pt')]
 
         # Check if these are 'valid' folders, e.g. they contain a saved model
-        if len(self.experiments_list) == 0:
+        if len(experiments) == 0:
             self.logger.error("There are no models in {} directory!".format(self.experiment_rootdir))
             exit(-2)
 
         # List folders.
         exp_str = "Found the following models in {} directory:\n".format(self.experiment_rootdir)
         exp_str += '='*80 + '\n'
-        for exp in self.experiments_list:
+        for exp in experiments:
             exp_str += " - {}/model_best.pt\n".format(exp)
         exp_str += '='*80 + '\n'
         self.logger.info(exp_str)
 
+        # Group the models tested together.
+        if self.flags.batch_models > 1:
+            experiments = self.group_experiments(experiments, self.flags.batch_models)
+            self.logger.info('Grouped the models into {} tests'.format(len(experiments)))
+
+        # Repeat according to flags.experiment_repetitions
+        self.experiments_list = []
+        for _ in range(experiment_repetitions):
+            self.experiments_list.extend(experiments)
+
         self.logger.info('Number of experiments to run: {}'.format(len(self.experiments_list)))
         self.experiments_done = 0
 
@@ -136,6 +158,34 @@ class GridTesterCPU(GridWorker):
                 exit(0)
 
 
+    @staticmethod
+    def group_experiments(experiments, max_group_size):
+        """
+        Groups the experiments sharing the model and testing sections of the training configuration, \
+        i.e. the ones which can be tested on the same batches by a single :py:class:`miprometheus.workers.Tester`.
+
+        :param experiments: List of paths to the folders containing the models (`model_best.pt`).
+        :type experiments: list
+
+        :param max_group_size: Maximal number of experiments in a group.
+        :type max_group_size: int
+
+        :return: List of groups, each being a string with paths separated with coma ",".
+
+        """
+        groups = {}
+        for exp in experiments:
+            # The training configuration is stored in the parent folder.
+            with open(os.path.join(os.path.dirname(exp), 'training_configuration.yaml'), 'r') as yaml_file:
+                params = yaml.safe_load(yaml_file)
+
+            key = json.dumps([params.get('model'), params.get('testing')], sort_keys=True, default=str)
+            groups.setdefault(key, []).append(exp)
+
+        # Split the groups which are too big.
+        return [','.join(group[i:i + max_group_size])
+                for group in groups.values() for i in range(0, len(group), max_group_size)]
+
     def run_grid_experiment(self):
         """
         Main function of the :py:class:`miprometheus.grid_workers.GridTesterCPU`.
@@ -164,16 +214,20 @@ class GridTesterCPU(GridWorker):
         except KeyboardInterrupt:
             self.logger.info('Grid testing interrupted!')
 
-    def run_experiment(self, experiment_path: str, prefix=""):
+    def run_experiment(self, experiment_path: str, prefix="", env=None):
         """
         Runs a test on the specified model (experiment_path) using the :py:class:`miprometheus.workers.Tester`.
 
-        :param experiment_path: Path to an experiment folder containing a trained model.
+        :param experiment_path: Path to an experiment folder containing a trained model (or several paths \
+        separated with coma "," - the models will be tested together).
         :type experiment_path: str
 
         :param prefix: Prefix to position before the command string (e.g. 'cuda-gpupick -n 1'). Optional.
         :type prefix: str
 
+        :param env: Additional environment variables of the tester (e.g. ``CUDA_VISIBLE_DEVICES``). Optional.
+        :type env: dict
+
         ..note::
 
             - Visualization is deactivated to avoid any user interaction.
@@ -183,7 +237,7 @@ class GridTesterCPU(GridWorker):
         """
         try:
 
-            path_to_model = os.path.join(experiment_path, 'model_best.pt')
+            path_to_model = ','.join(os.path.join(path, 'model_best.pt') for path in experiment_path.split(','))
             self.logger.warning(path_to_model)
 
             # Run the test
@@ -198,7 +252,8 @@ class GridTesterCPU(GridWorker):
 
             self.logger.info("Starting: {}".format(command_str))
             with open(os.devnull, 'w') as devnull:
-                result = subprocess.run(command_str.split(" "), stdout=devnull)
+                result = subprocess.run(command_str.split(" "), stdout=devnull,
+                                        env=dict(os.environ, **env) if env is not None else None)
             self.experiments_done += 1
             self.logger.info("Finished: {}".format(command_str))
 
@@ -28,13 +28,12 @@ grid_tester_gpu.py:
 
 __author__ = "Tomasz Kornuta & Vincent Marois"
 
-import shutil
 import torch
-from time import sleep
 from functools import partial
 from multiprocessing.pool import ThreadPool
 
 from miprometheus.grid_workers.grid_tester_cpu import GridTesterCPU
+from miprometheus.grid_workers.device_scheduler import DeviceSlotScheduler, compute_device_slots, get_visible_devices
 
 
 class GridTesterGPU(GridTesterCPU):
@@ -64,6 +63,13 @@ class GridTesterGPU(GridTesterCPU):
         # Call the base constructor.
         super(GridTesterGPU, self).__init__(name=name,use_gpu=use_gpu)
 
+        self.parser.add_argument('--gpu_memory_per_run',
+                                 dest='gpu_memory_per_run',
+                                 type=int,
+                                 default=-1,
+                                 help='Memory (in MiB) required by a single experiment, used to run several '
+                                      'experiments on a device (DEFAULT=-1, meaning one experiment per device)')
+
     def setup_grid_experiment(self):
         """
         Setups a specific experiment.
@@ -80,54 +86,50 @@ class GridTesterGPU(GridTesterCPU):
             self.logger.error("Cannot use GPU as there are no CUDA-compatible devices present in the system!")
             exit(-1)
 
+        self.scheduler = DeviceSlotScheduler(compute_device_slots(get_visible_devices(), self.flags.gpu_memory_per_run,
+                                                                  self.max_concurrent_runs), self.logger)
+
     def run_grid_experiment(self):
         """
         Main function of the :py:class:`miprometheus.grid_workers.GridTesterGPU`.
 
-        Maps the grid experiments to CUDA device in the limit of the maximum concurrent runs allowed or maximum \
-        available devices.
+        Maps the grid experiments to the slots of CUDA devices in the limit of the maximum concurrent runs allowed.
 
         """
         try:
 
-            # Check the presence of cuda-gpupick
-            if shutil.which('cuda-gpupick') is not None:
-                prefix_str = "cuda-gpupick -n1 "
-            else:
-                self.logger.warning("Cannot localize the 'cuda-gpupick' script, disabling it")
-                prefix_str = ''
-
-            # Check max number of child processes. 
-            if self.max_concurrent_runs <= 0:  # We need at least one process!
-                max_processes = torch.cuda.device_count()
-            else:    
-                # Take into account the minimum value.
-                max_processes = min(torch.cuda.device_count(), self.max_concurrent_runs)
-            self.logger.info('Spanning experiments using {} GPU(s) concurrently'.format(max_processes))
-
-            # Run in as many threads as there are GPUs available to the script.
-            with ThreadPool(processes=max_processes) as pool:
-                # This contains a list of `AsyncResult` objects. To check if completed and get result.
-                thread_results = []
-
-                for task in self.experiments_list:
-                    func = partial(GridTesterGPU.run_experiment, self, prefix=prefix_str)
-                    thread_results.append(pool.apply_async(func, (task,)))
-
-                    # Check every 3 seconds if there is a (supposedly) free GPU to start a task on
-                    sleep(3)
-                    while [r.ready() for r in thread_results].count(False) >= torch.cuda.device_count():
-                        sleep(3)
-
-                # Equivalent of what would usually be called "join" for threads
-                for r in thread_results:
-                    r.wait()
+            self.logger.info('Spanning {} experiment(s) concurrently on GPU(s): {}'.format(
+                len(self.scheduler), self.scheduler.slots))
+
+            # Run in as many threads as there are device slots - every thread takes a free slot to run an experiment.
+            with ThreadPool(processes=len(self.scheduler)) as pool:
+                func = partial(GridTesterGPU.run_experiment, self, prefix="")
+                pool.map(func, self.experiments_list)
 
             self.logger.info('Grid testing finished')
 
         except KeyboardInterrupt:
             self.logger.info('Grid testing interrupted!')
 
+    def run_experiment(self, experiment_path: str, prefix="", env=None):
+        """
+        Runs a test on a free device slot, by setting the ``CUDA_VISIBLE_DEVICES`` of the tester.
+
+        :param experiment_path: Path to an experiment folder containing a trained model.
+        :type experiment_path: str
+
+        :param prefix: Prefix to position before the command string. Optional.
+        :type prefix: str
+
+        :param env: Additional environment variables of the tester. Optional.
+        :type env: dict
+
+        """
+        with self.scheduler.slot() as device:
+            self.logger.info("Using device {}".format(device))
+            env = dict(env if env is not None else {}, **self.scheduler.get_environment(device))
+            super(GridTesterGPU, self).run_experiment(experiment_path, prefix=prefix, env=env)
+
 
 def main():
     """
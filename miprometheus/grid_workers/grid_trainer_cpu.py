@@ -28,16 +28,20 @@ grid_trainer_cpu.py:
 __author__ = "Alexis Asseman, Ryan McAvoy, Tomasz Kornuta, Vincent Marois"
 
 import os
+import csv
+import queue
 import shutil
 import yaml
 import subprocess
-from time import sleep
+from time import sleep, time
 from datetime import datetime
 from functools import partial
 from tempfile import NamedTemporaryFile
 from multiprocessing.pool import ThreadPool
 
 from miprometheus.grid_workers.grid_worker import GridWorker
+from miprometheus.grid_workers.worker_pool import create_pool, run_worker_task
+from miprometheus.grid_workers.successive_halving import SuccessiveHalvingScheduler, compute_rung_budgets
 
 
 class GridTrainerCPU(GridWorker):
@@ -47,6 +51,23 @@ class GridTrainerCPU(GridWorker):
     Reuses a :py:class:`miprometheus.workers.Trainer` (can specify :py:class:`miprometheus.workers.OfflineTrainer` \
     or :py:class:`miprometheus.workers.OnlineTrainer`) to start one experiment.
 
+    Optionally (``successive_halving`` section in ``grid_settings``), the experiments are scheduled by the \
+    :py:class:`miprometheus.grid_workers.successive_halving.SuccessiveHalvingScheduler`: all of them start with \
+    a small budget, the worst ones are stopped early and the best ones are promoted to larger budgets:
+
+        >>> grid_settings:
+        >>>     successive_halving:
+        >>>         max_budget: 27       # Budget (number of epochs/episodes) of the best experiments. Mandatory.
+        >>>         min_budget: 1        # Budget of the first rung (DEFAULT: 1).
+        >>>         reduction_factor: 3  # 1/3 of the experiments are promoted to 3 times larger budget (DEFAULT: 3).
+        >>>         budget: epoch_limit  # Terminal condition limited by the budget (DEFAULT: see below).
+        >>>         metric: loss         # Validation statistic of the last checkpoint (DEFAULT: loss).
+        >>>         mode: min            # Lower values of the metric are better (DEFAULT: min).
+
+    The budget limits the number of epochs (``epoch_limit``, default for the offline trainer) or episodes \
+    (``episode_limit``, default for the online trainer). Every job is run in its own directory \
+    (`rung_<rung>/experiment_<index>`), the results of all jobs are gathered in `successive_halving.csv`.
+
     """
 
     def __init__(self, name="GridTrainerCPU", use_gpu=False):
@@ -88,6 +109,21 @@ class GridTrainerCPU(GridWorker):
                                  help='Additional tag for the (output) experiment directory.')
 
 
+        self.parser.add_argument('--pool',
+                                 dest='use_pool',
+                                 action='store_true',
+                                 help='Run the experiments in a pool of persistent processes, each importing the '
+                                      'package once, instead of starting a new trainer process for every experiment.'
+                                      ' (Default: False)')
+
+        self.parser.add_argument('--columnar',
+                                 dest='columnar',
+                                 type=str,
+                                 choices=['npy', 'parquet'],
+                                 default=None,
+                                 help='If present, the trainers export the statistics also to typed columnar files '
+                                      '(NumPy structured arrays or Parquet tables). (Default: None)')
+
         self.parser.add_argument('--tensorboard',
                                  action='store',
                                  dest='tensorboard', choices=[0, 1, 2],
@@ -159,12 +195,25 @@ class GridTrainerCPU(GridWorker):
 
         # Get grid settings.
         try:
+            self.grid_settings = grid_dict['grid_settings']
             experiment_repetitions = grid_dict['grid_settings']['experiment_repetitions']
             self.max_concurrent_runs = grid_dict['grid_settings']['max_concurrent_runs']
         except KeyError:
             print("Error: The 'grid_settings' section must define 'experiment_repetitions' and 'max_concurrent_runs'")
             exit(-6)
 
+        # Number of CPUs (threads) used by a single experiment: -1 => split the CPUs evenly between the concurrent
+        # experiments, 0 => do not pin the experiments to CPUs.
+        self.threads_per_run = grid_dict['grid_settings'].get('threads_per_run', -1)
+        # Queue of the CPU sets not used by any of the running experiments (None => no pinning).
+        self.free_cpu_sets = None
+
+        # Successive halving - optional.
+        self.halving_scheduler = None
+        self.halving_settings = grid_dict['grid_settings'].get('successive_halving')
+        if self.halving_settings is not None:
+            self.check_successive_halving_settings(self.halving_settings)
+
         # Check the presence of grid_overwrite section.
         if 'grid_overwrite' not in grid_dict:
             grid_overwrite_filename = None
@@ -219,6 +268,17 @@ class GridTrainerCPU(GridWorker):
 
         self.logger.info('Number of experiments to run: {}'.format(len(self.experiments_list)))
         self.experiments_done = 0
+        self.experiment_results = []
+
+        if self.halving_settings is not None:
+            self.halving_scheduler = SuccessiveHalvingScheduler(
+                len(self.experiments_list), self.halving_budgets, self.halving_settings.get('reduction_factor', 3),
+                self.halving_settings.get('mode', 'min'), self.logger)
+            self.logger.info('Successive halving activated, budgets ({}) of the rungs: {}'.format(
+                self.halving_budget_name, self.halving_budgets))
+            # Checkpoints and results of the jobs.
+            self.halving_checkpoints = {}
+            self.halving_results = []
 
         # create experiment directory label of the day
         self.expdir_str = self.flags.expdir + '_{0:%Y%m%d_%H%M%S}'.format(datetime.now())
@@ -251,6 +311,10 @@ class GridTrainerCPU(GridWorker):
         Maps the grid experiments to CPU cores in the limit of the maximum concurrent runs allowed or maximum \
         available cores.
 
+        Unless disabled (``threads_per_run: 0`` in ``grid_settings``), every concurrent experiment is pinned to \
+        a disjoint set of cores and limited to the same number of threads, so the experiments do not compete \
+        for the cores.
+
         """
         try:
 
@@ -260,21 +324,319 @@ class GridTrainerCPU(GridWorker):
             else:    
                 # Take into account the minimum value.
                 max_processes = min(self.get_available_cpus(), self.max_concurrent_runs)
+
+            cpu_sets = None
+            if self.threads_per_run != 0:
+                cpu_sets = self.partition_cpus(max_processes, self.threads_per_run)
+                max_processes = len(cpu_sets)
+                self.logger.info('Pinning experiments to CPU sets: {}'.format(cpu_sets))
+
             self.logger.info('Spanning experiments using {} CPU(s) concurrently'.format(max_processes))
 
-            # Run in as many threads as there are CPUs available to the script.
-            with ThreadPool(processes=max_processes) as pool:
-                func = partial(GridTrainerCPU.run_experiment, self, prefix="")
-                pool.map(func, self.experiments_list)
+            if self.flags.use_pool:
+                # Run in a pool of persistent processes, each pinned to one of the CPU sets.
+                with create_pool(max_processes, cpu_sets) as pool:
+                    if self.halving_scheduler is not None:
+                        self.run_successive_halving(max_processes, pool)
+                    else:
+                        tasks = [(self.trainer, self.get_trainer_args(configs)) for configs in self.experiments_list]
+                        for result in pool.imap_unordered(run_worker_task, tasks):
+                            self.report_experiment_result(result)
 
+            else:
+                if cpu_sets is not None:
+                    # Every thread takes a free set when starting an experiment and returns it afterwards.
+                    self.free_cpu_sets = queue.Queue()
+                    for cpus in cpu_sets:
+                        self.free_cpu_sets.put(cpus)
+
+                if self.halving_scheduler is not None:
+                    self.run_successive_halving(max_processes)
+                else:
+                    # Run in as many threads as there are CPUs available to the script.
+                    with ThreadPool(processes=max_processes) as pool:
+                        func = partial(GridTrainerCPU.run_experiment, self, prefix="")
+                        pool.map(func, self.experiments_list)
+
+            self.report_grid_results()
             self.logger.info('Grid training finished')
 
         except KeyboardInterrupt:
             self.logger.info('Grid training interrupted!')
 
-    def run_experiment(self, experiment_configs: str, prefix=""):
+    def get_trainer_args(self, experiment_configs: str, expdir=None):
         """
-        Setups the overall grid of experiments.
+        Creates the list of command line arguments of the trainer running a single experiment.
+
+        :param experiment_configs: Configuration file(s) passed to the trainer using its `--c` argument. If indicating\
+         several config files, they must be separated with coma ",".
+        :type experiment_configs: str
+
+        :param expdir: Experiment directory of the trainer (DEFAULT: None, i.e. directory of the grid).
+        :type expdir: str
+
+        :return: List of arguments.
+
+        """
+        args = []
+
+        # Add gpu flag if required.
+        if self.app_state.use_CUDA:
+            args += ['--gpu']
+
+        # Add experiment config(s).
+        args += ['--c', experiment_configs, '--expdir', expdir if expdir is not None else self.expdir_str,
+                 '--li', str(self.flags.logging_interval), '--ll', str(self.flags.log_level)]
+
+        # Add tensorboard flag.
+        if self.flags.tensorboard is not None:
+            args += ['--t', str(self.flags.tensorboard)]
+
+        # Add columnar export flag.
+        if self.flags.columnar is not None:
+            args += ['--columnar', self.flags.columnar]
+
+        return args
+
+    def report_experiment_result(self, result):
+        """
+        Stores and logs the result of a single experiment.
+
+        :param result: Dictionary with the 'args', 'returncode', 'error' and (optionally) 'duration', 'cpu_time' \
+        and 'num_cpus' keys, as returned by :py:func:`miprometheus.grid_workers.worker_pool.run_worker_task`.
+        :type result: dict
+
+        """
+        self.experiment_results.append(result)
+        self.experiments_done += 1
+
+        self.logger.info("Finished: {} {}{}".format(result['script'], ' '.join(result['args']),
+                                                   " ({:.1f}s)".format(result['duration'])
+                                                   if 'duration' in result else ''))
+        if result.get('cpu_time') is not None and result.get('duration'):
+            # Fraction of the time the CPUs available to the experiment were busy.
+            utilization = result['cpu_time'] / (result['duration'] * result['num_cpus'])
+            self.logger.info("CPU time: {:.1f}s, CPU utilization: {:.1%} of {} CPU(s)".format(
+                result['cpu_time'], utilization, result['num_cpus']))
+        if self.halving_scheduler is not None:
+            # The number of jobs depends on the promotions.
+            self.logger.info('Number of jobs done: {}.'.format(self.experiments_done))
+        else:
+            self.logger.info('Number of experiments done: {}/{}.'.format(self.experiments_done,
+                                                                         len(self.experiments_list)))
+
+        if result['returncode'] != 0:
+            self.logger.warning("Training exited with code: {}".format(result['returncode']))
+            if result['error'] is not None:
+                self.logger.debug(result['error'])
+
+    def report_grid_results(self):
+        """
+        Logs the summary of the grid: number of successful experiments and the list of failed ones.
+
+        """
+        failed = [result for result in self.experiment_results if result['returncode'] != 0]
+        self.logger.info('Experiments succeeded: {}/{}'.format(len(self.experiment_results) - len(failed),
+                                                              len(self.experiment_results)))
+        for result in failed:
+            self.logger.warning("Failed (exit code {}): {} {}".format(result['returncode'], result['script'],
+                                                                     ' '.join(result['args'])))
+
+    def check_successive_halving_settings(self, settings):
+        """
+        Verifies the ``successive_halving`` section of ``grid_settings`` and computes the budgets of the rungs.
+
+        :param settings: Dictionary of settings.
+        :type settings: dict
+
+        """
+        if 'max_budget' not in settings:
+            self.logger.error("The 'successive_halving' section must define 'max_budget'")
+            exit(-8)
+
+        default_budget_name = 'epoch_limit' if self.trainer == 'mip-offline-trainer' else 'episode_limit'
+        self.halving_budget_name = settings.get('budget', default_budget_name)
+        if self.halving_budget_name not in ['epoch_limit', 'episode_limit']:
+            self.logger.error("Successive halving budget must be 'epoch_limit' or 'episode_limit', not '{}'".format(
+                self.halving_budget_name))
+            exit(-9)
+
+        if settings.get('mode', 'min') not in ['min', 'max']:
+            self.logger.error("Successive halving mode must be 'min' or 'max'")
+            exit(-10)
+
+        if settings.get('reduction_factor', 3) < 2:
+            self.logger.error("Successive halving reduction factor must be at least 2")
+            exit(-11)
+
+        self.halving_metric = settings.get('metric', 'loss')
+        self.halving_budgets = compute_rung_budgets(settings.get('min_budget', 1), settings['max_budget'],
+                                                    settings.get('reduction_factor', 3))
+
+    def run_successive_halving(self, processes, pool=None):
+        """
+        Runs the grid with successive halving: every thread takes the next job (experiment to start or promote) \
+        from the scheduler until there are no jobs left.
+
+        :param processes: Number of concurrent jobs.
+        :type processes: int
+
+        :param pool: Pool of persistent processes running the jobs (DEFAULT: None, i.e. trainer subprocesses).
+        :type pool: ``multiprocessing.Pool``
+
+        """
+        def run_jobs(_):
+            job = self.halving_scheduler.get_job()
+            while job is not None:
+                experiment, rung = job
+                metric = None
+                try:
+                    metric = self.run_successive_halving_job(experiment, rung, pool)
+                finally:
+                    # Always report, so the other threads won't wait for this job forever.
+                    self.halving_scheduler.report(experiment, rung, metric)
+                job = self.halving_scheduler.get_job()
+
+        with ThreadPool(processes=processes) as threads:
+            threads.map(run_jobs, range(processes))
+
+        self.report_successive_halving()
+
+    def run_successive_halving_job(self, experiment, rung, pool=None):
+        """
+        Trains the experiment with the budget of the rung and reads its validation metric.
+
+        Every job saves its last checkpoint (``model.save_last``) and the rung is scored with the validation \
+        metric of that checkpoint. Experiments promoted from the previous rung continue training from it \
+        (parameters of the model and state of the optimizer), with the remaining budget - so the promoted \
+        weights are the scored ones and the total training matches the budget of the rung.
+
+        .. note::
+
+            The counters of episodes and epochs (and hence e.g. curriculum learning) start from zero at \
+            every rung.
+
+        :param experiment: Index of the experiment (in ``experiments_list``).
+        :type experiment: int
+
+        :param rung: Index of the rung.
+        :type rung: int
+
+        :param pool: Pool of persistent processes running the jobs (DEFAULT: None, i.e. trainer subprocesses).
+        :type pool: ``multiprocessing.Pool``
+
+        :return: Value of the metric (None if the experiment failed).
+
+        """
+        budget = self.halving_scheduler.get_budget_increment(rung)
+
+        # Create temporary file with the budget (and checkpoint) of the job.
+        overwrite = {'training': {'terminal_conditions': {self.halving_budget_name: budget}},
+                     'model': {'save_last': True}}
+        if rung > 0:
+            # Continue from the last checkpoint (model and optimizer) of the previous rung.
+            overwrite['model'].update({'load': self.halving_checkpoints[(experiment, rung - 1)],
+                                       'load_optimizer': True})
+        with NamedTemporaryFile(mode='w', delete=False) as overwrite_file:
+            yaml.dump(overwrite, overwrite_file, default_flow_style=False)
+        experiment_configs = overwrite_file.name + ',' + self.experiments_list[experiment]
+
+        # Every job has its own directory, so its results can be found.
+        expdir = os.path.join(self.expdir_str, 'rung_{}'.format(rung), 'experiment_{:03d}'.format(experiment))
+
+        if pool is not None:
+            result = pool.apply(run_worker_task, ((self.trainer, self.get_trainer_args(experiment_configs, expdir)),))
+            self.report_experiment_result(result)
+        else:
+            result = self.run_experiment(experiment_configs, expdir=expdir)
+
+        metric = None
+        log_dir = self.find_log_dir(expdir)
+        if result is not None and result['returncode'] == 0 and log_dir is not None:
+            self.halving_checkpoints[(experiment, rung)] = os.path.join(log_dir, 'models', 'model_last.pt')
+            metric = self.read_validation_metric(log_dir)
+
+        self.logger.info("Experiment {} finished rung {} (budget: {}) with {} = {}".format(
+            experiment, rung, self.halving_budgets[rung], self.halving_metric, metric))
+        self.halving_results.append({'experiment': experiment, 'rung': rung,
+                                     'budget': self.halving_budgets[rung], self.halving_metric: metric,
+                                     'duration': result.get('duration') if result is not None else None,
+                                     'log_dir': log_dir})
+        return metric
+
+    @staticmethod
+    def find_log_dir(expdir):
+        """
+        Finds the log directory of the trainer (containing the validation statistics) inside the given \
+        experiment directory.
+
+        :param expdir: Experiment directory of a single job.
+        :type expdir: str
+
+        :return: Path to the log directory or None if not found.
+
+        """
+        for root, _, files in os.walk(expdir):
+            if 'validation_set_agg_statistics.csv' in files:
+                return root
+        return None
+
+    def read_validation_metric(self, log_dir):
+        """
+        Reads the value of the metric from the validation statistics stored in the metadata of the last \
+        checkpoint (``models/model_last.yaml``) of the trainer.
+
+        :param log_dir: Log directory of the trainer.
+        :type log_dir: str
+
+        :return: Value of the metric or None if not available.
+
+        """
+        metadata_file = os.path.join(log_dir, 'models', 'model_last.yaml')
+        if not os.path.isfile(metadata_file):
+            self.logger.warning("Cannot find the last checkpoint of {}".format(log_dir))
+            return None
+
+        with open(metadata_file, 'r') as yaml_file:
+            validation_stats = yaml.safe_load(yaml_file).get('validation_stats', {})
+
+        if validation_stats.get(self.halving_metric) in [None, '']:
+            self.logger.warning("No value of '{}' found in the validation statistics of {}".format(
+                self.halving_metric, metadata_file))
+            return None
+
+        return float(validation_stats[self.halving_metric])
+
+    def report_successive_halving(self):
+        """
+        Logs the best experiment and the saved budget, and writes the results of all jobs to \
+        `successive_halving.csv` in the experiments directory.
+
+        """
+        best = self.halving_scheduler.get_best()
+        if best is not None:
+            experiment, rung, metric = best
+            self.logger.info("Best experiment: {} (rung {}, {} = {}): {}".format(
+                experiment, rung, self.halving_metric, metric, self.experiments_list[experiment]))
+
+        used_budget = self.halving_scheduler.used_budget
+        full_budget = self.halving_scheduler.get_full_budget()
+        self.logger.info("Used budget ({}): {} of {} required to fully train all experiments ({:.1%} saved)".format(
+            self.halving_budget_name, used_budget, full_budget, 1 - used_budget / full_budget))
+
+        durations = [result['duration'] for result in self.halving_results if result['duration'] is not None]
+        if durations:
+            self.logger.info("Total duration of the jobs: {:.1f}s".format(sum(durations)))
+
+        with open(os.path.join(self.expdir_str, 'successive_halving.csv'), 'w') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=['experiment', 'rung', 'budget', self.halving_metric,
+                                                          'duration', 'log_dir'])
+            writer.writeheader()
+            writer.writerows(self.halving_results)
+
+    def run_experiment(self, experiment_configs: str, prefix="", env=None, expdir=None):
+        """
+        Runs a single experiment by starting the trainer as a subprocess.
 
         :param experiment_configs: Configuration file(s) passed to the trainer using its `--c` argument. If indicating\
          several config files, they must be separated with coma ",".
@@ -283,6 +645,15 @@ class GridTrainerCPU(GridWorker):
         :param prefix: Prefix to position before the command string (e.g. 'cuda-gpupick -n 1'). Optional.
         :type prefix: str
 
+        :param env: Additional environment variables of the trainer (e.g. ``CUDA_VISIBLE_DEVICES``). Optional.
+        :type env: dict
+
+        :param expdir: Experiment directory of the trainer. Optional.
+        :type expdir: str
+
+        :return: Dictionary with the result of the experiment (see :py:func:`report_experiment_result`) or None \
+        if interrupted.
+
 
         .. note::
 
@@ -294,38 +665,60 @@ class GridTrainerCPU(GridWorker):
 
 
         """
+        cpus = None
+        result = None
         try:
 
             # Set the command to be executed using the indicated trainer and prefix.
-            command_str = "{}{}".format(prefix,self.trainer)
-
-            # Add gpu flag if required.
-            if self.app_state.use_CUDA:
-                command_str += " --gpu "
-
-            # Add experiment config(s).
-            command_str = command_str + " --c {0} --expdir " + self.expdir_str + ' --li ' + str(self.flags.logging_interval) \
-                        + ' --ll ' + str(self.flags.log_level)
-            command_str = command_str.format(experiment_configs)
-
-            # Add tensorboard flag.
-            if self.flags.tensorboard is not None:
-                command_str += " --t " + str(self.flags.tensorboard)
-
-            self.logger.info("Starting: {}".format(command_str))
+            args = self.get_trainer_args(experiment_configs, expdir)
+            command = prefix.split() + [self.trainer] + args
+
+            env = dict(os.environ, **env) if env is not None else None
+            if self.free_cpu_sets is not None:
+                # Pin the trainer to a free set of CPUs and limit the number of its threads accordingly.
+                cpus = self.free_cpu_sets.get()
+                env = dict(env if env is not None else os.environ,
+                           OMP_NUM_THREADS=str(len(cpus)), MKL_NUM_THREADS=str(len(cpus)))
+
+            self.logger.info("Starting: {}".format(' '.join(command)))
+            start = time()
             with open(os.devnull, 'w') as devnull:
-                result = subprocess.run(command_str.split(" "), stdout=devnull)
-            self.experiments_done += 1
-            self.logger.info("Finished: {}".format(command_str))
-
-            self.logger.info('Number of experiments done: {}/{}.'.format(self.experiments_done, len(self.experiments_list)))
-
-            if result.returncode != 0:
-                self.logger.info("Training exited with code: {}".format(result.returncode))
+                process = subprocess.Popen(command, stdout=devnull, env=env)
+
+                if cpus is not None and hasattr(os, 'sched_setaffinity'):
+                    # Set from the parent (preexec_fn is not safe in the presence of threads) - right after
+                    # the start, so the threads of the trainer (created later) inherit the affinity.
+                    try:
+                        os.sched_setaffinity(process.pid, cpus)
+                    except ProcessLookupError:
+                        # The trainer has already finished.
+                        pass
+
+                cpu_time = None
+                if hasattr(os, 'wait4'):
+                    # Wait for the trainer, collecting its resource usage.
+                    _, status, rusage = os.wait4(process.pid, 0)
+                    process.returncode = os.waitstatus_to_exitcode(status) \
+                        if hasattr(os, 'waitstatus_to_exitcode') else (status >> 8)
+                    cpu_time = rusage.ru_utime + rusage.ru_stime
+                else:
+                    process.wait()
+
+            result = {'script': self.trainer, 'args': args, 'returncode': process.returncode,
+                      'error': None, 'duration': time() - start, 'cpu_time': cpu_time,
+                      'num_cpus': len(cpus) if cpus is not None else self.get_available_cpus()}
+            self.report_experiment_result(result)
 
         except KeyboardInterrupt:
             self.logger.info('Grid training interrupted!')
 
+        finally:
+            # Return the CPU set, so it can be used by the next experiment.
+            if cpus is not None:
+                self.free_cpu_sets.put(cpus)
+
+        return result
+
 
 def main():
     """
@@ -28,13 +28,12 @@ grid_trainer_gpu.py:
 
 __author__ = "Alexis Asseman, Younes Bouhadjar, Vincent Marois"
 
-import shutil
 import torch
-from time import sleep
 from functools import partial
 from multiprocessing.pool import ThreadPool
 
 from miprometheus.grid_workers.grid_trainer_cpu import GridTrainerCPU
+from miprometheus.grid_workers.device_scheduler import DeviceSlotScheduler, compute_device_slots, get_visible_devices
 
 
 class GridTrainerGPU(GridTrainerCPU):
@@ -73,6 +72,9 @@ class GridTrainerGPU(GridTrainerCPU):
 
         - Checks the presence of CUDA-compatible devices.
 
+        - Creates the device slots: every device runs as many experiments as fit in its memory, according to the \
+        (optional) ``gpu_memory_per_run`` (in MiB) from ``grid_settings`` (DEFAULT: -1, one experiment per device).
+
         """
         super(GridTrainerGPU, self).setup_grid_experiment()
 
@@ -81,53 +83,66 @@ class GridTrainerGPU(GridTrainerCPU):
             self.logger.error("Cannot use GPU as there are no CUDA-compatible devices present in the system!")
             exit(-1)
 
+        if self.flags.use_pool:
+            self.logger.warning("The pool of persistent processes is not supported on GPUs, "
+                                "starting a new trainer process for every experiment")
+
+        memory_per_run = self.grid_settings.get('gpu_memory_per_run', -1)
+        self.scheduler = DeviceSlotScheduler(compute_device_slots(get_visible_devices(), memory_per_run,
+                                                                  self.max_concurrent_runs), self.logger)
+
     def run_grid_experiment(self):
         """
         Main function of the :py:class:`miprometheus.grid_workers.GridTrainerGPU`.
 
-        Maps the grid experiments to CUDA devices in the limit of the maximum concurrent runs allowed.
+        Maps the grid experiments to the slots of CUDA devices in the limit of the maximum concurrent runs allowed.
 
         """
         try:
 
-            # Check the presence of cuda-gpupick
-            if shutil.which('cuda-gpupick') is not None:
-                prefix_str = "cuda-gpupick -n1 "
+            self.logger.info('Spanning {} experiment(s) concurrently on GPU(s): {}'.format(
+                len(self.scheduler), self.scheduler.slots))
+
+            # Run in as many threads as there are device slots - every thread takes a free slot to run an experiment.
+            if self.halving_scheduler is not None:
+                self.run_successive_halving(len(self.scheduler))
             else:
-                self.logger.warning("Cannot localize the 'cuda-gpupick' script, not using it.")
-                prefix_str = ''
-
-            # Check max number of child processes. 
-            if self.max_concurrent_runs <= 0:  # We need at least one process!
-                max_processes = torch.cuda.device_count()
-            else:    
-                # Take into account the minimum value.
-                max_processes = min(torch.cuda.device_count(), self.max_concurrent_runs)
-            self.logger.info('Spanning experiments using {} GPU(s) concurrently.'.format(max_processes))
-
-            # Run in as many threads as there are GPUs available to the script.
-            with ThreadPool(processes=max_processes) as pool:
-                # This contains a list of `AsyncResult` objects. To check if completed and get result.
-                thread_results = []
-
-                for task in self.experiments_list:
-                    func = partial(GridTrainerGPU.run_experiment, self, prefix=prefix_str)
-                    thread_results.append(pool.apply_async(func, (task,)))
-
-                    # Check every 3 seconds if there is a (supposedly) free GPU to start a task on
-                    sleep(3)
-                    while [r.ready() for r in thread_results].count(False) >= max_processes:
-                        sleep(3)
-
-                # Equivalent of what would usually be called "join" for threads
-                for r in thread_results:
-                    r.wait()
+                with ThreadPool(processes=len(self.scheduler)) as pool:
+                    func = partial(GridTrainerGPU.run_experiment, self, prefix="")
+                    pool.map(func, self.experiments_list)
 
+            self.report_grid_results()
             self.logger.info('Grid training finished')
 
         except KeyboardInterrupt:
             self.logger.info('Grid training interrupted!')
 
+    def run_experiment(self, experiment_configs: str, prefix="", env=None, expdir=None):
+        """
+        Runs a single experiment on a free device slot, by setting the ``CUDA_VISIBLE_DEVICES`` of the trainer.
+
+        :param experiment_configs: Configuration file(s) passed to the trainer using its `--c` argument. If indicating\
+         several config files, they must be separated with coma ",".
+        :type experiment_configs: str
+
+        :param prefix: Prefix to position before the command string. Optional.
+        :type prefix: str
+
+        :param env: Additional environment variables of the trainer. Optional.
+        :type env: dict
+
+        :param expdir: Experiment directory of the trainer. Optional.
+        :type expdir: str
+
+        :return: Dictionary with the result of the experiment or None if interrupted.
+
+        """
+        with self.scheduler.slot() as device:
+            self.logger.info("Using device {}".format(device))
+            env = dict(env if env is not None else {}, **self.scheduler.get_environment(device))
+            return super(GridTrainerGPU, self).run_experiment(experiment_configs, prefix=prefix, env=env,
+                                                              expdir=expdir)
+
 
 def main():
     """
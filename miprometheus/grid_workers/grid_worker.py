@@ -197,19 +197,49 @@ class GridWorker(object):
 
         """
 
-    def get_available_cpus(self):
+    def get_available_cpu_ids(self):
         """
-        Returns the number of available CPUs on the current machine.
+        Returns the (sorted) list of identifiers of CPUs available on the current machine.
         """
 
-        # Check scheduler for number of available cpus - if OS offers that!
+        # Check scheduler for the available cpus - if OS offers that!
         if hasattr(os, 'sched_getaffinity'):
-            return len(os.sched_getaffinity(0))
+            return sorted(os.sched_getaffinity(0))
 
         proc = psutil.Process()
         # cpu_affinity() is only available on Linux, Windows and FreeBSD
         if hasattr(proc, 'cpu_affinity'):
-            return len(proc.cpu_affinity())
+            return sorted(proc.cpu_affinity())
+
+        # Simply return all CPUs
+        return list(range(psutil.cpu_count()))
+
+    def get_available_cpus(self):
+        """
+        Returns the number of available CPUs on the current machine.
+        """
+        return len(self.get_available_cpu_ids())
+
+    def partition_cpus(self, max_processes, threads_per_run):
+        """
+        Partitions the available CPUs into disjoint sets, one per concurrent experiment.
+
+        :param max_processes: Maximal number of concurrent experiments.
+        :type max_processes: int
+
+        :param threads_per_run: Number of CPUs (threads) per experiment. If -1, the available CPUs are \
+        split evenly between ``max_processes`` experiments.
+        :type threads_per_run: int
+
+        :return: List of CPU sets (lists of CPU identifiers). Its length is the number of concurrent experiments.
+
+        """
+        cpus = self.get_available_cpu_ids()
+
+        if threads_per_run <= 0:
+            threads_per_run = max(1, len(cpus) // max_processes)
+
+        # Reduce the number of concurrent experiments, so the sets do not overlap.
+        num_sets = max(1, min(max_processes, len(cpus) // threads_per_run))
 
-        # Simply return CPU count
-        return psutil.cpu_count()
+        return [cpus[i * threads_per_run:(i + 1) * threads_per_run] for i in range(num_sets)]
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+successive_halving.py:
+
+    - Contains the definition of the :py:class:`SuccessiveHalvingScheduler`, deciding which experiments of \
+    the grid are trained and for how long (asynchronous successive halving, ASHA).
+    - Every experiment starts with the minimal budget (e.g. number of epochs). When an experiment is among \
+    the best ``1 / reduction_factor`` of the experiments which finished the same rung, it is promoted to the \
+    next rung, i.e. continues training for ``reduction_factor`` times larger (total) budget. The remaining \
+    experiments are stopped early.
+    - The scheduler does not depend on the trainers: the experiments can be simulated.
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import math
+import logging
+import threading
+
+
+def compute_rung_budgets(min_budget, max_budget, reduction_factor=3):
+    """
+    Computes the (total) budgets of the consecutive rungs: ``min_budget * reduction_factor ** k``, \
+    the last one being equal to ``max_budget``.
+
+    :param min_budget: Budget of the first rung.
+    :type min_budget: int
+
+    :param max_budget: Budget of the last rung.
+    :type max_budget: int
+
+    :param reduction_factor: Ratio of the budgets of the consecutive rungs (DEFAULT: 3).
+    :type reduction_factor: int
+
+    :return: List of budgets.
+
+    """
+    budgets = []
+    budget = min_budget
+    while budget < max_budget:
+        budgets.append(budget)
+        budget *= reduction_factor
+    budgets.append(max_budget)
+    return budgets
+
+
+class SuccessiveHalvingScheduler(object):
+    """
+    Thread-safe scheduler of the experiments of the grid, implementing the asynchronous successive halving.
+
+    >>> scheduler = SuccessiveHalvingScheduler(num_experiments=27, budgets=compute_rung_budgets(1, 27))
+    >>> job = scheduler.get_job()
+    >>> while job is not None:
+    >>>     experiment, rung = job
+    >>>     metric = train(experiment, budget=scheduler.get_budget_increment(rung))
+    >>>     scheduler.report(experiment, rung, metric)
+    >>>     job = scheduler.get_job()
+
+    .. note::
+
+        Promotions are decided as soon as an experiment finishes (without waiting for the whole rung), \
+        so no worker stays idle as long as there are experiments to start or promote.
+
+    """
+
+    def __init__(self, num_experiments, budgets, reduction_factor=3, mode='min', logger=None):
+        """
+        Initializes the scheduler.
+
+        :param num_experiments: Number of experiments (configurations) in the grid.
+        :type num_experiments: int
+
+        :param budgets: List of the (total) budgets of the rungs (e.g. returned by :py:func:`compute_rung_budgets`).
+        :type budgets: list
+
+        :param reduction_factor: Only ``1 / reduction_factor`` of the experiments are promoted to the next rung \
+        (DEFAULT: 3).
+        :type reduction_factor: int
+
+        :param mode: Indicates whether lower ('min', e.g. loss) or higher ('max', e.g. accuracy) values of \
+        the metric are better (DEFAULT: 'min').
+        :type mode: str
+
+        :param logger: Logger used for reporting (DEFAULT: module logger).
+
+        """
+        self.logger = logger if logger is not None else logging.getLogger('SuccessiveHalvingScheduler')
+        self.num_experiments = num_experiments
+        self.budgets = list(budgets)
+        self.reduction_factor = reduction_factor
+        self.mode = mode
+
+        self.condition = threading.Condition()
+        # Index of the next experiment to start.
+        self.next_experiment = 0
+        # Number of running jobs.
+        self.running = 0
+        # Metrics of the experiments which finished a given rung: list (one per rung) of dicts {experiment: metric}.
+        self.results = [{} for _ in self.budgets]
+        # Experiments promoted from a given rung.
+        self.promoted = [set() for _ in self.budgets]
+        # Consumed budget.
+        self.used_budget = 0
+
+    def get_budget_increment(self, rung):
+        """
+        Returns the budget of the job, i.e. the difference between the budgets of the given and previous rungs \
+        (the promoted experiments continue from the checkpoint of the previous rung).
+
+        :param rung: Index of the rung.
+        :type rung: int
+
+        :return: Budget.
+
+        """
+        return self.budgets[rung] - (self.budgets[rung - 1] if rung > 0 else 0)
+
+    def is_better(self, metric, other):
+        """
+        Compares two values of the metric (``None`` denoting a failed experiment, worse than any value).
+
+        :return: True if ``metric`` is better than ``other``.
+
+        """
+        if metric is None:
+            return False
+        if other is None:
+            return True
+        return metric < other if self.mode == 'min' else metric > other
+
+    def rank(self, rung):
+        """
+        Returns the experiments which finished the given rung, ordered from the best to the worst.
+
+        :param rung: Index of the rung.
+        :type rung: int
+
+        :return: List of experiment indices.
+
+        """
+        results = self.results[rung]
+        failed = [experiment for experiment, metric in results.items() if metric is None]
+        finished = [experiment for experiment, metric in results.items() if metric is not None]
+        finished.sort(key=lambda experiment: results[experiment], reverse=(self.mode != 'min'))
+        return finished + failed
+
+    def find_promotion(self):
+        """
+        Finds an experiment to be promoted, starting from the highest rung.
+
+        :return: Tuple (experiment, rung of the promotion) or None.
+
+        """
+        for rung in reversed(range(len(self.budgets) - 1)):
+            ranking = self.rank(rung)
+            for experiment in ranking[:len(ranking) // self.reduction_factor]:
+                if experiment not in self.promoted[rung] and self.results[rung][experiment] is not None:
+                    return experiment, rung + 1
+        return None
+
+    def get_job(self):
+        """
+        Returns the next job: promotes an experiment or (if none can be promoted) starts a new one. \
+        If all experiments were started and none can be promoted, waits for the running ones.
+
+        :return: Tuple (experiment, rung) or None when there is nothing left to do.
+
+        """
+        with self.condition:
+            while True:
+                job = self.find_promotion()
+                if job is not None:
+                    experiment, rung = job
+                    self.promoted[rung - 1].add(experiment)
+                    self.logger.info("Promoting experiment {} to rung {} (budget: {})".format(
+                        experiment, rung, self.budgets[rung]))
+                    break
+
+                if self.next_experiment < self.num_experiments:
+                    job = (self.next_experiment, 0)
+                    self.next_experiment += 1
+                    break
+
+                if self.running == 0:
+                    return None
+
+                # Wait for the running experiments, which might make other promotions possible.
+                self.condition.wait()
+
+            self.running += 1
+            self.used_budget += self.get_budget_increment(job[1])
+            return job
+
+    def report(self, experiment, rung, metric):
+        """
+        Stores the result of the job.
+
+        :param experiment: Index of the experiment.
+        :type experiment: int
+
+        :param rung: Index of the rung.
+        :type rung: int
+
+        :param metric: Value of the metric (``None`` if the experiment failed).
+        :type metric: float
+
+        """
+        with self.condition:
+            self.results[rung][experiment] = metric
+            self.running -= 1
+            self.condition.notify_all()
+
+    def get_best(self):
+        """
+        Returns the best experiment, i.e. the best one of the highest rung reached by any experiment.
+
+        :return: Tuple (experiment, rung, metric) or None if no experiment succeeded.
+
+        """
+        for rung in reversed(range(len(self.budgets))):
+            ranking = self.rank(rung)
+            if ranking and self.results[rung][ranking[0]] is not None:
+                return ranking[0], rung, self.results[rung][ranking[0]]
+        return None
+
+    def get_full_budget(self):
+        """
+        Returns the budget required to train all experiments with the budget of the last rung.
+        """
+        return self.num_experiments * self.budgets[-1]
+
+
+if __name__ == '__main__':
+    """ Simulation of the successive halving - the experiments are replaced by random "learning curves"."""
+    import time
+    import random
+    from multiprocessing.pool import ThreadPool
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Final loss of every (simulated) experiment.
+    final_losses = [random.uniform(0.1, 1.0) for _ in range(27)]
+    scheduler = SuccessiveHalvingScheduler(len(final_losses), compute_rung_budgets(1, 27))
+    print('Budgets of the rungs: {}'.format(scheduler.budgets))
+
+    def worker(_):
+        job = scheduler.get_job()
+        while job is not None:
+            experiment, rung = job
+            time.sleep(0.001 * scheduler.get_budget_increment(rung))
+            # Noisy loss, approaching the final one with the growing budget.
+            loss = final_losses[experiment] * (1 + random.uniform(0, 1) / math.sqrt(scheduler.budgets[rung]))
+            scheduler.report(experiment, rung, loss)
+            job = scheduler.get_job()
+
+    with ThreadPool(processes=4) as pool:
+        pool.map(worker, range(4))
+
+    best, best_rung, best_loss = scheduler.get_best()
+    print('Best experiment: {} (rung {}, loss {:.3f}), truly best: {}'.format(
+        best, best_rung, best_loss, final_losses.index(min(final_losses))))
+    print('Used budget: {} of {} ({:.1%} saved)'.format(
+        scheduler.used_budget, scheduler.get_full_budget(),
+        1 - scheduler.used_budget / scheduler.get_full_budget()))
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+worker_pool.py:
+
+    - Contains functions executed by the processes of a persistent pool used by the grid workers.
+    - Instead of starting a new ``mip-*`` script (i.e. python interpreter importing the whole package) for \
+    every experiment, every process of the pool imports the package once and then runs many experiments, \
+    by instantiating the adequate :py:class:`miprometheus.workers.Worker` in-process.
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import os
+import sys
+import time
+import queue
+import logging
+import traceback
+import contextlib
+import multiprocessing
+
+
+# Mapping between the scripts (entry points) and the classes of the workers.
+WORKER_CLASSES = {'mip-offline-trainer': 'OfflineTrainer',
+                  'mip-online-trainer': 'OnlineTrainer',
+                  'mip-tester': 'Tester'}
+
+
+def pin_to_cpus(cpus):
+    """
+    Restricts the current process to the given set of CPUs and sets the number of PyTorch (intra-op) threads \
+    accordingly, so concurrent experiments do not oversubscribe the machine.
+
+    :param cpus: List of CPU identifiers.
+    :type cpus: list
+
+    """
+    import torch
+
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+
+    # Also affects the libraries initialized afterwards.
+    os.environ['OMP_NUM_THREADS'] = str(len(cpus))
+    os.environ['MKL_NUM_THREADS'] = str(len(cpus))
+    torch.set_num_threads(len(cpus))
+
+
+def save_logging_state():
+    """
+    Saves the handlers and levels of the root logger and all the (already created) loggers.
+
+    :return: Dictionary mapping the loggers to tuples (list of handlers, level, propagate flag).
+
+    """
+    loggers = [logging.getLogger()] + [logger for logger in logging.Logger.manager.loggerDict.values()
+                                       if isinstance(logger, logging.Logger)]
+    return {logger: (list(logger.handlers), logger.level, logger.propagate) for logger in loggers}
+
+
+def restore_logging_state(state):
+    """
+    Restores the handlers and levels of the loggers saved by :py:func:`save_logging_state`. \
+    The handlers added in the meantime are closed, the loggers created in the meantime lose all their handlers.
+
+    :param state: Dictionary returned by :py:func:`save_logging_state`.
+    :type state: dict
+
+    """
+    loggers = [logging.getLogger()] + [logger for logger in logging.Logger.manager.loggerDict.values()
+                                       if isinstance(logger, logging.Logger)]
+    for logger in loggers:
+        handlers, level, propagate = state.get(logger, ([], logging.NOTSET, True))
+        for handler in list(logger.handlers):
+            if handler not in handlers:
+                handler.close()
+            logger.removeHandler(handler)
+        for handler in handlers:
+            logger.addHandler(handler)
+        logger.setLevel(level)
+        logger.propagate = propagate
+        logger.disabled = False
+
+
+def initialize_pool_process(cpu_sets=None):
+    """
+    Initializer of a pool process: pins it to a free set of CPUs (if provided) and imports the workers once.
+
+    .. note::
+
+        Problems and models are imported lazily, i.e. by the first experiment using them.
+
+    :param cpu_sets: Queue of free CPU sets (DEFAULT: None, i.e. no pinning).
+    :type cpu_sets: ``multiprocessing.Queue``
+
+    """
+    if cpu_sets is not None:
+        try:
+            pin_to_cpus(cpu_sets.get_nowait())
+        except queue.Empty:
+            # A process replacing a crashed one - the CPU set of the latter is lost.
+            pass
+
+    import miprometheus.workers
+    for worker_class in WORKER_CLASSES.values():
+        getattr(miprometheus.workers, worker_class)
+
+
+def create_pool(processes, cpu_sets=None):
+    """
+    Creates a pool of persistent processes running the experiments.
+
+    .. note::
+
+        Processes are spawned (not forked), so they do not inherit the state (e.g. CUDA context or threads) \
+        of the grid worker.
+
+
+    :param processes: Number of processes.
+    :type processes: int
+
+    :param cpu_sets: List of disjoint CPU sets, one per process (DEFAULT: None, i.e. no pinning).
+    :type cpu_sets: list
+
+    :return: ``multiprocessing.Pool`` object.
+
+    """
+    context = multiprocessing.get_context('spawn')
+
+    free_cpu_sets = None
+    if cpu_sets is not None:
+        free_cpu_sets = context.Queue()
+        for cpus in cpu_sets:
+            free_cpu_sets.put(cpus)
+
+    return context.Pool(processes=processes, initializer=initialize_pool_process, initargs=(free_cpu_sets,))
+
+
+def run_worker_task(task):
+    """
+    Runs a single experiment in the current process.
+
+    :param task: Tuple (script name, e.g. 'mip-offline-trainer', list of command line arguments).
+    :type task: tuple
+
+    :return: Dictionary containing the arguments, the exit code ('returncode', 0 in case of success), \
+    error message ('error', ``None`` in case of success), the duration of the experiment ('duration'), \
+    the consumed CPU time ('cpu_time', both in seconds) and the number of CPUs available to the process ('num_cpus').
+
+    """
+    script, args = task
+    result = {'script': script, 'args': args, 'returncode': 0, 'error': None}
+    start = time.time()
+    start_cpu = time.process_time()
+
+    import miprometheus.workers
+    from miprometheus.utils.app_state import AppState
+    from miprometheus.utils.param_registry import ParamRegistry
+
+    # Reset the application state and the parameters (e.g. seeds) left by the previous experiment.
+    AppState().__init__()
+    ParamRegistry().__init__()
+
+    # The workers reconfigure the logging and add their own handlers.
+    logging_state = save_logging_state()
+
+    # The workers parse sys.argv.
+    argv = sys.argv
+    sys.argv = [script] + list(args)
+
+    try:
+        # Discard the standard output, as is done for the experiments run as subprocesses.
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            worker = getattr(miprometheus.workers, WORKER_CLASSES[script])()
+            if hasattr(worker, 'run_tests'):
+                # Tester (possibly running multiple tests).
+                worker.run_tests()
+            else:
+                worker.setup_experiment()
+                worker.run_experiment()
+
+    except SystemExit as e:
+        # The workers call exit() when something went wrong.
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        result['returncode'] = code
+        if code != 0:
+            result['error'] = 'Exited with code {}'.format(code)
+
+    except Exception:
+        result['returncode'] = 1
+        result['error'] = traceback.format_exc()
+
+    finally:
+        sys.argv = argv
+
+        # Restore the logging, so the next experiment won't log to the same file(s).
+        restore_logging_state(logging_state)
+
+    result['duration'] = time.time() - start
+    result['cpu_time'] = time.process_time() - start_cpu
+    result['num_cpus'] = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    return result
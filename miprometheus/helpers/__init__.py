@@ -1,5 +1,8 @@
-# Helpers.
-from .index_splitter import IndexSplitter
-from .problem_initializer import ProblemInitializer
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['IndexSplitter', 'ProblemInitializer']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'Benchmark': '.benchmark',
+                                                'IndexSplitter': '.index_splitter',
+                                                'Pregenerator': '.pregenerator',
+                                                'ProblemInitializer': '.problem_initializer'})
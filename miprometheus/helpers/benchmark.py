@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+benchmark.py:
+
+    - Contains the definition of a ``Helper`` class, called :py:class:`Benchmark`, measuring the throughput \
+    of the problems (batch generation) and models (forward & backward steps).
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import os
+import sys
+import json
+import time
+import yaml
+import platform
+import subprocess
+import numpy as np
+from datetime import datetime
+
+import torch
+from torch.utils.data import DataLoader
+
+from miprometheus.workers import Worker
+from miprometheus.utils.param_interface import ParamInterface
+from miprometheus.models.model_factory import ModelFactory
+from miprometheus.problems.problem_factory import ProblemFactory
+from miprometheus.problems.seq_to_seq import algorithmic
+
+
+# Configurations benchmarked by default (paths relative to the root of the repository), one per model.
+DEFAULT_CONFIGS = ['configs/ntm/serial_recall.yaml',
+                   'configs/dwm_baselines/dnc/serial_recall.yaml',
+                   'configs/dwm_baselines/dwm/serial_recall.yaml',
+                   'configs/maes_baselines/maes/maes_serial_recall.yaml',
+                   'configs/thalnet/serial_recall.yaml',
+                   'configs/dwm_baselines/lstm/serial_recall.yaml',
+                   'configs/relational_net/sort_of_clevr.yaml',
+                   'configs/vqa_baselines/stacked_attention_networks/shape_color_query.yaml',
+                   'configs/vqa_baselines/multi_hops_stacked_attention_networks/shape_color_query.yaml']
+
+# Parameters of the algorithmic problems which are not set by (all of) the problems themselves.
+ALGORITHMIC_DEFAULT_PARAMS = {'control_bits': 4,
+                              'data_bits': 8,
+                              'min_sequence_length': 10,
+                              'max_sequence_length': 10,
+                              'num_subseq_min': 1,
+                              'num_subseq_max': 3,
+                              'num_rotation': 0.5,
+                              'num_bits': 0.5,
+                              'num_items': 0.5,
+                              'seq_start': 0,
+                              'skip_step': 2,
+                              'min_recall_number': 1,
+                              'max_recall_number': 3}
+
+# Statements whose execution time in a new interpreter is measured by the startup benchmark.
+STARTUP_STATEMENTS = [('mip-offline-trainer', 'from miprometheus.workers.offline_trainer import main'),
+                      ('mip-online-trainer', 'from miprometheus.workers.online_trainer import main'),
+                      ('mip-tester', 'from miprometheus.workers.tester import main'),
+                      ('serial_recall_lstm', 'from miprometheus import problems, models; '
+                                             'problems.SerialRecallCommandLines; models.LSTM'),
+                      ('whole_package', 'from miprometheus import *')]
+
+# Heavy dependencies, reported if imported by the startup statements.
+HEAVY_MODULES = ['torchvision', 'torchtext', 'nltk', 'h5py', 'PIL', 'matplotlib', 'PyQt5']
+
+
+class Benchmark(Worker):
+    """
+    Defines the :py:class:`Benchmark` class.
+
+    This helper measures on CPU:
+
+        - the throughput of batch generation of the problems (samples/s),
+        - the throughput of the models (steps/s, in forward-only and forward & backward modes),
+        - the startup time of the entry points (i.e. the time of importing the required modules),
+
+    for the problems and models defined in the indicated configuration files (the ``training`` section and \
+    the ``model`` section respectively), for all combinations of batch sizes and sequence lengths.
+
+    .. note::
+
+        General usage (from the root of the repository, as the configuration files refer to each other \
+        by relative paths):
+
+            -- The user provides the configuration files (`--c`, DEFAULT: one configuration per model, see \
+            ``DEFAULT_CONFIGS``). MAC & S-MAC configurations (e.g. `configs/mac/mac_cogent.yaml`) are not \
+            benchmarked by default, as they require the CLEVR / COG datasets,
+
+            -- Additionally, the user might benchmark the batch generation of all algorithmic problems (`--algorithmic`),
+
+            -- The startup time is measured in new interpreters, for the statements listed in \
+            ``STARTUP_STATEMENTS``, repeated `--startup_repeats` times,
+
+            -- The user provides the batch sizes (`--batch_sizes`) and sequence lengths (`--seq_lengths`). \
+            The latter apply only to problems with ``min_sequence_length`` and ``max_sequence_length`` parameters.
+
+        The results are written to a ``.json`` file (`--output`), along with the description of the environment, \
+        so the results of different versions can be compared.
+
+    """
+    def __init__(self, name="Benchmark"):
+        """
+        Set parser arguments.
+
+        :param name: Name of the worker (Default: "Benchmark").
+        :type name: str
+
+        """
+        # Call base constructor to set up app state, registry and add default params.
+        super(Benchmark, self).__init__(name=name, add_default_parser_args=False)
+
+        # Add arguments to the specific parser.
+        self.parser.add_argument('--config',
+                                 dest='config',
+                                 type=str,
+                                 default=','.join(DEFAULT_CONFIGS),
+                                 help='Name of the configuration file(s) to be benchmarked, separated with coma ",".'
+                                      ' (DEFAULT: one configuration per model)')
+
+        self.parser.add_argument('--algorithmic',
+                                 dest='algorithmic',
+                                 action='store_true',
+                                 help='Benchmarks also the batch generation of all algorithmic problems, '
+                                      'using their default parameters. (Default: False)')
+
+        self.parser.add_argument('--mode',
+                                 dest='mode',
+                                 type=str,
+                                 choices=['all', 'problems', 'models', 'startup'],
+                                 default='all',
+                                 help='Benchmarks the problems (batch generation), models (steps), startup '
+                                      '(import) time or all of them. (Default: all)')
+
+        self.parser.add_argument('--startup_repeats',
+                                 dest='startup_repeats',
+                                 type=int,
+                                 default=5,
+                                 help='Number of measurements of the startup time (the median is reported). '
+                                      '(Default: 5)')
+
+        self.parser.add_argument('--batch_sizes',
+                                 dest='batch_sizes',
+                                 type=str,
+                                 default='64',
+                                 help='Batch sizes, separated with coma ",". (Default: 64)')
+
+        self.parser.add_argument('--seq_lengths',
+                                 dest='seq_lengths',
+                                 type=str,
+                                 default='',
+                                 help='Sequence lengths, separated with coma ",". (Default: lengths set in the '
+                                      'configuration files)')
+
+        self.parser.add_argument('--episodes',
+                                 dest='episodes',
+                                 type=int,
+                                 default=20,
+                                 help='Number of measured episodes (batches/steps). (Default: 20)')
+
+        self.parser.add_argument('--warmup',
+                                 dest='warmup',
+                                 type=int,
+                                 default=3,
+                                 help='Number of episodes executed before the measurement. (Default: 3)')
+
+        self.parser.add_argument('--threads',
+                                 dest='threads',
+                                 type=int,
+                                 default=0,
+                                 help='Number of threads used by PyTorch. (Default: 0, i.e. PyTorch default)')
+
+        self.parser.add_argument('--output',
+                                 dest='output',
+                                 type=str,
+                                 default='benchmark_results.json',
+                                 help='Path to the output (.json) file. (Default: benchmark_results.json)')
+
+        # Index of the last parameter subtree.
+        self.subtree_index = 0
+        self.seq_lengths = [None]
+
+    @staticmethod
+    def parse_list(values):
+        """
+        Parses a list of integers separated with comas.
+
+        :param values: String with values, e.g. "1,16,64".
+        :type values: str
+
+        :return: List of integers.
+
+        """
+        return [int(value) for value in values.replace(" ", "").split(',') if value != '']
+
+    def get_params(self):
+        """
+        Returns a new (empty) subtree of the parameter registry, so every benchmarked setting has its own \
+        parameters (including the defaults added by the problems and models).
+
+        :return: :py:class:`miprometheus.utils.ParamInterface` object.
+
+        """
+        self.subtree_index += 1
+        return ParamInterface('benchmark', str(self.subtree_index))
+
+    def load_config(self, params, config):
+        """
+        Loads the configuration file (along with its default configuration files) into the parameters.
+
+        :param params: Parameters (subtree).
+        :type params: :py:class:`miprometheus.utils.ParamInterface`
+
+        :param config: Path to the configuration file.
+        :type config: str
+
+        """
+        for config_file in reversed(self.recurrent_config_parse(config, [])):
+            with open(config_file, 'r') as stream:
+                params.add_config_params(yaml.safe_load(stream))
+
+    def measure(self, function):
+        """
+        Executes the function ``warmup`` times, then measures the time of its ``episodes`` executions.
+
+        :param function: Function to be measured.
+
+        :return: Time (in seconds).
+
+        """
+        for _ in range(self.flags.warmup):
+            function()
+
+        start = time.perf_counter()
+        for _ in range(self.flags.episodes):
+            function()
+        return time.perf_counter() - start
+
+    def benchmark_problem(self, problem, batch_size):
+        """
+        Measures the time of batch generation, using a ``DataLoader`` without workers.
+
+        :param problem: Problem.
+        :type problem: ``problems.problem.Problem`` or a subclass
+
+        :param batch_size: Size of the batch.
+        :type batch_size: int
+
+        :return: Tuple (time in seconds, a generated batch).
+
+        """
+        dataloader = DataLoader(dataset=problem, batch_size=batch_size, collate_fn=problem.collate_fn,
+                                shuffle=False, num_workers=0, worker_init_fn=problem.worker_init_fn)
+        batches = self.cycle(dataloader)
+
+        duration = self.measure(lambda: next(batches))
+        return duration, next(batches)
+
+    def benchmark_model(self, model, problem, data_dict, backward):
+        """
+        Measures the time of the model steps on a single batch.
+
+        :param model: Model.
+        :type model: ``models.model.Model`` or a subclass
+
+        :param problem: Problem (computing the loss).
+        :type problem: ``problems.problem.Problem`` or a subclass
+
+        :param data_dict: Batch.
+        :type data_dict: ``DataDict``
+
+        :param backward: If set, measures forward & backward steps in training mode, forward steps in \
+        evaluation mode otherwise.
+        :type backward: bool
+
+        :return: Time (in seconds).
+
+        """
+        def step():
+            if backward:
+                model.zero_grad()
+                problem.evaluate_loss(data_dict, model(data_dict)).backward()
+            else:
+                with torch.no_grad():
+                    model(data_dict)
+
+        model.train(backward)
+        return self.measure(step)
+
+    def create_result(self, benchmark, config, problem, model, batch_size, seq_length, duration):
+        """
+        Creates the result of a single benchmark and logs it.
+
+        :return: Dictionary with the result.
+
+        """
+        result = {'benchmark': benchmark,
+                  'config': config,
+                  'problem': problem,
+                  'model': model,
+                  'batch_size': batch_size,
+                  'sequence_length': seq_length,
+                  'episodes': self.flags.episodes,
+                  'time': duration,
+                  'steps_per_second': self.flags.episodes / duration,
+                  'samples_per_second': self.flags.episodes * batch_size / duration}
+
+        self.logger.info('{:<16} {:<36} batch_size {:<5} seq_length {:<5} {:10.2f} steps/s {:12.2f} samples/s'.format(
+            benchmark, model if model is not None else problem, batch_size, str(seq_length),
+            result['steps_per_second'], result['samples_per_second']))
+        return result
+
+    def benchmark_setting(self, config, problem_name, batch_size, seq_length):
+        """
+        Benchmarks a single setting: batch generation of the problem, then the model steps (if the \
+        configuration defines a model).
+
+        :param config: Path to the configuration file (or None for algorithmic problems with default parameters).
+        :type config: str
+
+        :param problem_name: Name of the problem (used when ``config`` is None).
+        :type problem_name: str
+
+        :param batch_size: Size of the batch.
+        :type batch_size: int
+
+        :param seq_length: Length of the sequences (or None to keep the configured one). Problems without \
+        sequences are benchmarked only once, for the first of the lengths.
+        :type seq_length: int
+
+        :return: List of results.
+
+        """
+        params = self.get_params()
+        if config is not None:
+            self.load_config(params, config)
+        else:
+            params.add_default_params({'training': {'problem': dict(ALGORITHMIC_DEFAULT_PARAMS, name=problem_name)}})
+        problem_params = params['training']['problem']
+
+        # Override the sequence lengths.
+        if seq_length is not None:
+            if 'min_sequence_length' not in problem_params or 'max_sequence_length' not in problem_params:
+                if seq_length != self.seq_lengths[0]:
+                    return []
+                seq_length = None
+            else:
+                problem_params.add_config_params({'min_sequence_length': seq_length,
+                                                  'max_sequence_length': seq_length})
+        problem_params.add_config_params({'batch_size': batch_size})
+
+        results = []
+        problem = ProblemFactory.build(problem_params)
+        duration, data_dict = self.benchmark_problem(problem, batch_size)
+        if self.flags.mode != 'models':
+            results.append(self.create_result('generation', config, problem_params['name'], None,
+                                              batch_size, seq_length, duration))
+
+        if self.flags.mode == 'problems' or 'model' not in params:
+            return results
+
+        model = ModelFactory.build(params['model'], problem.default_values)
+        for benchmark, backward in [('forward', False), ('forward_backward', True)]:
+            duration = self.benchmark_model(model, problem, data_dict, backward)
+            results.append(self.create_result(benchmark, config, problem_params['name'], params['model']['name'],
+                                              batch_size, seq_length, duration))
+        return results
+
+    def benchmark_startup(self, name, statement):
+        """
+        Measures the time of executing the statement (importing modules) in a new interpreter.
+
+        :param name: Name of the benchmark (e.g. the entry point).
+        :type name: str
+
+        :param statement: Python statement(s).
+        :type statement: str
+
+        :return: Dictionary with the result: median of the statement time and of the total time of the process \
+        (both in seconds) and the list of heavy modules imported by the statement.
+
+        """
+        code = 'import sys, time, json\n' \
+               'start = time.perf_counter()\n' \
+               '{}\n' \
+               'print(json.dumps([time.perf_counter() - start, [m for m in {} if m in sys.modules]]))'.format(
+                   statement, HEAVY_MODULES)
+
+        import_times = []
+        process_times = []
+        heavy_modules = []
+        for _ in range(self.flags.startup_repeats):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    check=True, universal_newlines=True).stdout
+            process_times.append(time.perf_counter() - start)
+            import_time, heavy_modules = json.loads(output.strip().splitlines()[-1])
+            import_times.append(import_time)
+
+        result = {'benchmark': 'startup',
+                  'name': name,
+                  'statement': statement,
+                  'repeats': self.flags.startup_repeats,
+                  'time': float(np.median(import_times)),
+                  'process_time': float(np.median(process_times)),
+                  'heavy_modules': heavy_modules}
+
+        self.logger.info('{:<16} {:<36} {:8.3f}s import {:8.3f}s process, heavy modules: {}'.format(
+            'startup', name, result['time'], result['process_time'], ', '.join(heavy_modules) or '-'))
+        return result
+
+    def get_environment(self):
+        """
+        Describes the environment of the benchmark.
+
+        :return: Dictionary.
+
+        """
+        return {'date': datetime.now().isoformat(),
+                'platform': platform.platform(),
+                'processor': platform.processor(),
+                'python': platform.python_version(),
+                'torch': torch.__version__,
+                'num_threads': torch.get_num_threads(),
+                'warmup': self.flags.warmup,
+                'episodes': self.flags.episodes,
+                'startup_repeats': self.flags.startup_repeats}
+
+    def run(self):
+        """
+        Runs the benchmarks.
+
+            - Parses command line arguments.
+
+            - Measures the startup time.
+
+            - Benchmarks every setting (configuration file or algorithmic problem, batch size, sequence length).
+
+            - Writes the results to the output file.
+
+        """
+        # Parse arguments.
+        self.flags, self.unparsed = self.parser.parse_known_args()
+
+        # Display results of parsing.
+        self.display_parsing_results()
+
+        if self.flags.threads > 0:
+            torch.set_num_threads(self.flags.threads)
+
+        batch_sizes = self.parse_list(self.flags.batch_sizes)
+        self.seq_lengths = self.parse_list(self.flags.seq_lengths) or [None]
+        if len(batch_sizes) == 0 or self.flags.episodes < 1:
+            self.logger.error('Please set at least one batch size (--batch_sizes) and episode (--episodes).')
+            exit(-1)
+
+        # Settings: (configuration, problem name).
+        settings = [(config, None) for config in self.flags.config.replace(" ", "").split(',') if config != '']
+        if self.flags.algorithmic:
+            settings += [(None, name) for name in sorted(algorithmic.__all__) if name != 'AlgorithmicSeqToSeqProblem']
+        if self.flags.mode == 'startup':
+            settings = []
+
+        results = []
+        if self.flags.mode in ['all', 'startup']:
+            for name, statement in STARTUP_STATEMENTS:
+                try:
+                    results.append(self.benchmark_startup(name, statement))
+                except subprocess.CalledProcessError as e:
+                    self.logger.warning('Benchmark of the startup of {} failed: {}'.format(name, e.stderr))
+                    results.append({'benchmark': 'startup', 'name': name, 'error': e.stderr})
+
+        for config, problem_name in settings:
+            for batch_size in batch_sizes:
+                for seq_length in self.seq_lengths:
+                    try:
+                        results += self.benchmark_setting(config, problem_name, batch_size, seq_length)
+                    except Exception as e:
+                        self.logger.warning('Benchmark of {} failed (batch_size {}, seq_length {}): {}'.format(
+                            config or problem_name, batch_size, seq_length, e))
+                        results.append({'config': config, 'problem': problem_name, 'batch_size': batch_size,
+                                        'sequence_length': seq_length, 'error': str(e)})
+
+        # Write results to file.
+        output = os.path.expanduser(self.flags.output)
+        with open(output, 'w') as f:
+            json.dump({'environment': self.get_environment(), 'results': results}, f, indent=2)
+
+        self.logger.info('Results of {} benchmarks written to {}'.format(len(results), output))
+
+
+def main():
+    """
+    Entry point function for the :py:class:`Benchmark`.
+
+    """
+    worker = Benchmark()
+    # parse args and run the benchmarks.
+    worker.run()
+
+
+if __name__ == '__main__':
+
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+pregenerator.py:
+
+    - Contains the definition of a ``Helper`` class, called :py:class:`Pregenerator`, generating the samples \
+    of an algorithmic problem in advance.
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import os
+import yaml
+
+from miprometheus.workers import Worker
+from miprometheus.problems.problem_factory import ProblemFactory
+from miprometheus.problems.seq_to_seq.algorithmic.algorithmic_seq_to_seq_problem import AlgorithmicSeqToSeqProblem
+
+
+class Pregenerator(Worker):
+    """
+    Defines the :py:class:`Pregenerator` class.
+
+    This class generates the samples of an algorithmic problem (indicated in one of the sections of \
+    the configuration file) and stores them in memory-mappable files, so they can be later served by the \
+    problem in the "pregenerated" mode:
+
+        >>> training:
+        >>>     problem:
+        >>>         name: SerialRecallCommandLines
+        >>>         generation_mode: pregenerated
+        >>>         pregenerated_dir: ~/data/serial_recall/training
+
+    .. note::
+
+        General usage:
+
+            -- The user provides the configuration file(s) (`--c`) and the section (`--section`, \
+            DEFAULT: training) containing the problem,
+
+            -- The user provides the output dir where the samples will be stored (`--outdir`),
+
+            -- The user might set the number of samples (`--samples`, DEFAULT: size of the problem) and \
+            the size of the generated batches (`--batch_size`, DEFAULT: batch size of the problem).
+
+        The samples are generated with the seeds indicated in the section (random if not set), which are stored \
+        along with the whole configuration in `config.yaml` in the output dir.
+
+    """
+    def __init__(self, name="Pregenerator"):
+        """
+        Set parser arguments.
+
+        .. note::
+
+            Calls the base :py:class:`miprometheus.workers.Worker` constructor (setting up the logger, \
+            application state and parameter registry), but without the default parser arguments.
+
+        :param name: Name of the worker (Default: "Pregenerator").
+        :type name: str
+
+        """
+        # Call base constructor to set up app state, registry and add default params.
+        super(Pregenerator, self).__init__(name=name, add_default_parser_args=False)
+
+        # Add arguments to the specific parser.
+        self.parser.add_argument('--config',
+                                 dest='config',
+                                 type=str,
+                                 default='',
+                                 help='Name of the configuration file(s) to be loaded. '
+                                      'If specifying more than one file, they must be separated with coma ",".')
+
+        self.parser.add_argument('--section',
+                                 dest='section',
+                                 type=str,
+                                 default='training',
+                                 choices=['training', 'validation', 'testing'],
+                                 help='Section of the configuration containing the problem (DEFAULT: training)')
+
+        self.parser.add_argument('--outdir',
+                                 dest='outdir',
+                                 type=str,
+                                 default='',
+                                 help='Path to the output directory where the samples will be stored.')
+
+        self.parser.add_argument('--samples',
+                                 dest='samples',
+                                 type=int,
+                                 default=-1,
+                                 help='Number of samples to generate (DEFAULT: -1, i.e. size of the problem)')
+
+        self.parser.add_argument('--batch_size',
+                                 dest='batch_size',
+                                 type=int,
+                                 default=-1,
+                                 help='Number of samples generated at once, should be equal to the batch size '
+                                      'used later (DEFAULT: -1, i.e. batch size of the problem)')
+
+    def run(self):
+        """
+        Generates and stores the samples.
+
+            - Parses command line arguments.
+
+            - Loads the configuration and sets the random seeds.
+
+            - Builds the problem (generating the samples on the fly).
+
+            - Generates the samples and stores them in the output dir.
+
+        """
+        # Parse arguments.
+        self.flags, self.unparsed = self.parser.parse_known_args()
+
+        # Display results of parsing.
+        self.display_parsing_results()
+
+        # Check the arguments.
+        if self.flags.config == '':
+            self.logger.error('Please pass configuration file(s) as --c parameter.')
+            exit(-1)
+
+        if self.flags.outdir == '':
+            self.logger.error('Please set the output directory (--outdir).')
+            exit(-2)
+        outdir = os.path.expanduser(self.flags.outdir)
+
+        # Load the configuration.
+        self.recurrent_config_load(self.recurrent_config_parse(self.flags.config, []))
+        params = self.params[self.flags.section]
+
+        # The samples must be generated.
+        params['problem'].add_config_params({'generation_mode': 'optimized'})
+
+        # Set the seeds - the same as the ones used by the workers in that section.
+        self.set_random_seeds(params, self.flags.section)
+
+        # Build the problem.
+        problem = ProblemFactory.build(params['problem'])
+        if not isinstance(problem, AlgorithmicSeqToSeqProblem):
+            self.logger.error("Only the algorithmic problems can be pregenerated, '{}' is not one of them".format(
+                params['problem']['name']))
+            exit(-3)
+
+        if not problem.supports_pregeneration():
+            self.logger.error("Problem '{}' does not implement generate_batch and cannot be pregenerated".format(
+                params['problem']['name']))
+            exit(-4)
+
+        num_samples = self.flags.samples if self.flags.samples > 0 else len(problem)
+        batch_size = self.flags.batch_size if self.flags.batch_size > 0 else params['problem']['batch_size']
+
+        self.logger.info("Generating {} samples of {} in batches of size {}".format(
+            num_samples, problem.name, batch_size))
+
+        # Generate and store the samples.
+        problem.pregenerate(outdir, num_samples, batch_size)
+
+        # Store the configuration (including the seeds) used for generation.
+        with open(os.path.join(outdir, 'config.yaml'), 'w') as yaml_file:
+            yaml.safe_dump(self.params.to_dict(), yaml_file, default_flow_style=False)
+        # Finished.
+
+
+def main():
+    """
+    Entry point function for the :py:class:`Pregenerator`.
+
+    """
+    worker = Pregenerator()
+    # parse args and generate the samples.
+    worker.run()
+
+
+if __name__ == '__main__':
+
+    main()
@@ -1,22 +1,19 @@
-# Sequential models.
-from .controllers import *
+from miprometheus.utils.lazy_import import lazy_package
 
-# MANN models.
-from .dnc import *
-from .dwm import *
-from .encoder_solver import *
-from .lstm import *
-from .ntm import *
-from .thalnet import *
-
-# VQA models.
-from .mac import *
-from .s_mac import *
-from .relational_net import *
-from .vision import *
-from .vqa_baselines import *
-
-# Other imports.
-from .model import Model
-from .model_factory import ModelFactory
-from .sequential_model import SequentialModel
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'Model': '.model',
+                                                'ModelFactory': '.model_factory',
+                                                'SequentialModel': '.sequential_model'},
+                                    subpackages=['.controllers',
+                                                 '.dnc',
+                                                 '.dwm',
+                                                 '.encoder_solver',
+                                                 '.lstm',
+                                                 '.ntm',
+                                                 '.thalnet',
+                                                 '.mac',
+                                                 '.s_mac',
+                                                 '.relational_net',
+                                                 '.vision',
+                                                 '.vqa_baselines'])
@@ -22,6 +22,7 @@ import numpy as np
 import torch
 
 import logging
+from miprometheus.utils.checkpointing import checkpoint_sequence
 from miprometheus.models.sequential_model import SequentialModel
 from miprometheus.models.dnc.dnc_cell import DNCCell
 
@@ -48,6 +49,8 @@ class DNC(SequentialModel):
         super(DNC, self).__init__(params, problem_default_values_)
         # Model name.
         self.name = 'DNC'
+        # The cell state can be carried over windows of the sequences.
+        self.supports_truncated_bptt = True
 
         # Parse default values received from problem and add them to registry.
         self.params.add_default_params({
@@ -69,32 +72,23 @@ class DNC(SequentialModel):
         # Create the DNC components
         self.DNCCell = DNCCell(self.output_units, params)
 
-    def forward(self, data_dict):
+    def init_cell_state(self, data_dict):
         """
-        Forward function requires that the data_dict will contain at least "sequences"
+        Creates the initial state of the DNC cell.
 
         :param data_dict: DataDict containing at least:
             - "sequences": a tensor of input data of size [BATCH_SIZE x LENGTH_SIZE x INPUT_SIZE]
 
-        :returns: Predictions (logits) being a tensor of size  [BATCH_SIZE x LENGTH_SIZE x OUTPUT_SIZE].
+        :returns: Initial state of the DNC cell.
 
         """
-         # Get dtype.
-        dtype = self.app_state.dtype
-
         # Unpack dict.
         inputs = data_dict['sequences']
-        
+
         # Get batch size and seq length.
         batch_size = inputs.size(0)
         seq_length = inputs.size(1)
 
-        output = None
-
-        if self.app_state.visualize:
-            self.cell_state_history = []
-
-
         memory_addresses_size = self.memory_addresses_size
 
         # if memory size is not fixed, set it to the total input plus output
@@ -103,33 +97,69 @@ class DNC(SequentialModel):
             memory_addresses_size = seq_length
 
         # init state
-        cell_state = self.DNCCell.init_state(memory_addresses_size, batch_size)
-
-        #cell_state = self.init_state(memory_addresses_size)
-        for j in range(seq_length):
-            output_cell, cell_state = self.DNCCell(
-                inputs[..., j, :], cell_state)
-
-            if output_cell is None:
-                continue
-
-            output_cell = output_cell[..., None, :]
-            if output is None:
-                output = output_cell
-            else:
-                output = torch.cat([output, output_cell], dim=-2)
-
-            # This is for the time plot
-            if self.app_state.visualize:
-                self.cell_state_history.append(
-                    (cell_state.memory_state.detach().cpu().numpy(),
-                     cell_state.int_init_state.usage.detach().cpu().numpy(),
-                     cell_state.int_init_state.links.precedence_weights.detach().cpu().numpy(),
-                     cell_state.int_init_state.read_weights.detach().cpu().numpy(),
-                     cell_state.int_init_state.write_weights.detach().cpu().numpy()))
-
-            # if self.plot_active:
-            #    self.plot_memory_attention(output, cell_state)
+        return self.DNCCell.init_state(memory_addresses_size, batch_size)
+
+    def forward(self, data_dict):
+        """
+        Forward function requires that the data_dict will contain at least "sequences"
+
+        :param data_dict: DataDict containing at least:
+            - "sequences": a tensor of input data of size [BATCH_SIZE x LENGTH_SIZE x INPUT_SIZE]
+
+        :returns: Predictions (logits) being a tensor of size  [BATCH_SIZE x LENGTH_SIZE x OUTPUT_SIZE].
+
+        """
+        # Unpack dict.
+        inputs = data_dict['sequences']
+        
+        # Get seq length.
+        seq_length = inputs.size(1)
+
+        output = None
+
+        if self.app_state.visualize and not self.carry_cell_state:
+            self.cell_state_history = []
+
+        # init (or take the carried) state
+        cell_state = self.get_initial_cell_state(data_dict)
+
+        # Get the compiled or eager cell.
+        cell = self.get_cell(self.DNCCell)
+
+        if self.use_gradient_checkpointing():
+            # Process the sequence in segments, recomputing the cell internals in the backward pass.
+            outputs, cell_state = checkpoint_sequence(
+                lambda t, state, x: cell(x[..., t, :], state),
+                cell_state, seq_length, self.checkpoint_segment_size, (inputs,))
+            output = torch.stack(outputs, dim=-2)
+        else:
+            for j in range(seq_length):
+                output_cell, cell_state = cell(
+                    inputs[..., j, :], cell_state)
+
+                if output_cell is None:
+                    continue
+
+                output_cell = output_cell[..., None, :]
+                if output is None:
+                    output = output_cell
+                else:
+                    output = torch.cat([output, output_cell], dim=-2)
+
+                # This is for the time plot
+                if self.app_state.visualize:
+                    self.cell_state_history.append(
+                        (cell_state.memory_state.detach().cpu().numpy(),
+                         cell_state.int_init_state.usage.detach().cpu().numpy(),
+                         cell_state.int_init_state.links.precedence_weights.detach().cpu().numpy(),
+                         cell_state.int_init_state.read_weights.detach().cpu().numpy(),
+                         cell_state.int_init_state.write_weights.detach().cpu().numpy()))
+
+                # if self.plot_active:
+                #    self.plot_memory_attention(output, cell_state)
+
+        # Carry the final state over to the next window (truncated BPTT only).
+        self.update_carried_cell_state(cell_state)
 
         return output
 
@@ -22,6 +22,7 @@ import torch
 import logging
 import numpy as np
 
+from miprometheus.utils.checkpointing import checkpoint_sequence
 from miprometheus.models.sequential_model import SequentialModel
 from miprometheus.models.dwm.dwm_cell import DWMCell
 
@@ -51,6 +52,8 @@ class DWM(SequentialModel):
         super(DWM, self).__init__(params, problem_default_values_)
         # Model name.
         self.name = "Differentiable Working Memory (DWM)"
+        # The cell state can be carried over windows of the sequences.
+        self.supports_truncated_bptt = True
 
         # Parse default values received from problem and add them to registry.
         self.params.add_default_params({
@@ -83,6 +86,37 @@ class DWM(SequentialModel):
             self.num_shift,
             self.M)
 
+    def init_cell_state(self, data_dict):
+        """
+        Creates the initial state of the DWM cell.
+
+        :param data_dict: DataDict containing at least:
+            - "sequences": a tensor of input data of size [BATCH_SIZE x LENGTH_SIZE x INPUT_SIZE]
+
+        :returns: Initial state of the DWM cell.
+
+        """
+        # Unpack dict.
+        inputs = data_dict['sequences']
+
+        # Get batch size and seq length.
+        batch_size = inputs.size(0)
+        seq_length = inputs.size(-2)
+
+        # The length of the memory is set to be equal to the input length in
+        # case ```self.memory_addresses_size == -1```
+        if self.memory_addresses_size == -1:
+            if seq_length < self.num_shift:
+                # memory size can't be smaller than num_shift (see
+                # circular_convolution implementation)
+                memory_addresses_size = self.num_shift
+            else:
+                memory_addresses_size = seq_length  # a hack for now
+        else:
+            memory_addresses_size = self.memory_addresses_size
+
+        return self.DWMCell.init_state(memory_addresses_size, batch_size)
+
     def forward(self, data_dict):
         """
         Forward function requires that the data_dict will contain at least "sequences"
@@ -101,17 +135,13 @@ class DWM(SequentialModel):
         >>> output = dwm(data_tuple)
 
         """
-         # Get dtype.
-        #dtype = self.app_state.dtype
-
         # Unpack dict.
         inputs = data_dict['sequences']
         
-        # Get batch size and seq length.
-        batch_size = inputs.size(0)
+        # Get seq length.
         seq_length = inputs.size(-2)
 
-        if self.app_state.visualize:
+        if self.app_state.visualize and not self.carry_cell_state:
             self.cell_state_history = []
 
         output = None
@@ -119,43 +149,44 @@ class DWM(SequentialModel):
         if len(inputs.size()) == 4:
             inputs = inputs[:, 0, :, :]
 
-        # The length of the memory is set to be equal to the input length in
-        # case ```self.memory_addresses_size == -1```
-        if self.memory_addresses_size == -1:
-            if seq_length < self.num_shift:
-                # memory size can't be smaller than num_shift (see
-                # circular_convolution implementation)
-                memory_addresses_size = self.num_shift
-            else:
-                memory_addresses_size = seq_length  # a hack for now
-        else:
-            memory_addresses_size = self.memory_addresses_size
-
-        # Init state
-        cell_state = self.DWMCell.init_state(memory_addresses_size, batch_size)
+        # Init (or take the carried) state
+        cell_state = self.get_initial_cell_state(data_dict)
 
         # loop over the different sequences
-        for j in range(seq_length):
-            output_cell, cell_state = self.DWMCell(
-                inputs[..., j, :], cell_state)
-
-            if output_cell is None:
-                continue
-
-            output_cell = output_cell[..., None, :]
-            if output is None:
-                output = output_cell
-
-            # Concatenate output
-            else:
-                output = torch.cat([output, output_cell], dim=-2)
-
-            # This is for the time plot
-            if self.app_state.visualize:
-                self.cell_state_history.append(
-                    (cell_state.memory_state.detach().numpy(),
-                     cell_state.interface_state.head_weight.detach().numpy(),
-                     cell_state.interface_state.snapshot_weight.detach().numpy()))
+        # Get the compiled or eager cell.
+        cell = self.get_cell(self.DWMCell)
+
+        if self.use_gradient_checkpointing():
+            # Process the sequence in segments, recomputing the cell internals in the backward pass.
+            outputs, cell_state = checkpoint_sequence(
+                lambda t, state, x: cell(x[..., t, :], state),
+                cell_state, seq_length, self.checkpoint_segment_size, (inputs,))
+            output = torch.stack(outputs, dim=-2)
+        else:
+            for j in range(seq_length):
+                output_cell, cell_state = cell(
+                    inputs[..., j, :], cell_state)
+
+                if output_cell is None:
+                    continue
+
+                output_cell = output_cell[..., None, :]
+                if output is None:
+                    output = output_cell
+
+                # Concatenate output
+                else:
+                    output = torch.cat([output, output_cell], dim=-2)
+
+                # This is for the time plot
+                if self.app_state.visualize:
+                    self.cell_state_history.append(
+                        (cell_state.memory_state.detach().numpy(),
+                         cell_state.interface_state.head_weight.detach().numpy(),
+                         cell_state.interface_state.snapshot_weight.detach().numpy()))
+
+        # Carry the final state over to the next window (truncated BPTT only).
+        self.update_carried_cell_state(cell_state)
 
         return output
 
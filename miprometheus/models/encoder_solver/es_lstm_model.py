@@ -23,12 +23,18 @@ import torch
 from torch import nn
 
 from miprometheus.models.sequential_model import SequentialModel
+from miprometheus.utils.fused_lstm import FusedLSTM
 
 
 class EncoderSolverLSTM(SequentialModel):
     """
     Class representing the Encoder-Solver architecture using LSTM cells as both
     encoder and solver modules.
+
+    By default, every segment of the sequence processed by the same module (encoder or solver) is processed \
+    by a single ``torch.nn.LSTM`` call (see :py:class:`miprometheus.utils.fused_lstm.FusedLSTM`), sharing \
+    the parameters with the ``torch.nn.LSTMCell``. The step-by-step execution is used when ``fused_lstm`` is \
+    set to ``False`` or when the visualization is active.
     """
 
     def __init__(self, params, problem_default_values_={}):
@@ -74,6 +80,61 @@ class EncoderSolverLSTM(SequentialModel):
 
         self.modes = Enum('Modes', ['Encode', 'Solve'])
 
+        # Optional: process whole segments with a single call (not registered as submodules).
+        params.add_default_params({'fused_lstm': True})
+        if params['fused_lstm']:
+            self.fused_lstms = {self.modes.Encode: FusedLSTM([self.encoder], self.logger),
+                                self.modes.Solve: FusedLSTM([self.solver], self.logger)}
+        else:
+            self.fused_lstms = None
+
+    def use_fused_lstm(self):
+        """
+        Checks whether the segments of the sequences should be processed by the fused LSTMs.
+
+        :return: True if the fused LSTMs should be used.
+
+        """
+        return self.fused_lstms is not None and self.fused_lstms[self.modes.Encode].is_available() \
+            and not self.app_state.visualize
+
+    def get_mode_segments(self, inputs_BxSxI):
+        """
+        Splits the sequences into segments processed by the same module, on the basis of the control bits \
+        of the first sample in the batch (as done in the step-by-step execution).
+
+        :param inputs_BxSxI: a tensor of input data of size [BATCH_SIZE x LENGTH_SIZE x INPUT_SIZE]
+
+        :returns: List of segments [mode, first item, last item + 1].
+
+        :raises: ValueError if the control bits do not indicate a valid mode.
+
+        """
+        control_bits = inputs_BxSxI[0, :, [self.encoding_bit, self.solving_bit]].tolist()
+
+        segments = []
+        mode = None
+        for i, (encoding, solving) in enumerate(control_bits):
+            # Switch between the encoder and decoder modes. It will stay in
+            # this mode till it hits the opposite kind of marker
+            if solving and not encoding:
+                mode = self.modes.Solve
+            elif encoding and not solving:
+                mode = self.modes.Encode
+            elif encoding and solving:
+                self.logger.error('Both encoding and decoding bits were true (item {})'.format(i))
+                raise ValueError('Both encoding and decoding bits were true (item {})'.format(i))
+            elif mode is None:
+                self.logger.error('The first item of the sequence must contain the encoding or decoding bit')
+                raise ValueError('The first item of the sequence must contain the encoding or decoding bit')
+
+            if segments and segments[-1][0] == mode:
+                segments[-1][2] = i + 1
+            else:
+                segments.append([mode, i, i + 1])
+
+        return segments
+
     def init_state(self, batch_size):
         """
         Returns 'zero' (initial) state.
@@ -117,6 +178,16 @@ class EncoderSolverLSTM(SequentialModel):
         # Initialize state variables.
         (h, c) = self.init_state(batch_size)
 
+        if self.use_fused_lstm():
+            # Process the segments at once, passing the state from one module to the other.
+            hx = (h.unsqueeze(0), c.unsqueeze(0))
+            h_segments = []
+            for mode, start, end in self.get_mode_segments(inputs_BxSxI):
+                h_BxSxH, hx = self.fused_lstms[mode](inputs_BxSxI[:, start:end], hx)
+                h_segments.append(h_BxSxH)
+
+            return self.output(torch.cat(h_segments, dim=1))
+
         # Logits container.
         logits = []
 
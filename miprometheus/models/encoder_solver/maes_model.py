@@ -18,7 +18,6 @@
 """maes_model.py: File containing Memory Augmented Encoder-Solver model class."""
 __author__ = "Tomasz Kornuta"
 
-from enum import Enum
 import torch
 
 from miprometheus.utils.data_dict import DataDict
@@ -32,10 +31,10 @@ class MAES(SequentialModel):
     """
     Class implementing the Memory Augmented Encoder-Solver (MAES) model.
 
-    ..warning:
-        Class assumes, that the whole batch has the same length, i.e. batch of subsequences
-        becoming input to encoder is of the same length (ends at the same item).
-        The same goes to subsequences being input to decoder.
+    .. note::
+        Every sample switches from encoding to solving on its own, i.e. at the first item with the
+        solving bit on (and the encoding bit off). Hence the encoding subsequences in the batch
+        can have different lengths.
 
     """
 
@@ -53,6 +52,8 @@ class MAES(SequentialModel):
         super(MAES, self).__init__(params, problem_default_values_)
         # Model name.
         self.name = 'MAES'
+        # The cell state can be carried over windows of the sequences.
+        self.supports_truncated_bptt = True
 
         # Parse default values received from problem and add them to registry.
         self.params.add_default_params({
@@ -95,12 +96,7 @@ class MAES(SequentialModel):
         # Create the Decoder/Solver.
         self.solver = MASCell(params)
 
-        # Operation modes.
-        self.modes = Enum('Modes', ['Encode', 'Solve'])
-
-
-
-    def save(self, model_dir, training_status, training_stats, validation_stats):
+    def save(self, model_dir, training_status, training_stats, validation_stats, optimizer=None):
         """
         Generic method saving the model parameters to file. It can be \
         overloaded if one needs more control.
@@ -117,11 +113,15 @@ class MAES(SequentialModel):
         :param validation_stats: Validation statistics that will be saved to checkpoint along with the model.
         :type validation_stats: :py:class:miprometheus.utils.StatisticsCollector or :py:class:miprometheus.utils.StatisticsAggregator
 
+        :param optimizer: Optimizer whose state will be saved to checkpoint along with the model, optional.
+        :type optimizer: ``torch.optim.Optimizer``
+
         :return: True if this is currently the best model (until the current episode, considering the loss).
 
         """
         # Call the case method to save the whole model.
-        is_best_model = super(MAES, self).save(model_dir, training_status, training_stats, validation_stats)
+        is_best_model = super(MAES, self).save(model_dir, training_status, training_stats, validation_stats,
+                                                optimizer)
 
         # Additionally, if flag is set to True, save the encoder.
         if self.save_encoder:
@@ -130,14 +130,14 @@ class MAES(SequentialModel):
 
         return is_best_model
 
-    def forward(self, data_dict):
+    def init_cell_state(self, data_dict):
         """
-        Forward function requires that the data_dict will contain at least "sequences"
+        Creates the initial state of the model, i.e. a tuple (solving flags, encoder state, solver state).
 
         :param data_dict: DataDict containing at least:
             - "sequences": a tensor of input data of size [BATCH_SIZE x LENGTH_SIZE x INPUT_SIZE]
 
-        :returns: Predictions (logits) being a tensor of size  [BATCH_SIZE x LENGTH_SIZE x OUTPUT_SIZE].
+        :returns: Tuple (solving flags [BATCH_SIZE], encoder state, solver state).
 
         """
         # Get dtype.
@@ -168,48 +168,137 @@ class MAES(SequentialModel):
         encoder_state = self.encoder.init_state(init_memory_BxAxC)
         solver_state = None  # For now, it will be set during execution.
 
-        # Start as encoder.
-        mode = self.modes.Encode
+        # All samples start as encoder.
+        solving_B = torch.zeros(batch_size, dtype=torch.bool, device=inputs_BxSxI.device)
+
+        return (solving_B, encoder_state, solver_state)
+
+    def init_solver_state(self, encoder_state):
+        """
+        Initializes the solver state on the basis of the (final) encoder state.
+
+        :param encoder_state: Encoder state.
+
+        :returns: Solver state.
+
+        """
+        if self.pass_cell_state:
+            # Initialize solver state with final encoder state.
+            return self.solver.init_state_with_encoder_state(encoder_state)
+        else:
+            # Initialize solver state - with final state of memory and
+            # final attention only.
+            return self.solver.init_state(
+                encoder_state.memory_state, encoder_state.interface_state.attention)
+
+    def forward(self, data_dict):
+        """
+        Forward function requires that the data_dict will contain at least "sequences"
+
+        .. note::
+
+            The positions where the samples switch from encoder to solver are computed once for the whole batch, \
+            so the loop does not synchronize with the device in every step. Before the first switch only \
+            the encoder is run, after the last switch only the solver. In between both are run and their \
+            outputs and states are selected per sample.
+
+        :param data_dict: DataDict containing at least:
+            - "sequences": a tensor of input data of size [BATCH_SIZE x LENGTH_SIZE x INPUT_SIZE]
+
+        :returns: Predictions (logits) being a tensor of size  [BATCH_SIZE x LENGTH_SIZE x OUTPUT_SIZE].
+
+        """
+        # Unpack dict.
+        inputs_BxSxI = data_dict['sequences']
+        seq_length = inputs_BxSxI.size(1)
+
+        # Get the initial (or carried) solving flags and states.
+        solving_B, encoder_state, solver_state = self.get_initial_cell_state(data_dict)
+
+        # Control bits of all items [BATCH_SIZE x LENGTH_SIZE].
+        encoding_bits_BxS = inputs_BxSxI[:, :, self.encoding_bit] != 0
+        solving_bits_BxS = inputs_BxSxI[:, :, self.solving_bit] != 0
+
+        if (encoding_bits_BxS & solving_bits_BxS).any():
+            self.logger.error('Two control bits were on:\n {}'.format(inputs_BxSxI))
+            exit(-1)
+
+        # Items switching to (i.e. (re)initializing) the solver.
+        switches_BxS = solving_bits_BxS & ~encoding_bits_BxS
+        # Items processed by the solver.
+        solving_BxS = (switches_BxS.long().cumsum(1) > 0) | solving_B.unsqueeze(1)
+
+        # Get the segments - with a single transfer to host.
+        any_solving_S, all_solving_S, any_switch_S = \
+            torch.stack([solving_BxS.any(0), solving_BxS.all(0), switches_BxS.any(0)]).tolist()
+        # First step processed by the solver (for any sample).
+        first_solving = any_solving_S.index(True) if True in any_solving_S else seq_length
+        # First step processed by the solver for all samples.
+        all_solving = all_solving_S.index(True) if True in all_solving_S else seq_length
 
         # Logits container.
         logits = []
 
-        for x in inputs_BxSxI.chunk(inputs_BxSxI.size(1), dim=1):
-            # Squeeze x.
-            x = x.squeeze(1)
-
-            # Switch between the encoder and solver modes.
-            if x[0, self.solving_bit] and not x[0, self.encoding_bit]:
-                mode = self.modes.Solve
-                if self.pass_cell_state:
-                    # Initialize solver state with final encoder state.
-                    solver_state = self.solver.init_state_with_encoder_state(
-                        encoder_state)
-                else:
-                    # Initialize solver state - with final state of memory and
-                    # final attention only.
-                    solver_state = self.solver.init_state(
-                        encoder_state.memory_state, encoder_state.interface_state.attention)
-
-            elif x[0, self.encoding_bit] and x[0, self.solving_bit]:
-                self.logger.error('Two control bits were on:\n {}'.format(x))
-                exit(-1)
-
-            # Run encoder or solver - depending on the state.
-            if mode == self.modes.Encode:
+        for t, x in enumerate(inputs_BxSxI.unbind(1)):
+            if t < first_solving:
+                # All samples are encoding.
                 logit, encoder_state = self.encoder(x, encoder_state)
-            elif mode == self.modes.Solve:
+                logits += [logit]
+                continue
+
+            # (Re)initialize solver state of the switching samples.
+            if solver_state is None:
+                solver_state = self.init_solver_state(encoder_state)
+            elif any_switch_S[t]:
+                solver_state = select_state(switches_BxS[:, t], self.init_solver_state(encoder_state), solver_state)
+
+            if t < all_solving:
+                # Mixed batch: run both and select the results per sample.
+                encoder_logit, new_encoder_state = self.encoder(x, encoder_state)
+                solver_logit, solver_state = self.solver(x, solver_state)
+
+                # Freeze the encoder state of the solving samples.
+                encoder_state = select_state(solving_BxS[:, t], encoder_state, new_encoder_state)
+                logit = torch.where(solving_BxS[:, t].unsqueeze(1), solver_logit, encoder_logit)
+            else:
+                # All samples are solving.
                 logit, solver_state = self.solver(x, solver_state)
 
             # Collect logits from both encoder and solver - they will be masked
             # afterwards.
             logits += [logit]
 
+        # Carry the final flags and states over to the next window (truncated BPTT only).
+        self.update_carried_cell_state((solving_BxS[:, -1], encoder_state, solver_state))
+
         # Stack logits along the temporal (sequence) axis.
         logits = torch.stack(logits, 1)
         return logits
 
 
+def select_state(mask_B, state_true, state_false):
+    """
+    Recursively selects the elements of two cell states (of the same structure) per sample.
+
+    :param mask_B: Selection mask [BATCH_SIZE].
+
+    :param state_true: State whose elements are taken where ``mask_B`` is True.
+
+    :param state_false: State whose elements are taken where ``mask_B`` is False.
+
+    :returns: Cell state.
+
+    """
+    if isinstance(state_true, torch.Tensor):
+        mask = mask_B.view([-1] + [1] * (state_true.dim() - 1))
+        return torch.where(mask, state_true, state_false)
+    elif isinstance(state_true, tuple) and hasattr(state_true, '_fields'):
+        return type(state_true)(*[select_state(mask_B, t, f) for t, f in zip(state_true, state_false)])
+    elif isinstance(state_true, (tuple, list)):
+        return type(state_true)(select_state(mask_B, t, f) for t, f in zip(state_true, state_false))
+    return state_true
+
+
 if __name__ == "__main__":
     # Set logging level.
     import logging
@@ -1,3 +1,5 @@
-from .lstm_model import LSTM
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['LSTM']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'LSTM': '.lstm_model'})
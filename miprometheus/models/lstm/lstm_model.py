@@ -22,12 +22,18 @@ import torch
 from torch import nn
 
 from miprometheus.models.sequential_model import SequentialModel
+from miprometheus.utils.fused_lstm import FusedLSTM
 
 
 class LSTM(SequentialModel):
     """
     Class implementing the Long Short-Term Memory model.
 
+    By default, the whole sequence is processed by a single multi-layer ``torch.nn.LSTM`` call (see \
+    :py:class:`miprometheus.utils.fused_lstm.FusedLSTM`), sharing the parameters with the ``torch.nn.LSTMCell`` \
+    layers. The step-by-step execution is used when ``fused_lstm`` is set to ``False`` or when the \
+    visualization is active.
+
     """
     def __init__(self, params, problem_default_values_={}):
         """
@@ -66,6 +72,19 @@ class LSTM(SequentialModel):
         # Output linear layer.
         self.linear = nn.Linear(self.hidden_state_size, self.output_item_size)
 
+        # Optional: process whole sequences with a single call (not registered as a submodule).
+        params.add_default_params({'fused_lstm': True})
+        self.fused_lstm = FusedLSTM(self.lstm_layers, self.logger) if params['fused_lstm'] else None
+
+    def use_fused_lstm(self):
+        """
+        Checks whether the whole sequences should be processed by the fused LSTM.
+
+        :return: True if the fused LSTM should be used.
+
+        """
+        return self.fused_lstm is not None and self.fused_lstm.is_available() and not self.app_state.visualize
+
     def forward(self, data_dict):
         """
         Forward function requires that the data_dict will contain at least "sequences"
@@ -82,6 +101,11 @@ class LSTM(SequentialModel):
         # Unpack dict.
         inputs_BxSxI = data_dict['sequences']
 
+        if self.use_fused_lstm():
+            # Process the whole sequences at once, starting from zero states.
+            h_BxSxH, _ = self.fused_lstm(inputs_BxSxI)
+            return self.linear(h_BxSxH)
+
         # Get batch size.
         batch_size = inputs_BxSxI.size(0)
 
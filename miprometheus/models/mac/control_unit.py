@@ -84,7 +84,32 @@ class ControlUnit(Module):
         self.attn = linear(dim, 1, bias=True)
         self.step = 0
 
-    def forward(self, step, contextual_words, question_encoding, ctrl_state):
+        self.dim = dim
+        self.max_step = max_step
+
+    def project_question(self, question_encoding):
+        """
+        Computes the step-invariant part of the control unit for all steps at once: the 'position aware' \
+        projections of the questions (a single matmul with the concatenated weights of all \
+        ``pos_aware_layers``), projected further by the question half of ``ctrl_question``.
+
+        :param question_encoding: question representation, of shape [batch_size x 2*dim].
+        :type question_encoding: torch.tensor
+
+        :return: projections of the questions, [batch_size x max_step x dim]
+
+        """
+        weight = torch.cat([layer.weight for layer in self.pos_aware_layers], dim=0)
+        bias = torch.cat([layer.bias for layer in self.pos_aware_layers], dim=0)
+
+        # [batch_size x max_step x dim]
+        pos_aware_question_encodings = torch.nn.functional.linear(
+            question_encoding, weight, bias).view(-1, self.max_step, self.dim)
+
+        return torch.nn.functional.linear(pos_aware_question_encodings,
+                                          self.ctrl_question.weight[:, self.dim:], self.ctrl_question.bias)
+
+    def forward(self, step, contextual_words, question_encoding, ctrl_state, question_projections=None):
         """
         Forward pass of the ``ControlUnit``.
 
@@ -102,17 +127,27 @@ class ControlUnit(Module):
         :param ctrl_state: previous control state, of shape [batch_size x dim]
         :type ctrl_state: torch.tensor
 
+        :param question_projections: (Optional) projections of the questions for all steps, \
+        returned by :py:func:`project_question`.
+        :type question_projections: torch.tensor
+
         :return: new control state, [batch_size x dim]
 
         """
         self.step = step
-        # select current 'position aware' linear layer & pass questions through
-        # it
-        pos_aware_question_encoding = self.pos_aware_layers[step](
-            question_encoding)
 
-        cqi = torch.cat([ctrl_state, pos_aware_question_encoding], dim=-1)
-        cqi = self.ctrl_question(cqi)  # [batch_size x dim]
+        if question_projections is not None:
+            # only the control state half of ctrl_question depends on the step
+            cqi = torch.nn.functional.linear(
+                ctrl_state, self.ctrl_question.weight[:, :self.dim]) + question_projections[:, step]
+        else:
+            # select current 'position aware' linear layer & pass questions through
+            # it
+            pos_aware_question_encoding = self.pos_aware_layers[step](
+                question_encoding)
+
+            cqi = torch.cat([ctrl_state, pos_aware_question_encoding], dim=-1)
+            cqi = self.ctrl_question(cqi)  # [batch_size x dim]
 
         # compute element-wise product between cqi & contextual words
         # [batch_size x maxQuestionLength x dim]
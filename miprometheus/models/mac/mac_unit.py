@@ -51,6 +51,7 @@ from torch.nn import Module
 from miprometheus.models.mac.control_unit import ControlUnit
 from miprometheus.models.mac.read_unit import ReadUnit
 from miprometheus.models.mac.write_unit import WriteUnit
+from miprometheus.utils.checkpointing import checkpoint_sequence
 from miprometheus.utils.app_state import AppState
 app_state = AppState()
 
@@ -61,7 +62,7 @@ class MACUnit(Module):
     """
 
     def __init__(self, dim, max_step=12, self_attention=False,
-                 memory_gate=False, dropout=0.15):
+                 memory_gate=False, dropout=0.15, checkpoint_segment_size=-1):
         """
         Constructor for the ``MACUnit``, which represents the recurrence over the \
         MACCell.
@@ -81,6 +82,10 @@ class MACUnit(Module):
         :param dropout: dropout probability for the variational dropout mask. Default: 0.15
         :type dropout: float
 
+        :param checkpoint_segment_size: number of MAC cells in a single gradient checkpointing segment. \
+        Default: -1 (checkpointing disabled).
+        :type checkpoint_segment_size: int
+
         """
 
         # call base constructor
@@ -100,6 +105,10 @@ class MACUnit(Module):
         self.dim = dim
         self.max_step = max_step
         self.dropout = dropout
+        self.checkpoint_segment_size = checkpoint_segment_size
+
+        # Compute the step-invariant projections (of the questions and of the knowledge base) once per batch.
+        self.hoist_projections = True
 
         self.cell_state_history = []
 
@@ -150,6 +159,7 @@ class MACUnit(Module):
         memory = self.mem_0.expand(batch_size, self.dim)
 
         # apply variational dropout during training
+        control_mask = memory_mask = None
         if self.training:  # TODO: check
             control_mask = self.get_dropout_mask(control, self.dropout)
             memory_mask = self.get_dropout_mask(memory, self.dropout)
@@ -160,41 +170,162 @@ class MACUnit(Module):
         controls = [control]
         memories = [memory]
 
+        # step-invariant projections, used by all MAC cells
+        question_projections = kb_concat = None
+        if self.hoist_projections:
+            question_projections = self.control.project_question(question)
+            kb_concat = self.read.project_knowledge_base(knowledge)
+
         # main loop of recurrence over the MACCell
-        for i in range(self.max_step):
+        if self.checkpoint_segment_size > 0 and self.training and torch.is_grad_enabled() \
+                and not app_state.visualize:
+            # recompute the MAC cells in the backward pass, segment by segment
+            _, (controls, memories) = checkpoint_sequence(
+                lambda i, state, *inputs: (None, self.step(i, state, *inputs)),
+                (controls, memories), self.max_step, self.checkpoint_segment_size,
+                (context, question, knowledge, kb_proj, control_mask, memory_mask,
+                 question_projections, kb_concat))
+        else:
+            for i in range(self.max_step):
+                controls, memories = self.step(
+                    i, (controls, memories), context, question, knowledge, kb_proj,
+                    control_mask, memory_mask, question_projections, kb_concat)
+
+                # store attention weights for visualization
+                if app_state.visualize:
+                    self.cell_state_history.append(
+                        (self.read.rvi.cpu().detach(), self.control.cvi.cpu().detach()))
+
+        return memories[-1]
+
+    def step(self, i, state, context, question, knowledge, kb_proj, control_mask=None, memory_mask=None,
+             question_projections=None, kb_concat=None):
+        """
+        Single step of the recurrence, i.e. a pass through the MACCell.
 
-            # control unit
-            control = self.control(
-                step=i,
-                contextual_words=context,
-                question_encoding=question,
-                ctrl_state=control)
+        :param i: index of the current MAC cell.
+        :type i: int
 
-            # apply variational dropout
-            if self.training:
-                control = control * control_mask
+        :param state: tuple (list of the control states, list of the memory states).
 
-            # save new control state
-            controls.append(control)
+        :param context: contextual words, shape [batch_size x maxQuestionLength x dim]
+        :type context: torch.tensor
 
-            # read unit
-            read = self.read(memory_states=memories, knowledge_base=knowledge,
-                             ctrl_states=controls, kb_proj=kb_proj)
+        :param question: questions encodings, shape [batch_size x 2*dim]
+        :type question: torch.tensor
 
-            # write unit
-            memory = self.write(memory_states=memories,
-                                read_vector=read, ctrl_states=controls)
+        :param knowledge: knowledge_base (feature maps extracted by a CNN), shape \
+        [batch_size x nb_kernels x (feat_H * feat_W)].
+        :type knowledge: torch.tensor
 
-            # apply variational dropout
-            if self.training:
-                memory = memory * memory_mask
+        :param control_mask: variational dropout mask of the control state (``None`` outside of training).
 
-            # save new memory state
-            memories.append(memory)
+        :param memory_mask: variational dropout mask of the memory state (``None`` outside of training).
 
-            # store attention weights for visualization
-            if app_state.visualize:
-                self.cell_state_history.append(
-                    (self.read.rvi.cpu().detach(), self.control.cvi.cpu().detach()))
+        :param question_projections: projections of the questions for all steps \
+        (see :py:func:`ControlUnit.project_question`), ``None`` to compute them in the cell.
+
+        :param kb_concat: projection of the knowledge base (see :py:func:`ReadUnit.project_knowledge_base`), \
+        ``None`` to compute it in the cell.
+
+        :return: tuple (list of the control states, list of the memory states).
+
+        """
+        controls, memories = state
+
+        # control unit
+        control = self.control(
+            step=i,
+            contextual_words=context,
+            question_encoding=question,
+            ctrl_state=controls[-1],
+            question_projections=question_projections)
+
+        # apply variational dropout
+        if control_mask is not None:
+            control = control * control_mask
+
+        # save new control state
+        controls = controls + [control]
+
+        # read unit
+        read = self.read(memory_states=memories, knowledge_base=knowledge,
+                         ctrl_states=controls, kb_proj=kb_proj, kb_concat=kb_concat)
+
+        # write unit
+        memory = self.write(memory_states=memories,
+                            read_vector=read, ctrl_states=controls)
+
+        # apply variational dropout
+        if memory_mask is not None:
+            memory = memory * memory_mask
 
-        return memory
+        # save new memory state
+        memories = memories + [memory]
+
+        return controls, memories
+
+
+if __name__ == '__main__':
+    """ Benchmark: compares the number of steps (MAC cells) per second of the MAC and S-MAC units on \
+    CLEVR-sized inputs, with and without hoisting the step-invariant projections out of the recurrence."""
+    import time
+    from miprometheus.models.s_mac.s_mac_unit import MACUnit as SMACUnit
+
+    app_state.visualize = False
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    if device.type == 'cuda':
+        app_state.convert_cuda_types()
+
+    # CLEVR: 14x14 feature maps (ResNet101, 4 blocks), questions of up to ~45 words.
+    batch_size = 64
+    dim = 512
+    max_step = 12
+    question_length = 45
+    kb_size = 14 * 14
+    iterations = 20
+    warmup_iterations = 3
+
+    context = torch.randn(batch_size, question_length, dim, device=device)
+    question = torch.randn(batch_size, 2 * dim, device=device)
+    knowledge = torch.randn(batch_size, dim, kb_size, device=device)
+    kb_proj = torch.randn(batch_size, dim, kb_size, device=device)
+
+    units = {'MAC': (MACUnit(dim, max_step, self_attention=True, memory_gate=True),
+                     lambda unit: unit(context, question, knowledge, kb_proj)),
+             'S-MAC': (SMACUnit(dim, max_step),
+                       lambda unit: unit(context, question, kb_proj))}
+
+    print('Batch size: {}, dim: {}, max_step: {}, device: {}'.format(batch_size, dim, max_step, device))
+
+    for name, (unit, run) in units.items():
+        unit.to(device)
+
+        for training in [False, True]:
+            unit.train(training)
+
+            for hoist in [False, True]:
+                unit.hoist_projections = hoist
+
+                def iteration():
+                    if training:
+                        run(unit).sum().backward()
+                    else:
+                        with torch.no_grad():
+                            run(unit)
+
+                for _ in range(warmup_iterations):
+                    iteration()
+                if device.type == 'cuda':
+                    torch.cuda.synchronize()
+
+                start = time.time()
+                for _ in range(iterations):
+                    iteration()
+                if device.type == 'cuda':
+                    torch.cuda.synchronize()
+                elapsed = time.time() - start
+
+                print('{:>6} {:>10} hoisted projections: {:<5} {:10.1f} steps/s'.format(
+                    name, 'training' if training else 'inference', str(hoist),
+                    iterations * max_step / elapsed))
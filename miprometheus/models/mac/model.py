@@ -88,6 +88,9 @@ class MACNetwork(Model):
         self.self_attention = params['self_attention']
         self.memory_gate = params['memory_gate']
         self.dropout = params['dropout']
+        # Optional: number of MAC cells in a single gradient checkpointing segment (-1: disabled).
+        params.add_default_params({'checkpoint_segment_size': -1})
+        self.checkpoint_segment_size = params['checkpoint_segment_size']
 
         try:
             self.nb_classes = problem_default_values_['nb_classes']
@@ -105,7 +108,8 @@ class MACNetwork(Model):
             max_step=self.max_step,
             self_attention=self.self_attention,
             memory_gate=self.memory_gate,
-            dropout=self.dropout)
+            dropout=self.dropout,
+            checkpoint_segment_size=self.checkpoint_segment_size)
 
         self.output_unit = OutputUnit(dim=self.dim, nb_classes=self.nb_classes)
 
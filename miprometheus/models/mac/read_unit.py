@@ -77,7 +77,23 @@ class ReadUnit(Module):
         # linear layer to compute attention weights
         self.attn = linear(dim, 1, bias=True)
 
-    def forward(self, memory_states, knowledge_base, ctrl_states, kb_proj):
+        self.dim = dim
+
+    def project_knowledge_base(self, knowledge_base):
+        """
+        Computes the step-invariant part of the r2 equation: projection of the knowledge base by \
+        the knowledge base half of ``concat_layer`` (including the bias).
+
+        :param knowledge_base: image representation (output of CNN), shape [batch_size x nb_kernels x (feat_H * feat_W)]
+        :type knowledge_base: torch.tensor
+
+        :return: projection of the knowledge base, shape [batch_size x (H*W) x dim]
+
+        """
+        return torch.nn.functional.linear(knowledge_base.permute(0, 2, 1),
+                                          self.concat_layer.weight[:, self.dim:], self.concat_layer.bias)
+
+    def forward(self, memory_states, knowledge_base, ctrl_states, kb_proj, kb_concat=None):
         """
         Forward pass of the ``ReadUnit``. Assuming 1 scalar attention weight per \
         knowledge base elements.
@@ -91,6 +107,10 @@ class ReadUnit(Module):
         :param ctrl_states: All previous control state, each of shape [batch_size x ctrl_dim].
         :type ctrl_states: list
 
+        :param kb_concat: (Optional) projection of the knowledge base returned by \
+        :py:func:`project_knowledge_base`.
+        :type kb_concat: torch.tensor
+
 
         :return: current read vector, shape [batch_size x read_dim]
 
@@ -110,9 +130,14 @@ class ReadUnit(Module):
         I_elements = memory_state * kb_proj
 
         # compute I' elements (r2 equation)
-        concat = self.concat_layer(
-            torch.cat([I_elements, knowledge_base],
-                      dim=1).permute(0, 2, 1))  # [batch_size x (H*W) x dim]
+        if kb_concat is not None:
+            # only the I elements half of concat_layer depends on the step
+            concat = torch.nn.functional.linear(
+                I_elements.permute(0, 2, 1), self.concat_layer.weight[:, :self.dim]) + kb_concat
+        else:
+            concat = self.concat_layer(
+                torch.cat([I_elements, knowledge_base],
+                          dim=1).permute(0, 2, 1))  # [batch_size x (H*W) x dim]
 
         # compute attention weights
         rai = self.attn(concat * ctrl_state.unsqueeze(1)
@@ -21,6 +21,8 @@ model.py: contains base abstract model class. All models should subclass it.
 """
 __author__ = "Tomasz Kornuta & Vincent Marois"
 
+import os
+import yaml
 import torch
 import logging
 import numpy as np
@@ -121,6 +123,11 @@ class Model(Module):
         params.add_default_params({"save_intermediate": False})
         self.save_intermediate = params["save_intermediate"]
 
+        # Flag indicating whether the last checkpoint (overwritten at every save) should be saved or
+        # not (DEFAULT: False).
+        params.add_default_params({"save_last": False})
+        self.save_last = params["save_last"]
+
         # process all params from configuration file and problem_default_values_ here
         try:
             for key in problem_default_values_.keys():
@@ -318,7 +325,7 @@ class Model(Module):
 
         """
 
-    def save(self, model_dir, training_status, training_stats, validation_stats):
+    def save(self, model_dir, training_status, training_stats, validation_stats, optimizer=None):
         """
         Generic method saving the model parameters to file. It can be \
         overloaded if one needs more control.
@@ -337,9 +344,17 @@ class Model(Module):
         :type validation_stats: :py:class:`miprometheus.utils.StatisticsCollector` or \
         :py:class:`miprometheus.utils.StatisticsAggregator`
 
+        :param optimizer: Optimizer whose state will be saved to checkpoint along with the model, optional \
+        (DEFAULT: None).
+        :type optimizer: ``torch.optim.Optimizer``
+
         :return: True if this is currently the best model (until the current episode, considering the loss).
 
         """
+        # In distributed mode only the master process writes checkpoints.
+        if self.app_state.rank != 0:
+            return False
+
         # Process validation statistics, get the episode and loss.
         if validation_stats.__class__.__name__ == 'StatisticsCollector':
             # Get data from collector.
@@ -363,13 +378,25 @@ class Model(Module):
                  'validation_stats': validation_stats.export_to_checkpoint()
                 }
 
+        # Save the state of the optimizer, so the training can be resumed.
+        if optimizer is not None:
+            chkpt['optimizer'] = optimizer.state_dict()
+
         # Save the intermediate checkpoint.
         if self.save_intermediate:
             filename = model_dir + 'model_episode_{:05d}.pt'.format(episode)
             torch.save(chkpt, filename)
+            self.save_metadata(chkpt, filename)
             self.logger.info(
                 "Model and statistics exported to checkpoint {}".format(filename))
 
+        # Save the last checkpoint.
+        if self.save_last:
+            filename = model_dir + 'model_last.pt'
+            torch.save(chkpt, filename)
+            self.save_metadata(chkpt, filename)
+            self.logger.info("Model and statistics exported to checkpoint {}".format(filename))
+
         # Save the best model.
         loss = loss.cpu()  # moving loss value to cpu type to allow (initial) comparison with numpy type
         if loss < self.best_loss:
@@ -379,6 +406,7 @@ class Model(Module):
             # Save checkpoint.
             filename = model_dir + 'model_best.pt'
             torch.save(chkpt, filename)
+            self.save_metadata(chkpt, filename)
             self.logger.info("Model and statistics exported to checkpoint {}".format(filename))
             return True
         elif self.best_status != training_status:
@@ -390,10 +418,45 @@ class Model(Module):
             chkpt_loaded['status_timestamp'] = datetime.now()
             # Save updated checkpoint.
             torch.save(chkpt_loaded, filename)
+            self.save_metadata(chkpt_loaded, filename)
             self.logger.info("Updated training status in checkpoint {}".format(filename))
         # Else: that was not the best model.
         return False
 
+    @staticmethod
+    def get_metadata_filename(checkpoint_file):
+        """
+        Returns the name of the file containing the metadata of the checkpoint.
+
+        :param checkpoint_file: Name of the checkpoint file (e.g. 'models/model_best.pt').
+        :type checkpoint_file: str
+
+        :return: Name of the metadata file (e.g. 'models/model_best.yaml').
+
+        """
+        return os.path.splitext(checkpoint_file)[0] + '.yaml'
+
+    def save_metadata(self, chkpt, checkpoint_file):
+        """
+        Saves the content of the checkpoint apart of the model state (i.e. name, timestamps, episode, loss, \
+        status and statistics) in a lightweight yaml file next to the checkpoint, so it can be read without \
+        deserializing the weights (e.g. by the :py:class:`miprometheus.grid_workers.GridAnalyzer`).
+
+        :param chkpt: Checkpoint dictionary.
+        :type chkpt: dict
+
+        :param checkpoint_file: Name of the checkpoint file.
+        :type checkpoint_file: str
+
+        """
+        metadata = {key: value for key, value in chkpt.items() if key not in ['state_dict', 'optimizer']}
+        # Convert the tensors/numpy types to python ones.
+        metadata['episode'] = int(metadata['episode'])
+        metadata['loss'] = float(metadata['loss'])
+
+        with open(self.get_metadata_filename(checkpoint_file), 'w') as yaml_file:
+            yaml.safe_dump(metadata, yaml_file, default_flow_style=False)
+
     def load(self, checkpoint_file):
         """
         Loads a model from the specified checkpoint file.
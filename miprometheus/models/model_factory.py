@@ -70,7 +70,7 @@ class ModelFactory(object):
             logger.error("Could not find the specified class '{}' in the models package.".format(name))
             exit(-1)
 
-        # Get the actual class.
+        # Get the actual class (imports only the module defining it).
         model_class = getattr(models, name)
 
         # Check if class is derived (even indirectly) from Model.
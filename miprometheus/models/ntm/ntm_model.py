@@ -23,6 +23,7 @@ import logging
 import numpy as np
 
 from miprometheus.utils.data_dict import DataDict
+from miprometheus.utils.checkpointing import checkpoint_sequence
 from miprometheus.models.sequential_model import SequentialModel
 from miprometheus.models.ntm.ntm_cell import NTMCell
 
@@ -45,6 +46,8 @@ class NTM(SequentialModel):
         super(NTM, self).__init__(params, problem_default_values_)
         # Model name.
         self.name = 'NTM'
+        # The cell state can be carried over windows of the sequences.
+        self.supports_truncated_bptt = True
 
         # Parse default values received from problem and add them to registry.
         self.params.add_default_params({
@@ -73,14 +76,14 @@ class NTM(SequentialModel):
              # I.e. show default vizualization.
             pass
 
-    def forward(self, data_dict):
+    def init_cell_state(self, data_dict):
         """
-        Forward function requires that the data_dict will contain at least "sequences"
+        Creates the initial ('zero') state of the NTM cell.
 
         :param data_dict: DataDict containing at least:
             - "sequences": a tensor of input data of size [BATCH_SIZE x LENGTH_SIZE x INPUT_SIZE]
 
-        :returns: Predictions (logits) being a tensor of size  [BATCH_SIZE x LENGTH_SIZE x OUTPUT_SIZE].
+        :returns: Initial state of the NTM cell (``NTMCellStateTuple``).
 
         """
          # Get dtype.
@@ -110,27 +113,60 @@ class NTM(SequentialModel):
         # Initialize 'zero' state.
         cell_state = self.ntm_cell.init_state(init_memory_BxAxC)
 
-        # List of output logits [BATCH_SIZE x OUTPUT_SIZE] of length SEQ_LENGTH
-        output_logits_BxO_S = []
+        # Remember the initial state for the visualization purposes.
+        if self.app_state.visualize:
+            self.cell_state_initial = cell_state
+
+        return cell_state
+
+    def forward(self, data_dict):
+        """
+        Forward function requires that the data_dict will contain at least "sequences"
+
+        :param data_dict: DataDict containing at least:
+            - "sequences": a tensor of input data of size [BATCH_SIZE x LENGTH_SIZE x INPUT_SIZE]
+
+        :returns: Predictions (logits) being a tensor of size  [BATCH_SIZE x LENGTH_SIZE x OUTPUT_SIZE].
+
+        """
+        # Unpack dict.
+        inputs_BxSxI = data_dict['sequences']
 
         # Check if we want to collect cell history for the visualization
-        # purposes.
-        if self.app_state.visualize:
+        # purposes (in truncated BPTT mode it is collected over all windows).
+        if self.app_state.visualize and not self.carry_cell_state:
             self.cell_state_history = []
-            self.cell_state_initial = cell_state
 
-        # Divide sequence into chunks of size [BATCH_SIZE x INPUT_SIZE] and
-        # process them one by one.
-        for input_t_Bx1xI in inputs_BxSxI.chunk(inputs_BxSxI.size(1), dim=1):
-            # Process one chunk.
-            output_BxO, cell_state = self.ntm_cell(
-                input_t_Bx1xI.squeeze(1), cell_state)
-            # Append to list of logits.
-            output_logits_BxO_S += [output_BxO]
-
-            # Collect cell history - for the visualization purposes.
-            if self.app_state.visualize:
-                self.cell_state_history.append(cell_state)
+        # Get the 'zero' (or carried) state.
+        cell_state = self.get_initial_cell_state(data_dict)
+
+        # List of output logits [BATCH_SIZE x OUTPUT_SIZE] of length SEQ_LENGTH
+        output_logits_BxO_S = []
+
+        # Get the compiled or eager cell.
+        cell = self.get_cell(self.ntm_cell)
+
+        if self.use_gradient_checkpointing():
+            # Process the sequence in segments, recomputing the cell internals in the backward pass.
+            output_logits_BxO_S, cell_state = checkpoint_sequence(
+                lambda t, state, inputs: cell(inputs[:, t], state),
+                cell_state, inputs_BxSxI.size(1), self.checkpoint_segment_size, (inputs_BxSxI,))
+        else:
+            # Divide sequence into chunks of size [BATCH_SIZE x INPUT_SIZE] and
+            # process them one by one.
+            for input_t_Bx1xI in inputs_BxSxI.chunk(inputs_BxSxI.size(1), dim=1):
+                # Process one chunk.
+                output_BxO, cell_state = cell(
+                    input_t_Bx1xI.squeeze(1), cell_state)
+                # Append to list of logits.
+                output_logits_BxO_S += [output_BxO]
+
+                # Collect cell history - for the visualization purposes.
+                if self.app_state.visualize:
+                    self.cell_state_history.append(cell_state)
+
+        # Carry the final state over to the next window (truncated BPTT only).
+        self.update_carried_cell_state(cell_state)
 
         # Stack logits along time axis (1).
         output_logits_BxSxO = torch.stack(output_logits_BxO_S, 1)
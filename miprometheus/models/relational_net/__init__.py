@@ -1,6 +1,8 @@
-from .conv_input_model import ConvInputModel
-from .functions import PairwiseRelationNetwork, SumOfPairsAnalysisNetwork
-from .relational_network import RelationalNetwork
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['ConvInputModel', 'PairwiseRelationNetwork',
-           'SumOfPairsAnalysisNetwork', 'RelationalNetwork']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'ConvInputModel': '.conv_input_model',
+                                                'PairwiseRelationNetwork': '.functions',
+                                                'SumOfPairsAnalysisNetwork': '.functions',
+                                                'RelationalNetwork': '.relational_network'})
@@ -107,7 +107,26 @@ class ControlUnit(Module):
 
         self.step = 0
 
-    def forward(self, step, contextual_words, question_encoding, ctrl_state):
+        self.dim = dim
+        self.max_step = max_step
+
+    def project_question(self, question_encoding):
+        """
+        Computes the 'position aware' projections of the questions for all steps at once, with a single \
+        matmul with the concatenated weights of all ``pos_aware_layers``.
+
+        :param question_encoding: question representation, of shape `[batch_size x 2*dim]`.
+        :type question_encoding: :py:class:`torch.Tensor`
+
+        :return: projections of the questions, `[batch_size x max_step x dim]` (:py:class:`torch.Tensor`)
+
+        """
+        weight = torch.cat([layer.weight for layer in self.pos_aware_layers], dim=0)
+        bias = torch.cat([layer.bias for layer in self.pos_aware_layers], dim=0)
+
+        return torch.nn.functional.linear(question_encoding, weight, bias).view(-1, self.max_step, self.dim)
+
+    def forward(self, step, contextual_words, question_encoding, ctrl_state, question_projections=None):
         """
         Forward pass of the :py:class:`ControlUnit` for the ``S-MAC`` network.
 
@@ -124,14 +143,21 @@ class ControlUnit(Module):
         :param ctrl_state: previous control state, of shape `[batch_size x dim]`
         :type ctrl_state: :py:class:`torch.Tensor`
 
+        :param question_projections: (Optional) projections of the questions for all steps, \
+        returned by :py:func:`project_question`.
+        :type question_projections: :py:class:`torch.Tensor`
+
         :return: new control state, `[batch_size x dim]` (:py:class:`torch.Tensor`)
 
         """
         self.step = step
-        # select current 'position aware' linear layer & pass questions through
-        # it
-        pos_aware_question_encoding = self.pos_aware_layers[step](
-            question_encoding)
+        if question_projections is not None:
+            pos_aware_question_encoding = question_projections[:, step]
+        else:
+            # select current 'position aware' linear layer & pass questions through
+            # it
+            pos_aware_question_encoding = self.pos_aware_layers[step](
+                question_encoding)
 
         # create cqi values from projection of control state & question encoding (element-wise sum)
         cqi = self.ctrl_question(ctrl_state) + pos_aware_question_encoding
@@ -117,6 +117,9 @@ class MACUnit(Module):
         self.max_step = max_step
         self.dropout = dropout
 
+        # Compute the 'position aware' projections of the questions once per batch.
+        self.hoist_projections = True
+
         # for the visualization
         self.cell_state_history = []
 
@@ -174,12 +177,15 @@ class MACUnit(Module):
             control = control * control_mask
             memory = memory * memory_mask
 
+        # step-invariant projections of the questions, used by all MAC cells
+        question_projections = self.control.project_question(question) if self.hoist_projections else None
+
         # main loop of recurrence over the MACCell
         for i in range(self.max_step):
 
             # control unit
             control = self.control(step=i, contextual_words=context, question_encoding=question,
-                                   ctrl_state=control)
+                                   ctrl_state=control, question_projections=question_projections)
 
             # apply variational dropout
             if self.training:
@@ -22,9 +22,34 @@ import torch
 import numpy as np
 
 from miprometheus.models.model import Model
+from miprometheus.utils.cell_compilation import compile_cell
 from miprometheus.utils.data_dict import DataDict
 
 
+def detach_cell_state(cell_state):
+    """
+    Recursively detaches all tensors of a (possibly nested) cell state from the computational graph.
+
+    .. note::
+
+        Named tuples are recreated with the same type, elements of other types (e.g. ``None``, enums) \
+        are returned as they are.
+
+
+    :param cell_state: Tensor, (named) tuple or list.
+
+    :return: Detached cell state of the same structure.
+
+    """
+    if isinstance(cell_state, torch.Tensor):
+        return cell_state.detach()
+    elif isinstance(cell_state, tuple) and hasattr(cell_state, '_fields'):
+        return type(cell_state)(*[detach_cell_state(s) for s in cell_state])
+    elif isinstance(cell_state, (tuple, list)):
+        return type(cell_state)(detach_cell_state(s) for s in cell_state)
+    return cell_state
+
+
 class SequentialModel(Model):
     """
     Class representing base class for all Sequential Models.
@@ -59,6 +84,137 @@ class SequentialModel(Model):
                                  'targets': {'size': [-1, -1, -1], 'type': [torch.Tensor]}
                                  }
 
+        # Truncated backpropagation through time (BPTT): models supporting it set this flag and
+        # redefine ``init_cell_state()``.
+        self.supports_truncated_bptt = False
+
+        # Flag indicating whether the final cell state should be carried over to the next forward call.
+        self.carry_cell_state = False
+        self.carried_cell_state = None
+
+        # Gradient checkpointing: number of steps in a single checkpointed segment (-1 disables it).
+        params.add_default_params({'checkpoint_segment_size': -1})
+        self.checkpoint_segment_size = params['checkpoint_segment_size']
+
+        # Optional: run the recurrent cells compiled with torch.compile.
+        params.add_default_params({'compile_cell': False})
+        self.compile_cell = params['compile_cell']
+        # Compiled cells are kept in a dictionary, so they are not registered as submodules.
+        self.compiled_cells = {}
+
+    def get_cell(self, cell):
+        """
+        Returns the cell which should be used in the forward pass: compiled (when the ``compile_cell`` flag \
+        is set) or the original (eager) one.
+
+        .. note::
+
+            The eager cell is used when the visualization is active, as the cell state history \
+            is collected step by step.
+
+
+        :param cell: Recurrent cell (submodule of the model).
+        :type cell: ``torch.nn.Module``
+
+        :return: Compiled or original cell.
+
+        """
+        if not self.compile_cell or self.app_state.visualize:
+            return cell
+
+        # Compile the cell on first use.
+        if cell not in self.compiled_cells:
+            self.compiled_cells[cell] = compile_cell(cell, self.logger)
+        return self.compiled_cells[cell]
+
+    def use_gradient_checkpointing(self):
+        """
+        Checks whether the recurrence should be run with gradient checkpointing, i.e. whether it was \
+        enabled in the configuration and gradients are actually computed.
+
+        .. note::
+
+            Checkpointing is not used when the visualization is active, as the cell state history \
+            is collected step by step.
+
+
+        :return: True if gradient checkpointing should be used.
+
+        """
+        return self.checkpoint_segment_size > 0 and self.training and torch.is_grad_enabled() \
+            and not self.app_state.visualize
+
+    def init_cell_state(self, data_dict):
+        """
+        Creates the initial cell state for a given batch.
+
+        .. note::
+
+            Empty - To be redefined in the models supporting truncated BPTT.
+
+
+        :param data_dict: DataDict containing the whole (i.e. not truncated) batch of sequences.
+
+        :return: Initial cell state.
+
+        """
+        raise NotImplementedError('Model {} does not support truncated BPTT'.format(self.name))
+
+    def start_truncated_bptt(self, data_dict):
+        """
+        Initializes the cell state on the basis of the whole batch and enables carrying it \
+        over consecutive forward calls (i.e. windows of the sequences).
+
+        :param data_dict: DataDict containing the whole (i.e. not truncated) batch of sequences.
+
+        """
+        self.carried_cell_state = self.init_cell_state(data_dict)
+        self.carry_cell_state = True
+
+        # Collect the history of all windows.
+        if self.app_state.visualize:
+            self.cell_state_history = []
+
+    def detach_carried_cell_state(self):
+        """
+        Detaches the carried cell state from the computational graph, i.e. truncates the backpropagation \
+        at the border of the current window.
+
+        """
+        self.carried_cell_state = detach_cell_state(self.carried_cell_state)
+
+    def stop_truncated_bptt(self):
+        """
+        Disables carrying the cell state over forward calls.
+
+        """
+        self.carry_cell_state = False
+        self.carried_cell_state = None
+
+    def get_initial_cell_state(self, data_dict):
+        """
+        Returns the state the forward pass should start from: the carried one (in truncated BPTT mode) \
+        or a freshly initialized one.
+
+        :param data_dict: DataDict containing the batch (or window) of sequences.
+
+        :return: Cell state.
+
+        """
+        if self.carry_cell_state:
+            return self.carried_cell_state
+        return self.init_cell_state(data_dict)
+
+    def update_carried_cell_state(self, cell_state):
+        """
+        Stores the final cell state of the forward pass - in truncated BPTT mode only.
+
+        :param cell_state: Final cell state.
+
+        """
+        if self.carry_cell_state:
+            self.carried_cell_state = cell_state
+
     def plot(self, data_dict, predictions, sample=0):
         """
         Creates a default interactive visualization, with a slider enabling to
@@ -1,5 +1,7 @@
-from .thalnet_cell import ThalNetCell
-from .thalnet_model import ThalNetModel
-from .thalnet_module import ThalnetModule
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['ThalNetCell', 'ThalNetModel', 'ThalnetModule']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'ThalNetCell': '.thalnet_cell',
+                                                'ThalNetModel': '.thalnet_model',
+                                                'ThalnetModule': '.thalnet_module'})
@@ -23,6 +23,7 @@ __author__ = "Younes Bouhadjar & Vincent Marois"
 import torch
 from torch.nn import Module
 from miprometheus.models.thalnet.thalnet_module import ThalnetModule
+from miprometheus.models.controllers.ffgru_controller import FFGRUStateTuple
 
 
 class ThalNetCell(Module):
@@ -31,6 +32,10 @@ class ThalNetCell(Module):
 
     It is constituted of several ``ThalNetModule``.
 
+    In the fused mode, the modules are not executed one after another: their weights are stacked along \
+    a module dimension and all modules are executed at once with batched matrix multiplications \
+    (see :py:func:`get_fused_weights`), producing the same outputs and states.
+
     """
 
     def __init__(self,
@@ -38,7 +43,8 @@ class ThalNetCell(Module):
                  output_size: int,
                  context_input_size: int,
                  center_size_per_module: int,
-                 num_modules: int):
+                 num_modules: int,
+                 fused: bool = False):
         """
         Constructor of the ``ThalNetCell`` class.
 
@@ -57,6 +63,9 @@ class ThalNetCell(Module):
         :param num_modules: number of modules to constitute the cell.
         :type num_modules: int
 
+        :param fused: If ``True``, executes all modules at once with batched matrix multiplications.
+        :type fused: bool
+
         """
         # Call base class inits here.
         super(ThalNetCell, self).__init__()
@@ -67,6 +76,7 @@ class ThalNetCell(Module):
         self.center_size = num_modules * center_size_per_module
         self.center_size_per_module = center_size_per_module
         self.num_modules = num_modules
+        self.fused = fused
 
         # init module-center cell
         self.modules_thalnet = torch.nn.ModuleList()
@@ -108,7 +118,134 @@ class ThalNetCell(Module):
 
         return states
 
-    def forward(self, inputs, prev_state):
+    def get_fused_weights(self):
+        """
+        Stacks the weights of all modules along a new (first) module dimension:
+
+            - weights of the (weight normalized) reading mechanisms,
+            - weights of the feedforward layers of the controllers, split into the context part (common to all \
+            modules) and the input part (only the first module reads the inputs),
+            - weights of the GRU cells of the controllers, padded to the biggest hidden state size (the one of \
+            the last module, producing the outputs). Padding is done per gate with zeros, so the padded units \
+            of the hidden states remain zero.
+
+        .. note::
+
+            The stacked weights are computed from the parameters of the modules (which remain the only \
+            parameters of the cell, so the ``state_dict`` is not affected). As the parameters change after \
+            every optimization step, call it once per forward pass of the model and pass the result to \
+            :py:func:`forward` for all elements of the sequence.
+
+        :return: Dictionary of stacked weights.
+
+        """
+        modules = self.modules_thalnet
+        hidden_size = max(module.controller_hidden_size for module in modules)
+
+        def pad_gates(weight, size):
+            # Pads each of the 3 gates (r, z, n) of the GRU weight/bias separately.
+            gates = weight.view(3, size, -1)
+            gates = torch.nn.functional.pad(gates, (0, 0, 0, hidden_size - size))
+            return gates.view(3 * hidden_size, -1)
+
+        # Weight normalization: w = g * v / ||v||, computed as in torch.nn.utils.weight_norm.
+        fc_weights = [module.fc_context.weight_v * (module.fc_context.weight_g /
+                                                    module.fc_context.weight_v.norm(2, dim=1, keepdim=True))
+                      for module in modules]
+
+        gru_weights_hh = []
+        for module in modules:
+            size = module.controller_hidden_size
+            weight_hh = pad_gates(module.controller.gru.weight_hh, size)
+            gru_weights_hh.append(torch.nn.functional.pad(weight_hh, (0, hidden_size - size)))
+
+        return {
+            'hidden_size': hidden_size,
+            # [NUM_MODULES x CENTER_SIZE x CONTEXT_SIZE]
+            'fc_weight': torch.stack(fc_weights).transpose(1, 2),
+            'fc_bias': torch.stack([module.fc_context.bias for module in modules]).unsqueeze(1),
+            # [NUM_MODULES x CONTEXT_SIZE x FF_OUTPUT_SIZE]
+            'ff_weight': torch.stack([module.controller.ff.weight[:, module.input_size:]
+                                      for module in modules]).transpose(1, 2),
+            'ff_bias': torch.stack([module.controller.ff.bias for module in modules]).unsqueeze(1),
+            # [INPUT_SIZE x FF_OUTPUT_SIZE]
+            'ff_input_weight': modules[0].controller.ff.weight[:, :self.input_size].t(),
+            # [NUM_MODULES x FF_OUTPUT_SIZE x 3 * HIDDEN_SIZE]
+            'gru_weight_ih': torch.stack([pad_gates(module.controller.gru.weight_ih, module.controller_hidden_size)
+                                          for module in modules]).transpose(1, 2),
+            'gru_bias_ih': torch.stack([pad_gates(module.controller.gru.bias_ih, module.controller_hidden_size)
+                                        for module in modules]).transpose(1, 2),
+            # [NUM_MODULES x HIDDEN_SIZE x 3 * HIDDEN_SIZE]
+            'gru_weight_hh': torch.stack(gru_weights_hh).transpose(1, 2),
+            'gru_bias_hh': torch.stack([pad_gates(module.controller.gru.bias_hh, module.controller_hidden_size)
+                                        for module in modules]).transpose(1, 2)
+        }
+
+    def fused_forward(self, inputs, prev_state, weights):
+        """
+        Forward run of all modules at once, with batched matrix multiplications.
+
+        :param inputs: inputs at time t, [batch_size, input_size]
+        :type inputs: torch.tensor
+
+        :param prev_state: previous state (list of per-module tuples, as returned by :py:func:`init_state`)
+
+        :param weights: Stacked weights returned by :py:func:`get_fused_weights`.
+        :type weights: dict
+
+        :return: prediction [batch_size, output_size] (or None), states
+
+        """
+        if inputs is not None and inputs.dim() == 3:
+            # inputs_size : [batch_size, num_channel, input_size] - select channel
+            inputs = inputs[:, 0, :]
+
+        hidden_size = weights['hidden_size']
+
+        # Concatenate all the centers: [batch_size x center_size].
+        prev_center_states = torch.cat([prev_state[i][0] for i in range(self.num_modules)], dim=1)
+
+        # Stack the (padded) controller states: [num_modules x batch_size x hidden_size].
+        prev_hidden_states = torch.stack([
+            torch.nn.functional.pad(prev_state[i][1].hidden_state,
+                                    (0, hidden_size - module.controller_hidden_size))
+            for i, module in enumerate(self.modules_thalnet)])
+
+        # Reading mechanism of all modules: [num_modules x batch_size x context_size].
+        context_inputs = torch.matmul(prev_center_states, weights['fc_weight']) + weights['fc_bias']
+
+        # Feedforward layers of the controllers, the first module also reads the inputs.
+        ff_outputs = torch.matmul(context_inputs, weights['ff_weight']) + weights['ff_bias']
+        if self.input_size:
+            ff_outputs = torch.cat([ff_outputs[:1] + torch.matmul(inputs, weights['ff_input_weight']),
+                                    ff_outputs[1:]])
+
+        # GRU cells of the controllers.
+        gates_i = torch.baddbmm(weights['gru_bias_ih'], ff_outputs, weights['gru_weight_ih'])
+        gates_h = torch.baddbmm(weights['gru_bias_hh'], prev_hidden_states, weights['gru_weight_hh'])
+        i_r, i_z, i_n = gates_i.chunk(3, dim=2)
+        h_r, h_z, h_n = gates_h.chunk(3, dim=2)
+
+        reset_gate = torch.sigmoid(i_r + h_r)
+        update_gate = torch.sigmoid(i_z + h_z)
+        new_gate = torch.tanh(i_n + reset_gate * h_n)
+        hidden_states = new_gate + update_gate * (prev_hidden_states - new_gate)
+
+        # Unstack the states.
+        output = None
+        states = []
+        for i, module in enumerate(self.modules_thalnet):
+            module_state = hidden_states[i, :, :module.controller_hidden_size]
+            if module.output_size:
+                output, center_feature = torch.split(
+                    module_state, [module.output_size, self.center_size_per_module], dim=1)
+            else:
+                output, center_feature = None, module_state
+            states.append((center_feature, FFGRUStateTuple(module_state)))
+
+        return output, states
+
+    def forward(self, inputs, prev_state, fused_weights=None):
         """
         forward run of the ``ThalNetCell``.
 
@@ -118,12 +255,21 @@ class ThalNetCell(Module):
         :param prev_state: previous state [batch_size, state_size]
         :type prev_state: torch.tensor
 
+        :param fused_weights: (Fused mode only) stacked weights returned by :py:func:`get_fused_weights` \
+        (DEFAULT: None, i.e. stack the weights in this call).
+        :type fused_weights: dict
+
         :return:
 
             - states [batch_size, state_size]
             - prediction [batch_size, output_size]
 
         """
+        if self.fused:
+            if fused_weights is None:
+                fused_weights = self.get_fused_weights()
+            return self.fused_forward(inputs, prev_state, fused_weights)
+
         prev_center_states = [prev_state[i][0]
                               for i in range(self.num_modules)]
         prev_controller_states = [prev_state[i][1]
@@ -27,6 +27,7 @@ __author__ = "Younes Bouhadjar & Vincent Marois"
 import torch
 import numpy as np
 
+from miprometheus.utils.checkpointing import checkpoint_sequence
 from miprometheus.models.sequential_model import SequentialModel
 from miprometheus.models.thalnet.thalnet_cell import ThalNetCell
 
@@ -70,6 +71,9 @@ class ThalNetModel(SequentialModel):
         self.center_size_per_module = params['center_size_per_module']
         self.num_modules = params['num_modules']
         self.output_center_size = self.output_size + self.center_size_per_module
+        # Optional: execute all modules at once, with batched matrix multiplications.
+        params.add_default_params({'fused_modules': False})
+        self.fused_modules = params['fused_modules']
 
         # This is for the time plot
         self.cell_state_history = None
@@ -80,16 +84,32 @@ class ThalNetModel(SequentialModel):
             self.output_size,
             self.context_input_size,
             self.center_size_per_module,
-            self.num_modules)
+            self.num_modules,
+            self.fused_modules)
 
         # model name
         self.name = 'ThalNetModel'
+        # The cell state can be carried over windows of the sequences.
+        self.supports_truncated_bptt = True
 
         # Expected content of the inputs
         self.data_definitions = {'sequences': {'size': [-1, -1, -1], 'type': [torch.Tensor]},
                                  'targets': {'size': [-1, -1, -1], 'type': [torch.Tensor]}
                                  }
 
+    def init_cell_state(self, data_dict):
+        """
+        Creates the initial state of the ``ThalNetCell``.
+
+        :param data_dict: DataDict({'sequences', ...}) where 'sequences' is of shape \
+         [batch_size, sequence_length, input_size]
+        :type data_dict: utils.DataDict
+
+        :returns: Initial state of the ``ThalNetCell``.
+
+        """
+        return self.ThalnetCell.init_state(data_dict['sequences'].size(0))
+
     def forward(self, data_dict):  # x : batch_size, seq_len, input_size
         """
         Forward run of the ThalNetModel model.
@@ -103,37 +123,64 @@ class ThalNetModel(SequentialModel):
         """
         inputs = data_dict['sequences']
 
-        if self.app_state.visualize:
+        if self.app_state.visualize and not self.carry_cell_state:
             self.cell_state_history = []
 
         output = None
-        batch_size = inputs.size(0)
         seq_length = inputs.size(-2)
 
-        # init state
-        cell_state = self.ThalnetCell.init_state(batch_size)
-        for j in range(seq_length):
-            output_cell, cell_state = self.ThalnetCell(
-                inputs[..., j, :], cell_state)
-
-            if output_cell is None:
-                continue
-
-            output_cell = output_cell[..., None, :]
-            if output is None:
-                output = output_cell
-
-            # concatenate output
-            else:
-                output = torch.cat([output, output_cell], dim=-2)
-
-            # This is for the time plot
-            if self.app_state.visualize:
-                self.cell_state_history.append(
-                    [cell_state[i][0].detach().numpy()
-                     for i in range(self.num_modules)] +
-                    [cell_state[i][1].hidden_state.detach().numpy()
-                     for i in range(self.num_modules)])
+        # init (or take the carried) state
+        cell_state = self.get_initial_cell_state(data_dict)
+
+        # Stack the weights of the modules once for the whole sequence.
+        fused_weights = self.ThalnetCell.get_fused_weights() if self.fused_modules else None
+
+        if self.use_gradient_checkpointing():
+            # The stacked weights require gradients, so they must be passed to the segments as context tensors
+            # (the other entries, e.g. sizes, are kept in the closure).
+            fused_tensors = {}
+            if fused_weights is not None:
+                fused_tensors = {key: value for key, value in fused_weights.items()
+                                 if isinstance(value, torch.Tensor)}
+            fused_keys = list(fused_tensors)
+
+            def step(t, state, x, *weights):
+                step_weights = None
+                if fused_weights is not None:
+                    step_weights = dict(fused_weights, **dict(zip(fused_keys, weights)))
+                return self.ThalnetCell(x[..., t, :], state, step_weights)
+
+            # Process the sequence in segments, recomputing the cell internals in the backward pass.
+            outputs, cell_state = checkpoint_sequence(
+                step, cell_state, seq_length, self.checkpoint_segment_size,
+                (inputs,) + tuple(fused_tensors[key] for key in fused_keys))
+            output = torch.stack(outputs, dim=-2)
+        else:
+            for j in range(seq_length):
+                output_cell, cell_state = self.ThalnetCell(
+                    inputs[..., j, :], cell_state, fused_weights)
+
+                if output_cell is None:
+                    continue
+
+                output_cell = output_cell[..., None, :]
+                if output is None:
+                    output = output_cell
+
+                # concatenate output
+                else:
+                    output = torch.cat([output, output_cell], dim=-2)
+
+                # This is for the time plot
+                if self.app_state.visualize:
+                    self.cell_state_history.append(
+                        [cell_state[i][0].detach().numpy()
+                         for i in range(self.num_modules)] +
+                        [cell_state[i][1].hidden_state.detach().numpy()
+                         for i in range(self.num_modules)])
+
+        # Carry the final state over to the next window (truncated BPTT only).
+        self.update_carried_cell_state(cell_state)
 
         return output
 
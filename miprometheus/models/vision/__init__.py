@@ -1,5 +1,7 @@
-from .alexnet_wrapper import AlexnetWrapper
-from .lenet5 import LeNet5
-from .simple_cnn import SimpleConvNet
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['AlexnetWrapper', 'LeNet5', 'SimpleConvNet']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'AlexnetWrapper': '.alexnet_wrapper',
+                                                'LeNet5': '.lenet5',
+                                                'SimpleConvNet': '.simple_cnn'})
@@ -1,2 +1,6 @@
-from .cnn_lstm import *
-from .stacked_attention_networks import *
\ No newline at end of file
+from miprometheus.utils.lazy_import import lazy_package
+
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    subpackages=['.cnn_lstm',
+                                                 '.stacked_attention_networks'])
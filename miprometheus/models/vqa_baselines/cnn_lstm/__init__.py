@@ -1,3 +1,5 @@
-from .cnn_lstm import CNN_LSTM
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['CNN_LSTM']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'CNN_LSTM': '.cnn_lstm'})
@@ -1,10 +1,9 @@
-from .stacked_attention_model import StackedAttentionNetwork
-from .stacked_attention_layer import StackedAttentionLayer, AttentionLayer
-from .image_encoding import PretrainedImageEncoding
-from .multi_hops_stacked_attention_model import MultiHopsStackedAttentionNetwork
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['StackedAttentionNetwork',
-           'StackedAttentionLayer',
-           'AttentionLayer',
-           'PretrainedImageEncoding',
-           'MultiHopsStackedAttentionNetwork']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'StackedAttentionNetwork': '.stacked_attention_model',
+                                                'StackedAttentionLayer': '.stacked_attention_layer',
+                                                'AttentionLayer': '.stacked_attention_layer',
+                                                'PretrainedImageEncoding': '.image_encoding',
+                                                'MultiHopsStackedAttentionNetwork': '.multi_hops_stacked_attention_model'})
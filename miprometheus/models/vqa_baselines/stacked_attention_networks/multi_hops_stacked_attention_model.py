@@ -47,6 +47,7 @@ import numpy as np
 import torch.nn as nn
 
 from miprometheus.models.model import Model
+from miprometheus.utils.fused_lstm import FusedLSTM
 from miprometheus.models.vqa_baselines.stacked_attention_networks.stacked_attention_layer import StackedAttentionLayer
 
 
@@ -58,6 +59,9 @@ class MultiHopsStackedAttentionNetwork(Model):
     The implementation details are very similar to the `StackedAttentionNetwork``, to the difference that \
     it uses an LSTMCell instead of an LSTM.
 
+    The LSTMCell is run over the whole question at once (see :py:class:`miprometheus.utils.fused_lstm.FusedLSTM`) \
+    and the attention is computed for all words in a single batched operation.
+
     .. warning::
 
         This implementation has only been tested on ``ShapeColorQuery`` so far.
@@ -119,6 +123,9 @@ class MultiHopsStackedAttentionNetwork(Model):
                                 hidden_size=self.hidden_size,
                                 bias=True)
 
+        # Run the LSTMCell over the whole questions with a single call (not registered as a submodule).
+        self.fused_lstm = FusedLSTM([self.lstm], self.logger)
+
         # Retrieve attention layer parameters
         self.mid_features_attention = params['attention_layer']['nb_nodes']
 
@@ -180,24 +187,26 @@ class MultiHopsStackedAttentionNetwork(Model):
         encoded_images = encoded_images.view(encoded_images.size(0), encoded_images.size(1), -1).transpose(1, 2)
 
         # 2. Encode the questions
-        v_features = None
-
         # initialize the LSTM states
         hx, cx = self.init_hidden_states(batch_size)
 
-        for i in range(questions.size(1)):
-
-            hx, cx = self.lstm(questions[:, i, :], (hx, cx))
-            # 3. Go through the ``StackedAttentionLayer``.
-            v = self.apply_attention(encoded_images, hx.squeeze(1))
-
-            if v_features is None:
-                v_features = v
-            else:
-                v_features = torch.cat((v_features, v), dim=-1)
-
-                # 4. Classify based on the result of the stacked attention layer
-        combined = torch.cat([v_features, hx], dim=1)
+        if self.fused_lstm.is_available():
+            # [batch_size, num_words, hidden_size]
+            hidden_states, _ = self.fused_lstm(questions, (hx.unsqueeze(0), cx.unsqueeze(0)))
+        else:
+            hidden_states = []
+            for i in range(questions.size(1)):
+                hx, cx = self.lstm(questions[:, i, :], (hx, cx))
+                hidden_states.append(hx)
+            hidden_states = torch.stack(hidden_states, dim=1)
+
+        # 3. Go through the ``StackedAttentionLayer``, for all words at once.
+        # [batch_size, num_words, num_channels_encoded_image]
+        v_features = self.apply_attention(encoded_images, hidden_states)
+
+        # 4. Classify based on the result of the stacked attention layer (features of the consecutive words
+        # and the last hidden state)
+        combined = torch.cat([v_features.reshape(batch_size, -1), hidden_states[:, -1]], dim=1)
         x = torch.nn.functional.relu(self.fc1(combined))
         x = torch.nn.functional.relu(self.fc2(x))
         x = torch.nn.functional.dropout(x)  # p=0.5
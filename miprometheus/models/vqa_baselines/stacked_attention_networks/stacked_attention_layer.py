@@ -82,23 +82,24 @@ class StackedAttentionLayer(Module):
         [batch_size, width * height, num_channels_encoded_image]
         :type encoded_image: torch.tensor
 
-        :param encoded_question: Last hidden layer of the LSTM, of shape [batch_size, question_encoding_size]
+        :param encoded_question: Last hidden layer of the LSTM, of shape [batch_size, question_encoding_size], \
+        or hidden states for several words, of shape [batch_size, num_words, question_encoding_size] \
+        (attention is then computed for all words at once).
         :type encoded_question: torch.tensor
 
-        :return: u: attention [batch_size, num_channels_encoded_image]
+        :return: u: attention [batch_size, num_channels_encoded_image] \
+        (or [batch_size, num_words, num_channels_encoded_image])
 
         """
+        attention_probs = []
 
         for att_layer in self.san:
             u, attention_prob = att_layer(encoded_image, encoded_question)
+            attention_probs.append(attention_prob)
 
-            if AppState().visualize:
-                if self.visualize_attention is None:
-                    self.visualize_attention = attention_prob
-
-                # Concatenate output
-                else:
-                    self.visualize_attention = torch.cat([self.visualize_attention, attention_prob], dim=-1)
+        if AppState().visualize:
+            # Attention weights of the consecutive layers: [batch_size, (num_words), width * height, num_att_layers]
+            self.visualize_attention = torch.cat(attention_probs, dim=-1)
 
         return u
 
@@ -142,28 +143,34 @@ class AttentionLayer(Module):
         [batch_size, width * height, num_channels_encoded_image]
         :type encoded_image: torch.tensor
 
-        :param encoded_question: Last hidden layer of the LSTM, of shape [batch_size, question_encoding_size]
+        :param encoded_question: Last hidden layer of the LSTM, of shape [batch_size, question_encoding_size], \
+        or hidden states for several words, of shape [batch_size, num_words, question_encoding_size].
         :type encoded_question: torch.tensor
 
         :returns:
             - "Refined query vector" (weighted sum of the image vectors, combine with the question vector), \
-            of shape [batch_size, num_channels_encoded_image]
-            - Attention weights, todo: shape?
+            of shape [batch_size, (num_words), num_channels_encoded_image]
+            - Attention weights, of shape [batch_size, (num_words), width * height, 1]
 
         """
 
         # Get the key
         key = self.ff_image(encoded_image)
 
+        if encoded_question.dim() == 3:
+            # Several words: the same key (and image) for all of them.
+            key = key.unsqueeze(dim=1)
+            encoded_image = encoded_image.unsqueeze(dim=1)
+
         # Get the query, unsqueeze to be able to add the query to all channel
-        query = self.ff_ques(encoded_question).unsqueeze(dim=1)
+        query = self.ff_ques(encoded_question).unsqueeze(dim=-2)
         weighted_key_query = torch.nn.functional.tanh(key + query)
 
         # Get attention over the different layers
         weighted_key_query = self.ff_attention(weighted_key_query)
         attention_prob = torch.nn.functional.softmax(weighted_key_query, dim=-2)
 
-        vi_attended = (attention_prob * encoded_image).sum(dim=1)
+        vi_attended = (attention_prob * encoded_image).sum(dim=-2)
         u = vi_attended + encoded_question
 
         return u, attention_prob
@@ -1,9 +1,10 @@
-# Imports from the different domains.
-from .image_text_to_class import *
-from .image_to_class import *
-from .seq_to_seq import *
-from .video_to_class import *
+from miprometheus.utils.lazy_import import lazy_package
 
-# Other imports.
-from .problem import Problem
-from .problem_factory import ProblemFactory
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'Problem': '.problem',
+                                                'ProblemFactory': '.problem_factory'},
+                                    subpackages=['.image_text_to_class',
+                                                 '.image_to_class',
+                                                 '.seq_to_seq',
+                                                 '.video_to_class'])
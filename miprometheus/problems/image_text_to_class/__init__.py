@@ -1,6 +1,9 @@
-from .clevr import CLEVR
-from .image_text_to_class_problem import ObjectRepresentation, ImageTextToClassProblem
-from .sort_of_clevr import SortOfCLEVR
-from .shape_color_query import ShapeColorQuery
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['CLEVR', 'ObjectRepresentation', 'ImageTextToClassProblem', 'SortOfCLEVR', 'ShapeColorQuery']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'CLEVR': '.clevr',
+                                                'ObjectRepresentation': '.image_text_to_class_problem',
+                                                'ImageTextToClassProblem': '.image_text_to_class_problem',
+                                                'SortOfCLEVR': '.sort_of_clevr',
+                                                'ShapeColorQuery': '.shape_color_query'})
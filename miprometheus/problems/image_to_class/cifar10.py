@@ -57,6 +57,9 @@ class CIFAR10(ImageToClassProblem):
                 - ``self.use_train_data`` (`bool`, `optional`) : If ``True``, creates dataset from training set, \
                     otherwise creates from test set,
                 - ``self.resize`` : (optional) resize the images to `[h, w]` if set,
+                - ``self.in_memory`` (`bool`, `optional`) : If ``True``, loads the whole dataset to memory as \
+                    a single ``uint8`` tensor and creates (and resizes) the batches directly in :py:func:`collate_fn`,\
+                    bypassing the per-sample ``PIL`` transformations,
                 - ``self.defaut_values`` :
 
                     >>> self.default_values = {'num_classes': 10,
@@ -80,7 +83,8 @@ class CIFAR10(ImageToClassProblem):
             The following is set by default:
 
             >>> params = {'data_folder': '~/data/cifar10',
-            >>>           'use_train_data': True}
+            >>>           'use_train_data': True,
+            >>>           'in_memory': False}
 
 
         :param params: Dictionary of parameters (read from configuration ``.yaml`` file).
@@ -93,13 +97,15 @@ class CIFAR10(ImageToClassProblem):
         
         # Set default parameters.
         params.add_default_params({'data_folder': '~/data/cifar10',
-                                   'use_train_data': True})
+                                   'use_train_data': True,
+                                   'in_memory': False})
 
         # Get absolute path.
         data_folder = os.path.expanduser(params['data_folder'])
 
         # Retrieve parameters from the dictionary.
         self.use_train_data = params['use_train_data']
+        self.in_memory = params['in_memory']
 
         # Add transformations depending on the resizing option.
         if ('resize' in self.params):
@@ -116,8 +122,9 @@ class CIFAR10(ImageToClassProblem):
             # Up-scale and transform to tensors.
             transform = transforms.Compose([transforms.Resize((self.height, self.width)), transforms.ToTensor()])
 
-            self.logger.warning('Upscaling the images to [{}, {}]. Slows down batch generation.'.format(
-                self.width, self.height))
+            if not self.in_memory:
+                self.logger.warning('Upscaling the images to [{}, {}]. Slows down batch generation.'.format(
+                    self.width, self.height))
 
         else:
             # Default MNIST settings.
@@ -149,6 +156,10 @@ class CIFAR10(ImageToClassProblem):
         # Class names.
         self.labels = 'Airplane Automobile Bird Cat Deer Dog Frog Horse Shipe Truck'.split(' ')
 
+        if self.in_memory:
+            # Keep the raw images as a single uint8 tensor.
+            self.load_to_memory(self.dataset)
+
     def __getitem__(self, index):
         """
         Getter method to access the dataset and return a sample.
@@ -162,8 +173,13 @@ class CIFAR10(ImageToClassProblem):
             - targets: Index of the target class
             - targets_label: Label of the target class (cf ``self.labels``)
 
+        .. note::
+
+            If ``self.in_memory`` is set, simply returns the index: the batch is created in :py:func:`collate_fn`.
 
         """
+        if self.in_memory:
+            return index
 
         img, target = self.dataset.__getitem__(index)
         target = torch.tensor(target)
@@ -189,11 +205,16 @@ class CIFAR10(ImageToClassProblem):
             Multi-processing is supported as the data sources are small enough to be kept in memory\
             (`self.root-dir/cifar-10-batches/data_batch_i` have a size of 31.0 MB).
 
+            If ``self.in_memory`` is set, the batch is created from the list of indices by \
+            :py:func:`miprometheus.problems.ImageToClassProblem.collate_from_memory`.
+
         :param batch: list of individual ``DataDict`` samples to combine.
 
         :return: ``DataDict({'images','targets', 'targets_label'})`` containing the batch.
 
         """
+        if self.in_memory:
+            return self.collate_from_memory(batch)
 
         return DataDict({key: value for key, value in zip(self.data_definitions.keys(),
                                                           super(CIFAR10, self).collate_fn(batch).values())})
@@ -64,6 +64,43 @@ class ImageToClassProblem(Problem):
                                  'targets_label': {'size': [-1, 1], 'type': [list, str]}
                                  }
 
+    def collate_from_memory(self, batch):
+        """
+        Creates a batch directly from the images and targets loaded by :py:func:`miprometheus.problems.Problem.load_to_memory`.
+
+        The images are gathered with a single indexing operation, resized (if needed) with a single call \
+        to :py:func:`torch.nn.functional.interpolate` and normalized to [0, 1], as done by ``transforms.Resize`` \
+        and ``transforms.ToTensor``.
+
+        .. note::
+
+            Without resizing, the images are identical to those returned by ``torchvision``. Resized images are \
+            interpolated bilinearly and rounded to 8-bit values like ``PIL`` does, so they can differ from \
+            the ``PIL`` ones by rounding errors (and, when downscaling, ``PIL`` additionally antialiases).
+
+        :param batch: List of indices of the samples (returned by :py:func:`__getitem__`).
+        :type batch: list
+
+        :return: ``DataDict({'images','targets', 'targets_label'})`` containing the batch.
+
+        """
+        indices = torch.as_tensor(batch, dtype=torch.int64)
+
+        images = self.images.index_select(0, indices).float()
+        if images.size(2) != self.height or images.size(3) != self.width:
+            images = torch.nn.functional.interpolate(images, size=(self.height, self.width),
+                                                     mode='bilinear', align_corners=False)
+            images = images.round_().clamp_(0, 255)
+        images = images.div_(255)
+
+        targets = self.targets.index_select(0, indices)
+
+        data_dict = self.create_data_dict()
+        data_dict['images'] = images
+        data_dict['targets'] = targets
+        data_dict['targets_label'] = [self.labels[target] for target in targets.tolist()]
+        return data_dict
+
     def calculate_accuracy(self, data_dict, logits):
         """
         Calculates accuracy equal to mean number of correct classification in a given batch.
@@ -55,6 +55,9 @@ class MNIST(ImageToClassProblem):
                 - ``self.use_train_data`` (`bool`, `optional`) : If True, creates dataset from ``training.pt``,\
                     otherwise from ``test.pt``
                 - ``self.resize`` : (optional) resize the images to `[h, w]` if set,
+                - ``self.in_memory`` (`bool`, `optional`) : If ``True``, loads the whole dataset to memory as \
+                    a single ``uint8`` tensor and creates (and resizes) the batches directly in :py:func:`collate_fn`,\
+                    bypassing the per-sample ``PIL`` transformations,
                 - ``self.defaut_values`` :
 
                     >>> self.default_values = {'num_classes': 10,
@@ -78,7 +81,8 @@ class MNIST(ImageToClassProblem):
             The following is set by default:
 
             >>> self.params.add_default_params({'data_folder': '~/data/mnist',
-            >>>           'use_train_data': True})
+            >>>           'use_train_data': True,
+            >>>           'in_memory': False})
 
         :param params_: Dictionary of parameters (read from configuration ``.yaml`` file).
 
@@ -89,7 +93,8 @@ class MNIST(ImageToClassProblem):
 
         # Set default parameters.
         self.params.add_default_params({'data_folder': '~/data/mnist',
-                                        'use_train_data': True
+                                        'use_train_data': True,
+                                        'in_memory': False
                                         })
 
         # Get absolute path.
@@ -97,6 +102,7 @@ class MNIST(ImageToClassProblem):
 
         # Retrieve parameters from the dictionary.
         self.use_train_data = self.params['use_train_data']
+        self.in_memory = self.params['in_memory']
 
         # Add transformations depending on the resizing option.
         if 'resize' in self.params:
@@ -113,8 +119,9 @@ class MNIST(ImageToClassProblem):
             # Up-scale and transform to tensors.
             transform = transforms.Compose([transforms.Resize((self.height, self.width)), transforms.ToTensor()])
 
-            self.logger.warning('Upscaling the images to [{}, {}]. Slows down batch generation.'.format(
-                self.width, self.height))
+            if not self.in_memory:
+                self.logger.warning('Upscaling the images to [{}, {}]. Slows down batch generation.'.format(
+                    self.width, self.height))
 
         else:
             # Default MNIST settings.
@@ -145,6 +152,10 @@ class MNIST(ImageToClassProblem):
         # Class names.
         self.labels = 'Zero One Two Three Four Five Six Seven Eight Nine'.split(' ')
 
+        if self.in_memory:
+            # Keep the raw images as a single uint8 tensor.
+            self.load_to_memory(self.dataset)
+
     def __getitem__(self, index):
         """
         Getter method to access the dataset and return a sample.
@@ -158,8 +169,14 @@ class MNIST(ImageToClassProblem):
             - targets: Index of the target class
             - targets_label: Label of the target class (cf ``self.labels``)
 
+        .. note::
+
+            If ``self.in_memory`` is set, simply returns the index: the batch is created in :py:func:`collate_fn`.
 
         """
+        if self.in_memory:
+            return index
+
         # Get image and target.
         img, target = self.dataset.__getitem__(index)
   
@@ -184,11 +201,16 @@ class MNIST(ImageToClassProblem):
             Multi-processing is supported as the data sources are small enough to be kept in memory\
             (`training.pt` has a size of 47.5 MB).
 
+            If ``self.in_memory`` is set, the batch is created from the list of indices by \
+            :py:func:`miprometheus.problems.ImageToClassProblem.collate_from_memory`.
+
         :param batch: list of individual ``DataDict`` samples to combine.
 
         :return: ``DataDict({'images','targets', 'targets_label'})`` containing the batch.
 
         """
+        if self.in_memory:
+            return self.collate_from_memory(batch)
 
         return DataDict({key: value for key, value in zip(self.data_definitions.keys(),
                                                           super(MNIST, self).collate_fn(batch).values())})
@@ -204,7 +226,8 @@ if __name__ == "__main__":
     # Test different options.
     params.add_config_params({'data_folder': '~/data/mnist',
                                     'use_train_data': True,
-                                    'resize': [32, 32]
+                                    'resize': [32, 32],
+                                    'in_memory': False
                                     })
 
     batch_size = 64
@@ -151,6 +151,42 @@ class Problem(Dataset):
         """
         return DataDict({key: None for key in self.data_definitions.keys()})
 
+    def load_to_memory(self, dataset):
+        """
+        Loads the whole ``torchvision`` dataset to memory and stores it in:
+
+            - ``self.images``: ``uint8`` tensor of shape [NUM_SAMPLES x NUM_CHANNELS x HEIGHT x WIDTH] (raw pixels),
+            - ``self.targets``: ``int64`` tensor of shape [NUM_SAMPLES] (indices of the target classes).
+
+        .. note::
+
+            Handles both the old (``train_data``/``test_data``, ``train_labels``/``test_labels``) and the new \
+            (``data``, ``targets``) attributes of the ``torchvision`` datasets.
+
+        :param dataset: ``torchvision`` dataset (e.g. ``datasets.MNIST``).
+
+        """
+        split = 'train' if dataset.train else 'test'
+
+        data = getattr(dataset, 'data', None)
+        if data is None:
+            data = getattr(dataset, split + '_data')
+
+        targets = getattr(dataset, 'targets', None)
+        if targets is None:
+            targets = getattr(dataset, split + '_labels')
+
+        images = torch.as_tensor(data)
+        if images.dim() == 3:
+            # Grayscale images: [N x H x W].
+            images = images.unsqueeze(1)
+        else:
+            # Color images: [N x H x W x C].
+            images = images.permute(0, 3, 1, 2)
+
+        self.images = images.contiguous()
+        self.targets = torch.as_tensor(targets, dtype=torch.int64)
+
     def __len__(self):
         """
         :return: The size of the dataset.
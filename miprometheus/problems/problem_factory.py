@@ -61,7 +61,7 @@ class ProblemFactory(object):
         # Get the class name.
         name = os.path.basename(params['name'])
 
-        # Get the actual class.
+        # Get the actual class (imports only the module defining it).
         problem_class = getattr(problems, name)
 
         # Check if class is derived (even indirectly) from Problem.
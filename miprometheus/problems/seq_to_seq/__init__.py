@@ -1,5 +1,8 @@
-from .algorithmic import *
-from .text2text import *
-from .vqa import *
+from miprometheus.utils.lazy_import import lazy_package
 
-from .seq_to_seq_problem import SeqToSeqProblem
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'SeqToSeqProblem': '.seq_to_seq_problem'},
+                                    subpackages=['.algorithmic',
+                                                 '.text2text',
+                                                 '.vqa'])
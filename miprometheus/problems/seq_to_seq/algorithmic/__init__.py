@@ -1,9 +1,11 @@
-from .dual_comparison import *
-from .dual_distraction import *
-from .dual_ignore import *
-from .manipulation_spatial import *
-from .manipulation_temporal import *
-from .recall import *
+from miprometheus.utils.lazy_import import lazy_package
 
-
-from .algorithmic_seq_to_seq_problem import AlgorithmicSeqToSeqProblem
\ No newline at end of file
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'AlgorithmicSeqToSeqProblem': '.algorithmic_seq_to_seq_problem'},
+                                    subpackages=['.dual_comparison',
+                                                 '.dual_distraction',
+                                                 '.dual_ignore',
+                                                 '.manipulation_spatial',
+                                                 '.manipulation_temporal',
+                                                 '.recall'])
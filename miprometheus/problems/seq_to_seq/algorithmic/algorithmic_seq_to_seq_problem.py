@@ -21,7 +21,10 @@ algorithmic_seq_to_seq_problem.py: abstract base class for algorithmic sequentia
 """
 __author__ = "Tomasz Kornuta, Younes Bouhadjar, Vincent Marois"
 
+import os
+import json
 from abc import abstractmethod
+from collections import OrderedDict
 import numpy as np
 import torch
 import torch.nn as nn
@@ -45,6 +48,9 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
             - "not_optimized": "__getitem__" generates a single sample, while \
             "collate_fn" collates them.
 
+            - "pregenerated": batches are served as (zero-copy) slices of the samples generated in advance \
+            and stored in memory-mapped files (see :py:func:`pregenerate`).
+
     Advantage of the "not_optimized" mode is that a single batch will contain sequences of varying length.
     This mode is around 10 times slower though.
 
@@ -142,6 +148,13 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
             # "Attach" the "__getitem__" and "collate_fn" functions - generates whole batch at once, optimized.
             setattr(self.__class__, '__getitem__', staticmethod(self.do_not_generate_sample))
             setattr(self.__class__, 'collate_fn', staticmethod(self.collate_by_batch_generation))
+        elif gen_mode == 'pregenerated':
+            # Load the samples generated in advance.
+            self.params.add_default_params({'pregenerated_dir': ''})
+            self.load_pregenerated(os.path.expanduser(params['pregenerated_dir']))
+            # "Attach" the "__getitem__" and "collate_fn" functions - slices whole batch at once.
+            setattr(self.__class__, '__getitem__', staticmethod(self.do_not_generate_sample))
+            setattr(self.__class__, 'collate_fn', staticmethod(self.collate_pregenerated_batch))
         else:
             # "Attach" the "__getitem__" and "collate_fn" functions - samples are generated one by one, slower.
             setattr(self.__class__, '__getitem__', staticmethod(self.generate_sample_ignore_index))
@@ -335,6 +348,168 @@ class AlgorithmicSeqToSeqProblem(SeqToSeqProblem):
         return data_dict
 
 
+    def pregenerate(self, directory, num_samples, batch_size):
+        """
+        Generates the samples in advance and stores them in the indicated directory, to be later served in \
+        the "pregenerated" mode.
+
+        The samples are generated by ``generate_batch`` in batches of size ``batch_size`` and grouped by their \
+        shapes (i.e. lengths) and values shared by the whole batch (e.g. ``num_subsequences`` in some problems). \
+        Every per-sample item of the groups is stored in a separate ``.npy`` file, described by ``metadata.json`` \
+        (which also contains the shared values - the multi-element tensors as lists, along with their types).
+
+        .. note::
+
+            Requires the problem to implement ``generate_batch`` (see :py:func:`supports_pregeneration`).
+
+        .. note::
+
+            The sizes of all groups are multiples of ``batch_size`` (except the group containing the last, \
+            incomplete batch), so every batch of that size served by :py:func:`collate_pregenerated_batch` \
+            (without shuffling) contains exactly one of the generated batches.
+
+        .. warning::
+
+            The samples are kept in memory until they are stored.
+
+        :param directory: Output directory.
+        :type directory: str
+
+        :param num_samples: Number of samples to generate.
+        :type num_samples: int
+
+        :param batch_size: Number of samples generated at once.
+        :type batch_size: int
+
+        """
+        groups = OrderedDict()
+        for start in range(0, num_samples, batch_size):
+            size = min(batch_size, num_samples - start)
+            data_dict = self.generate_batch(size)
+
+            # Separate the per-sample tensors from the values shared by the whole batch.
+            tensors = OrderedDict()
+            scalars = OrderedDict()
+            shared = OrderedDict()
+            for key, value in data_dict.items():
+                if isinstance(value, torch.Tensor):
+                    value = value.cpu().numpy()
+
+                if isinstance(value, np.ndarray) and value.ndim > 0 and value.shape[0] == size:
+                    tensors[key] = value
+                elif isinstance(value, np.ndarray) and value.size > 1:
+                    # Multi-element tensor shared by the whole batch - stored along with its type.
+                    shared[key] = {'values': value.tolist(), 'dtype': value.dtype.str}
+                elif isinstance(value, (np.ndarray, np.generic)):
+                    scalars[key] = value.item()
+                else:
+                    scalars[key] = value
+
+            shapes = tuple((key, array.shape[1:], array.dtype.str) for key, array in tensors.items())
+            signature = (shapes, json.dumps(scalars), json.dumps(shared))
+            if signature not in groups:
+                groups[signature] = {'shapes': shapes, 'size': 0, 'scalars': scalars, 'shared': shared,
+                                     'tensors': OrderedDict((key, []) for key in tensors)}
+
+            group = groups[signature]
+            group['size'] += size
+            for key, array in tensors.items():
+                group['tensors'][key].append(array)
+
+        # Store the groups - ordered by the shapes of the samples.
+        os.makedirs(directory, exist_ok=True)
+        metadata = {'name': self.name, 'num_samples': num_samples, 'batch_size': batch_size, 'groups': []}
+        for index, group in enumerate(sorted(groups.values(), key=lambda g: g['shapes'])):
+            for key, arrays in group['tensors'].items():
+                np.save(os.path.join(directory, 'group_{}_{}.npy'.format(index, key)), np.concatenate(arrays))
+            metadata['groups'].append({'size': group['size'], 'tensors': list(group['tensors']),
+                                       'scalars': group['scalars'], 'shared': group['shared']})
+
+        with open(os.path.join(directory, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f, indent=4)
+
+        self.logger.info("Stored {} samples of {} in {} groups in {}".format(
+            num_samples, self.name, len(groups), directory))
+
+    @classmethod
+    def supports_pregeneration(cls):
+        """
+        Checks whether the samples of the problem can be generated in advance, i.e. whether the problem \
+        implements ``generate_batch`` (some problems generate the samples only in their own ``collate_fn``).
+
+        :return: True if the problem implements ``generate_batch``.
+
+        """
+        return cls.generate_batch is not AlgorithmicSeqToSeqProblem.generate_batch
+
+    def load_pregenerated(self, directory):
+        """
+        Memory-maps the samples stored by :py:func:`pregenerate` and sets the size of the problem to their number.
+
+        :param directory: Directory containing the samples.
+        :type directory: str
+
+        """
+        metadata_file = os.path.join(directory, 'metadata.json')
+        if not os.path.isfile(metadata_file):
+            self.logger.error("Cannot find the pregenerated samples in '{}', please generate them with "
+                              "mip-pregenerate".format(directory))
+            exit(-1)
+
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+
+        # The samples are read from the disk only when used - and never copied (copy-on-write mode).
+        self.pregenerated_groups = []
+        for index, group in enumerate(metadata['groups']):
+            tensors = {key: np.load(os.path.join(directory, 'group_{}_{}.npy'.format(index, key)), mmap_mode='c')
+                       for key in group['tensors']}
+            # Values shared by all samples of the group (the multi-element ones restored as tensors).
+            scalars = dict(group['scalars'])
+            for key, entry in group.get('shared', {}).items():
+                scalars[key] = torch.from_numpy(np.array(entry['values'], dtype=entry['dtype']))
+            self.pregenerated_groups.append((tensors, scalars))
+
+        # Index of the first sample of every group.
+        self.pregenerated_offsets = np.cumsum([0] + [group['size'] for group in metadata['groups']])
+        self.length = int(self.pregenerated_offsets[-1])
+
+        self.logger.info("Loaded {} pregenerated samples in {} groups from {}".format(
+            self.length, len(self.pregenerated_groups), directory))
+
+    def collate_pregenerated_batch(self, batch):
+        """
+        Serves a batch of the pregenerated samples, as zero-copy slices of the memory-mapped arrays.
+
+        .. warning::
+
+            All samples of a batch must have the same shapes, so the batch consists of ``len(batch)`` consecutive \
+            samples of a single group, starting from the first index of ``batch`` (shifted back if the group \
+            ends earlier). Without shuffling and with the batch size used during generation, every sample \
+            is served exactly once per epoch; with shuffling, random consecutive samples are served.
+
+        :param batch: List of indices (returned by ``__getitem__``).
+
+        :return: DataDict({'sequences', 'sequences_length', 'targets', 'masks', 'num_subsequences'}).
+
+        """
+        # Find the group containing the first index.
+        index = np.searchsorted(self.pregenerated_offsets, batch[0], side='right') - 1
+        tensors, scalars = self.pregenerated_groups[index]
+
+        group_start = self.pregenerated_offsets[index]
+        group_size = self.pregenerated_offsets[index + 1] - group_start
+        size = min(len(batch), group_size)
+        start = min(batch[0] - group_start, group_size - size)
+
+        data_dict = self.create_data_dict()
+        for key, array in tensors.items():
+            data_dict[key] = torch.from_numpy(array[start:start + size])
+        for key, value in scalars.items():
+            data_dict[key] = value.clone() if isinstance(value, torch.Tensor) else value
+
+        return data_dict
+
     def set_max_length(self, max_length):
         """ Sets maximum sequence lenth (property).
 
@@ -1,9 +1,7 @@
-from .sequence_comparison_cl import SequenceComparisonCommandLines
-from .sequence_equality_cl import SequenceEqualityCommandLines
-from .sequence_symmetry_cl import SequenceSymmetryCommandLines
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = [
-    'SequenceComparisonCommandLines',
-    'SequenceEqualityCommandLines',
-    'SequenceSymmetryCommandLines'
-    ]
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'SequenceComparisonCommandLines': '.sequence_comparison_cl',
+                                                'SequenceEqualityCommandLines': '.sequence_equality_cl',
+                                                'SequenceSymmetryCommandLines': '.sequence_symmetry_cl'})
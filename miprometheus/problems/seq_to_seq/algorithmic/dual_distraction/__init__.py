@@ -1,9 +1,7 @@
-from .distraction_carry import DistractionCarry
-from .distraction_forget import DistractionForget
-from .distraction_ignore import DistractionIgnore
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = [
-    'DistractionCarry',
-    'DistractionForget',
-    'DistractionIgnore'
-    ]
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'DistractionCarry': '.distraction_carry',
+                                                'DistractionForget': '.distraction_forget',
+                                                'DistractionIgnore': '.distraction_ignore'})
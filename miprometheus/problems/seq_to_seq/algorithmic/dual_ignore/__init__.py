@@ -1,9 +1,7 @@
-from .interruption_not import InterruptionNot
-from .interruption_reverse_recall import InterruptionReverseRecall
-from .interruption_swap_recall import InterruptionSwapRecall
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = [
-    'InterruptionNot',
-    'InterruptionReverseRecall',
-    'InterruptionSwapRecall'
-    ]
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'InterruptionNot': '.interruption_not',
+                                                'InterruptionReverseRecall': '.interruption_reverse_recall',
+                                                'InterruptionSwapRecall': '.interruption_swap_recall'})
@@ -1,7 +1,6 @@
-from .manipulation_spatial_not import ManipulationSpatialNot
-from .manipulation_spatial_rotation import ManipulationSpatialRotation
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = [
-    'ManipulationSpatialNot',
-    'ManipulationSpatialRotation'
-    ]
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'ManipulationSpatialNot': '.manipulation_spatial_not',
+                                                'ManipulationSpatialRotation': '.manipulation_spatial_rotation'})
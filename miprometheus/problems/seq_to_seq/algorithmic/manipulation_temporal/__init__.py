@@ -1,7 +1,6 @@
-from .manipulation_temporal_swap import ManipulationTemporalSwap
-from .skip_recall_cl import SkipRecallCommandLines
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = [
-    'ManipulationTemporalSwap',
-    'SkipRecallCommandLines'
-    ]
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'ManipulationTemporalSwap': '.manipulation_temporal_swap',
+                                                'SkipRecallCommandLines': '.skip_recall_cl'})
@@ -1,17 +1,11 @@
-from .operation_span import OperationSpan
-from .reading_span import ReadingSpan
-from .repeat_reverse_recall_cl import RepeatReverseRecallCommandLines
-from .repeat_serial_recall_cl import RepeatSerialRecallCommandLines
-from .reverse_recall_cl import ReverseRecallCommandLines
-from .scratch_pad_cl import ScratchPadCommandLines
-from .serial_recall_cl import SerialRecallCommandLines
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = [
-    'OperationSpan',
-    'ReadingSpan',
-    'RepeatReverseRecallCommandLines',
-    'RepeatSerialRecallCommandLines',
-    'ReverseRecallCommandLines',
-    'ScratchPadCommandLines',
-    'SerialRecallCommandLines'
-    ]
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'OperationSpan': '.operation_span',
+                                                'ReadingSpan': '.reading_span',
+                                                'RepeatReverseRecallCommandLines': '.repeat_reverse_recall_cl',
+                                                'RepeatSerialRecallCommandLines': '.repeat_serial_recall_cl',
+                                                'ReverseRecallCommandLines': '.reverse_recall_cl',
+                                                'ScratchPadCommandLines': '.scratch_pad_cl',
+                                                'SerialRecallCommandLines': '.serial_recall_cl'})
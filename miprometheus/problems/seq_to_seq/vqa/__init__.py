@@ -1,2 +1,6 @@
-from .vqa_problem import VQAProblem
-from .cog import *
\ No newline at end of file
+from miprometheus.utils.lazy_import import lazy_package
+
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'VQAProblem': '.vqa_problem'},
+                                    subpackages=['.cog'])
@@ -1,3 +1,5 @@
-from .cog import COG
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['COG']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'COG': '.cog'})
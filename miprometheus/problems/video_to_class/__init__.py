@@ -1,3 +1,6 @@
-from .seq_mnist_to_class import *
+from miprometheus.utils.lazy_import import lazy_package
 
-from .video_to_class_problem import VideoToClassProblem
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'VideoToClassProblem': '.video_to_class_problem'},
+                                    subpackages=['.seq_mnist_to_class'])
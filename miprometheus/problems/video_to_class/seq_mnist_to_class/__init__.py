@@ -1,5 +1,6 @@
-from .permuted_sequential_row_mnist import PermutedSequentialRowMnist
-from .sequential_pixel_mnist import SequentialPixelMNIST
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['PermutedSequentialRowMnist',
-           'SequentialPixelMNIST']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'PermutedSequentialRowMnist': '.permuted_sequential_row_mnist',
+                                                'SequentialPixelMNIST': '.sequential_pixel_mnist'})
@@ -51,6 +51,9 @@ class PermutedSequentialRowMnist(VideoToClassProblem):
                     and  ``processed/test.pt`` will be saved,
                 - ``self.use_train_data`` (`bool`, `optional`) : If True, creates dataset from ``training.pt``,\
                     otherwise from ``test.pt``
+                - ``self.in_memory`` (`bool`, `optional`) : If ``True``, loads the whole dataset to memory as \
+                    a single ``uint8`` tensor and creates the batches of sequences directly in \
+                    :py:func:`collate_fn`, without any per-sample processing (DEFAULT: ``False``),
                 - ``self.defaut_values`` :
 
                     >>> self.default_values = {'nb_classes': 10,
@@ -73,8 +76,11 @@ class PermutedSequentialRowMnist(VideoToClassProblem):
         # Call base class constructor.
         super(PermutedSequentialRowMnist, self).__init__(params)
 
+        params.add_default_params({'in_memory': False})
+
         # Retrieve parameters from the dictionary.
         self.use_train_data = params['use_train_data']
+        self.in_memory = params['in_memory']
         self.root_dir = params['root_dir']
 
         self.num_rows = 28
@@ -109,6 +115,12 @@ class PermutedSequentialRowMnist(VideoToClassProblem):
 
         self.length = len(self.dataset)
 
+        if self.in_memory:
+            self.load_to_memory(self.dataset)
+            # Indices of the flattened pixels of the permuted rows (applied to whole batches in collate_fn).
+            self.pixel_indices = (pixel_permutation.view(-1, 1) * self.num_columns +
+                                  torch.arange(self.num_columns, dtype=torch.int64)).view(-1)
+
     def __getitem__(self, index):
         """
         Getter method to access the dataset and return a sample.
@@ -123,8 +135,14 @@ class PermutedSequentialRowMnist(VideoToClassProblem):
             - targets: Index of the target class
             - targets_label: Label of the target class (cf ``self.labels``)
 
+        .. note::
+
+            If ``self.in_memory`` is set, simply returns the index: the batch is created in :py:func:`collate_fn`.
 
         """
+        if self.in_memory:
+            return index
+
         # get sample
         img, target = self.dataset.__getitem__(index)
 
@@ -154,11 +172,17 @@ class PermutedSequentialRowMnist(VideoToClassProblem):
             Multi-processing is supported as the data sources are small enough to be kept in memory\
             (`training.pt` has a size of 47.5 MB).
 
+            If ``self.in_memory`` is set, the batch is created from the list of indices by \
+            :py:func:`miprometheus.problems.VideoToClassProblem.collate_from_memory`, permuting the rows \
+            of all images with a single ``index_select``.
+
         :param batch: list of individual ``DataDict`` samples to combine.
 
         :return: ``DataDict({'images','targets', 'targets_label'})`` containing the batch.
 
         """
+        if self.in_memory:
+            return self.collate_from_memory(batch, [1, 1, self.num_columns], self.pixel_indices)
 
         return DataDict({key: value for key, value in zip(self.data_definitions.keys(),
                                                           super(PermutedSequentialRowMnist, self).collate_fn(batch).values())})
@@ -68,6 +68,52 @@ class VideoToClassProblem(Problem):
         # "Default" problem name.
         self.name = 'VideoToClassProblem'
 
+    def collate_from_memory(self, batch, item_shape, pixel_indices=None):
+        """
+        Creates a batch of sequences directly from the images and targets loaded by \
+        :py:func:`miprometheus.problems.Problem.load_to_memory`.
+
+        The images are gathered with a single indexing operation, flattened, (optionally) permuted with \
+        a single :py:func:`torch.index_select` on the pixel axis, normalized to [0, 1] (as done by \
+        ``transforms.ToTensor``) and cut into a sequence of items of the given shape.
+
+        The mask marks the last item of every sequence, the targets are repeated along the sequence.
+
+        :param batch: List of indices of the samples (returned by :py:func:`__getitem__`).
+        :type batch: list
+
+        :param item_shape: Shape of a single item of the sequence, e.g. [1, 1, 28] for rows of MNIST images.
+        :type item_shape: list
+
+        :param pixel_indices: Order of the (flattened) pixels (DEFAULT: None, i.e. original order).
+        :type pixel_indices: ``torch.LongTensor``
+
+        :return: ``DataDict({'images', 'mask', 'targets', 'targets_label'})`` containing the batch.
+
+        """
+        indices = torch.as_tensor(batch, dtype=torch.int64)
+        batch_size = indices.size(0)
+
+        # Permute the raw (uint8) pixels, then convert them.
+        images = self.images.index_select(0, indices).view(batch_size, -1)
+        if pixel_indices is not None:
+            images = images.index_select(1, pixel_indices)
+        images = images.float().div_(255).view(batch_size, -1, *item_shape)
+        seq_length = images.size(1)
+
+        # Only the last item of the sequence is classified.
+        mask = torch.zeros(batch_size, seq_length, 1, dtype=torch.int32)
+        mask[:, -1, 0] = 1
+
+        targets = self.targets.index_select(0, indices)
+
+        data_dict = self.create_data_dict()
+        data_dict['images'] = images
+        data_dict['mask'] = mask
+        data_dict['targets'] = targets.view(batch_size, 1, 1).expand(batch_size, seq_length, 1).contiguous()
+        data_dict['targets_label'] = [self.labels[target] for target in targets.tolist()]
+        return data_dict
+
     def calculate_accuracy(self, data_dict, logits):
         """
         Calculates accuracy equal to mean number of correct classification in a given batch.
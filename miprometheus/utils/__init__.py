@@ -1,13 +1,19 @@
-from .app_state import AppState
-from .param_interface import ParamInterface
-from .param_registry import MetaSingletonABC, ParamRegistry
-from .sampler_factory import SamplerFactory
-from .singleton import SingletonMetaClass
-from .split_indices import split_indices
-from .statistics_collector import StatisticsCollector
-from .statistics_aggregator import StatisticsAggregator
-from .time_plot import TimePlot
-from .data_dict import DataDict
+from .lazy_import import lazy_package
 
-from .loss import *
-from .problems_utils import *
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'AppState': '.app_state',
+                                                'ParamInterface': '.param_interface',
+                                                'MetaSingletonABC': '.param_registry',
+                                                'ParamRegistry': '.param_registry',
+                                                'SamplerFactory': '.sampler_factory',
+                                                'SingletonMetaClass': '.singleton',
+                                                'split_indices': '.split_indices',
+                                                'StatisticsCollector': '.statistics_collector',
+                                                'StatisticsAggregator': '.statistics_aggregator',
+                                                'StageProfiler': '.stage_profiler',
+                                                'TimePlot': '.time_plot',
+                                                'DataDict': '.data_dict',
+                                                'DevicePrefetcher': '.device_prefetcher'},
+                                    subpackages=['.loss',
+                                                 '.problems_utils'])
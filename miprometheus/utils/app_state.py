@@ -32,16 +32,37 @@ class AppState(metaclass=SingletonMetaClass):
         Constructor:
 
             - Disable visualization by default,
-            - Use non-cuda types by default.
+            - Use non-cuda types by default,
+            - Run as a single (non-distributed) process by default.
         """
         # Disable visualization by default.
         self.visualize = False
 
+        # Single process by default.
+        self.distributed = False
+        self.rank = 0
+        self.world_size = 1
+
         # Use non-cuda types by default.
         self.convert_non_cuda_types()
         self.set_dtype('float')
         self.set_itype('int')
 
+    def set_distributed(self, rank, world_size):
+        """
+        Sets the rank of the current process and the number of processes taking part in distributed training.
+
+        :param rank: Rank of the current process.
+        :type rank: int
+
+        :param world_size: Number of processes.
+        :type world_size: int
+
+        """
+        self.distributed = world_size > 1
+        self.rank = rank
+        self.world_size = world_size
+
     def set_dtype(self, flag):
         """
         Sets a global floating point type to be used in the models.
@@ -84,6 +105,7 @@ class AppState(metaclass=SingletonMetaClass):
         Sets all tensor types to non-cuda data types.
         """
         self.use_CUDA = False
+        self.device = torch.device('cpu')
         self.FloatTensor = torch.FloatTensor
         self.DoubleTensor = torch.DoubleTensor
         self.HalfTensor = torch.HalfTensor
@@ -103,6 +125,7 @@ class AppState(metaclass=SingletonMetaClass):
         """
 
         self.use_CUDA = True
+        self.device = torch.device('cuda')
         self.FloatTensor = torch.cuda.FloatTensor
         self.DoubleTensor = torch.cuda.DoubleTensor
         self.HalfTensor = torch.cuda.HalfTensor
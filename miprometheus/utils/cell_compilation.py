@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+cell_compilation.py: contains helper function compiling the recurrent cells with ``torch.compile``, \
+reducing the python overhead of the step-by-step execution of recurrent models.
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import torch
+import logging
+
+
+def compile_cell(cell, logger=None):
+    """
+    Compiles the forward function of a recurrent cell (or controller).
+
+    .. note::
+
+        The cells keep their state in (nested) named tuples, created anew in every step. Those are handled \
+        by ``torch.compile``, but not by ``torch.jit.script``, hence the latter is not used.
+
+    .. warning::
+
+        The returned object should not be registered as a submodule, as it would change the names of the \
+        parameters in the state dictionary. The compiled cell shares the parameters with the original one.
+
+
+    :param cell: Cell to be compiled.
+    :type cell: ``torch.nn.Module``
+
+    :param logger: Logger used for reporting (DEFAULT: module logger).
+
+    :return: Compiled cell or (if ``torch.compile`` is not available) the original cell.
+
+    """
+    if logger is None:
+        logger = logging.getLogger('CellCompilation')
+
+    if not hasattr(torch, 'compile'):
+        logger.warning("torch.compile is not available in PyTorch {}, running {} in eager mode".format(
+            torch.__version__, type(cell).__name__))
+        return cell
+
+    logger.info("Compiling {}".format(type(cell).__name__))
+    # Batch size and memory size vary between batches - avoid recompilations.
+    return torch.compile(cell, dynamic=True)
+
+
+if __name__ == '__main__':
+    """ Benchmark: compares the number of steps per second of the eager and compiled cells."""
+    import time
+    from miprometheus.utils.app_state import AppState
+    from miprometheus.utils.param_interface import ParamInterface
+    from miprometheus.models.ntm.ntm_cell import NTMCell
+    from miprometheus.models.dnc.dnc_cell import DNCCell
+    from miprometheus.models.dwm.dwm_cell import DWMCell
+    from miprometheus.models.controllers.lstm_controller import LSTMController
+
+    logging.basicConfig(level=logging.INFO)
+    AppState().visualize = False
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    if device.type == 'cuda':
+        AppState().convert_cuda_types()
+
+    batch_size = 16
+    num_steps = 200
+    warmup_steps = 20
+    input_size = 11
+    output_size = 8
+    num_addresses = 32
+
+    def make_params(params_dict):
+        params = ParamInterface()
+        params.add_config_params(params_dict)
+        return params
+
+    # Cells, functions creating their initial states and the size of their inputs.
+    cells = {
+        'NTMCell': (NTMCell(make_params({
+            'input_item_size': input_size, 'output_item_size': output_size,
+            'controller': {'name': 'LSTMController', 'hidden_state_size': 20, 'num_layers': 1,
+                           'non_linearity': 'sigmoid'},
+            'interface': {'num_read_heads': 1, 'shift_size': 3},
+            'memory': {'num_addresses': num_addresses, 'num_content_bits': 10}})),
+            lambda cell: cell.init_state(torch.zeros(batch_size, num_addresses, 10).type(AppState().dtype)),
+            input_size),
+        'DNCCell': (DNCCell(output_size, make_params({
+            'input_item_size': input_size, 'output_item_size': output_size,
+            'hidden_state_size': 20, 'memory_content_size': 10, 'memory_addresses_size': num_addresses,
+            'num_writes': 1, 'num_reads': 1, 'shift_size': 3, 'controller_type': 'LSTMController',
+            'use_ntm_write': False, 'use_ntm_read': False, 'use_ntm_order': False,
+            'use_extra_write_gate': False, 'non_linearity': 'sigmoid'})),
+            lambda cell: cell.init_state(num_addresses, batch_size),
+            input_size),
+        'DWMCell': (DWMCell(input_size, output_size, 5, 1, False, 3, 10),
+                    lambda cell: cell.init_state(num_addresses, batch_size),
+                    input_size),
+        'LSTMController': (LSTMController({'input_size': input_size, 'output_size': 20, 'num_layers': 1}),
+                           lambda cell: cell.init_state(batch_size),
+                           input_size)
+        }
+
+    print('Batch size: {}, steps: {}, device: {}'.format(batch_size, num_steps, device))
+
+    for name, (cell, init_state, cell_input_size) in cells.items():
+        cell.to(device)
+        for compiled in [False, True]:
+            forward = compile_cell(cell) if compiled else cell
+            inputs = torch.randn(num_steps + warmup_steps, batch_size, cell_input_size, device=device)
+
+            state = init_state(cell)
+            for t in range(num_steps + warmup_steps):
+                # Start measuring after warm-up (i.e. compilation).
+                if t == warmup_steps:
+                    if device.type == 'cuda':
+                        torch.cuda.synchronize(device)
+                    start = time.time()
+                _, state = forward(inputs[t], state)
+
+            if device.type == 'cuda':
+                torch.cuda.synchronize(device)
+            steps_per_second = num_steps / (time.time() - start)
+            print('{:<16} {:<10} {:>12.1f} steps/s'.format(name, 'compiled' if compiled else 'eager',
+                                                          steps_per_second))
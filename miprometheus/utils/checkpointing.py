@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+checkpointing.py: contains helper functions enabling gradient (activation) checkpointing of recurrent loops, \
+i.e. trading compute for memory by recomputing the internals of the recurrent cells in the backward pass.
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import inspect
+import torch
+from torch.utils.checkpoint import checkpoint
+
+# Newer versions of PyTorch require to explicitly select the (reentrant) checkpointing implementation.
+_CHECKPOINT_KWARGS = {'use_reentrant': True} if 'use_reentrant' in inspect.signature(checkpoint).parameters else {}
+
+
+class _TensorSlot(object):
+    """
+    Placeholder of a tensor in the flattened cell state structure.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+
+def flatten_state(state):
+    """
+    Flattens a (possibly nested) cell state into a structure specification and a list of tensors.
+
+    :param state: Tensor, (named) tuple or list (possibly containing ``None`` or other non-tensor elements).
+
+    :return: Tuple (specification, list of tensors).
+
+    """
+    tensors = []
+
+    def _flatten(s):
+        if isinstance(s, torch.Tensor):
+            tensors.append(s)
+            return _TensorSlot(len(tensors) - 1)
+        elif isinstance(s, tuple) and hasattr(s, '_fields'):
+            return type(s)(*[_flatten(x) for x in s])
+        elif isinstance(s, (tuple, list)):
+            return type(s)(_flatten(x) for x in s)
+        return s
+
+    return _flatten(state), tensors
+
+
+def unflatten_state(spec, tensors):
+    """
+    Recreates the cell state from the structure specification and list of tensors.
+
+    :param spec: Structure specification returned by ``flatten_state()``.
+
+    :param tensors: List of tensors.
+
+    :return: Cell state.
+
+    """
+    if isinstance(spec, _TensorSlot):
+        return tensors[spec.index]
+    elif isinstance(spec, tuple) and hasattr(spec, '_fields'):
+        return type(spec)(*[unflatten_state(x, tensors) for x in spec])
+    elif isinstance(spec, (tuple, list)):
+        return type(spec)(unflatten_state(x, tensors) for x in spec)
+    return spec
+
+
+def _make_segment_function(step_function, state_spec, num_state_tensors, start, end, info):
+    """
+    Creates a function running steps [start, end) of the recurrence, operating on flat lists of tensors.
+
+    .. note::
+
+        The structure of the resulting cell state is stored in ``info``. Tensors passed through the segment \
+        unchanged are not returned (returning inputs of ``checkpoint()`` as its outputs is not supported), \
+        neither are the ``None`` outputs.
+
+    """
+    def run_segment(_dummy, *args):
+        flat_state = args[:num_state_tensors]
+        context = args[num_state_tensors:]
+
+        state = unflatten_state(state_spec, flat_state)
+        outputs = []
+        for step in range(start, end):
+            output, state = step_function(step, state, *context)
+            outputs.append(output)
+
+        new_spec, new_flat_state = flatten_state(state)
+        indices = {id(t): i for i, t in enumerate(flat_state)}
+        info['spec'] = new_spec
+        info['passthrough'] = [indices.get(id(t)) for t in new_flat_state]
+        info['outputs'] = [output is not None for output in outputs]
+
+        return tuple(output for output in outputs if output is not None) + \
+            tuple(t for t in new_flat_state if id(t) not in indices)
+
+    return run_segment
+
+
+def checkpoint_sequence(step_function, state, num_steps, segment_size, context=()):
+    """
+    Runs the recurrence over ``num_steps`` steps, checkpointing segments of ``segment_size`` steps: \
+    only the cell states at the segment borders are stored, the activations inside of the segments \
+    are recomputed during the backward pass.
+
+    .. warning::
+
+        All tensors requiring gradients used by ``step_function`` (apart from the module parameters) \
+        must be passed through ``context``, otherwise the gradient won't flow to them.
+
+    >>> outputs, state = checkpoint_sequence(lambda t, s, x: cell(x[:, t], s), state, x.size(1), 10, (x,))
+
+    :param step_function: Function ``(step, state, *context) -> (output, state)``, where output is a tensor \
+    (or ``None``, when only the final state is needed).
+
+    :param state: Initial cell state (tensor or (possibly nested) tuple/list of tensors).
+
+    :param num_steps: Number of steps of the recurrence.
+    :type num_steps: int
+
+    :param segment_size: Number of steps in a single checkpointed segment.
+    :type segment_size: int
+
+    :param context: Tuple of tensors passed to each step (e.g. inputs).
+    :type context: tuple
+
+    :return: Tuple (list of outputs, final cell state).
+
+    """
+    # Dummy tensor requiring gradient - forces the recomputation even if neither state nor context require it.
+    dummy = torch.ones(1, requires_grad=True)
+
+    outputs = []
+    for start in range(0, num_steps, segment_size):
+        end = min(start + segment_size, num_steps)
+
+        state_spec, flat_state = flatten_state(state)
+        info = {}
+        segment_function = _make_segment_function(step_function, state_spec, len(flat_state), start, end, info)
+
+        results = checkpoint(segment_function, dummy, *flat_state, *context, **_CHECKPOINT_KWARGS)
+        if isinstance(results, torch.Tensor):
+            results = (results,)
+
+        # Split the results into outputs and (new) state tensors.
+        results = iter(results)
+        outputs.extend(next(results) if present else None for present in info['outputs'])
+        new_tensors = results
+        new_flat_state = [flat_state[i] if i is not None else next(new_tensors) for i in info['passthrough']]
+
+        state = unflatten_state(info['spec'], new_flat_state)
+
+    return outputs, state
+
+
+def measure_memory(forward_function, device):
+    """
+    Measures the memory required by a single training step, i.e. forward and backward passes.
+
+    .. note::
+
+        On GPU the peak of the allocated memory is measured. On CPU the total size of the tensors saved \
+        in the forward pass for the backward pass is used instead (requires PyTorch 1.10+).
+
+
+    :param forward_function: Function (without arguments) performing the forward pass and returning a scalar loss.
+
+    :param device: Device the function is run on.
+    :type device: ``torch.device``
+
+    :return: Memory in bytes.
+
+    """
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+        torch.cuda.reset_max_memory_allocated(device)
+        start = torch.cuda.memory_allocated(device)
+        forward_function().backward()
+        torch.cuda.synchronize(device)
+        return torch.cuda.max_memory_allocated(device) - start
+
+    saved = {'bytes': 0}
+
+    def pack(tensor):
+        saved['bytes'] += tensor.numel() * tensor.element_size()
+        return tensor
+
+    with torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor):
+        loss = forward_function()
+    loss.backward()
+    return saved['bytes']
+
+
+if __name__ == '__main__':
+    """ Memory benchmark: compares the memory required by the models with and without gradient checkpointing."""
+    import time
+    from miprometheus.utils.app_state import AppState
+    from miprometheus.utils.data_dict import DataDict
+    from miprometheus.utils.param_interface import ParamInterface
+    from miprometheus.models.ntm.ntm_model import NTM
+    from miprometheus.models.dnc.dnc_model import DNC
+    from miprometheus.models.dwm.dwm_model import DWM
+    from miprometheus.models.thalnet.thalnet_model import ThalNetModel
+    from miprometheus.models.mac.mac_unit import MACUnit
+
+    AppState().visualize = False
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
+    batch_size = 16
+    seq_length = 100
+    segment_size = 10
+    data_bits = 8
+    problem_default_values = {'input_item_size': data_bits + 3, 'output_item_size': data_bits}
+
+    model_params = {
+        'NTM': {'name': 'NTM',
+                'controller': {'name': 'RNNController', 'hidden_state_size': 20, 'num_layers': 1,
+                               'non_linearity': 'sigmoid'},
+                'interface': {'num_read_heads': 1, 'shift_size': 3},
+                'memory': {'num_addresses': -1, 'num_content_bits': 10}},
+        'DNC': {'name': 'DNC', 'hidden_state_size': 20, 'memory_content_size': 10, 'memory_addresses_size': -1,
+                'num_writes': 1, 'num_reads': 1, 'shift_size': 3, 'controller_type': 'LSTMController',
+                'use_ntm_write': False, 'use_ntm_read': False, 'use_ntm_order': False,
+                'use_extra_write_gate': False, 'non_linearity': 'sigmoid'},
+        'DWM': {'name': 'DWM', 'hidden_state_size': 5, 'memory_content_size': 10, 'memory_addresses_size': -1,
+                'num_heads': 1, 'use_content_addressing': False, 'shift_size': 3},
+        'ThalNetModel': {'name': 'ThalNetModel', 'context_input_size': 32, 'input_size': data_bits + 3,
+                         'output_size': data_bits, 'center_size_per_module': 32, 'num_modules': 4}
+        }
+    model_classes = {'NTM': NTM, 'DNC': DNC, 'DWM': DWM, 'ThalNetModel': ThalNetModel}
+
+    def benchmark(name, step):
+        """ Runs a single forward + backward pass and prints the memory usage and time."""
+        start = time.time()
+        memory = measure_memory(step, device)
+        print('{:<28} {:>12.2f} MB {:>10.3f} s'.format(name, memory / 2**20, time.time() - start))
+
+    print('Batch size: {}, sequence length: {}, segment size: {}, device: {}'.format(
+        batch_size, seq_length, segment_size, device))
+
+    for model_name, model_class in model_classes.items():
+        for checkpointing in [False, True]:
+            params = ParamInterface()
+            params.add_config_params(model_params[model_name])
+            params.add_config_params({'checkpoint_segment_size': segment_size if checkpointing else -1})
+            model = model_class(params, problem_default_values).to(device)
+            model.train()
+
+            data_dict = DataDict({
+                'sequences': torch.randn(batch_size, seq_length, data_bits + 3, device=device),
+                'targets': torch.randn(batch_size, seq_length, data_bits, device=device)})
+
+            def step():
+                return model(data_dict).sum()
+
+            benchmark('{} ({})'.format(model_name, 'checkpointing' if checkpointing else 'baseline'), step)
+
+    # MAC reasoning steps.
+    dim = 64
+    for checkpointing in [False, True]:
+        mac_unit = MACUnit(dim=dim, max_step=seq_length,
+                           checkpoint_segment_size=segment_size if checkpointing else -1).to(device)
+        mac_unit.train()
+
+        context = torch.randn(batch_size, 20, dim, device=device)
+        question = torch.randn(batch_size, 2 * dim, device=device)
+        knowledge = torch.randn(batch_size, dim, 14 * 14, device=device)
+        kb_proj = torch.randn(batch_size, dim, 14 * 14, device=device)
+
+        def step():
+            return mac_unit(context, question, knowledge, kb_proj).sum()
+
+        benchmark('MACUnit ({})'.format('checkpointing' if checkpointing else 'baseline'), step)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+columnar_export.py: contains helper functions exporting the statistics to typed columnar files \
+(NumPy structured arrays or Parquet), which (unlike csv files) keep the numeric columns numeric and can be \
+loaded and concatenated without parsing:
+
+    >>> data = np.load('training_statistics.npy')  # or pandas.DataFrame(data)
+    >>> data['loss'].mean()
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import numpy as np
+from numpy.lib import recfunctions
+
+# Supported formats (also extensions of the files).
+COLUMNAR_FORMATS = ['npy', 'parquet']
+
+
+def check_columnar_format(columnar_format):
+    """
+    Checks whether the format is supported and its (optional) dependencies are installed.
+
+    :param columnar_format: Format, one of ``COLUMNAR_FORMATS``.
+    :type columnar_format: str
+
+    """
+    if columnar_format not in COLUMNAR_FORMATS:
+        raise ValueError("Unsupported columnar format '{}' (supported: {})".format(
+            columnar_format, COLUMNAR_FORMATS))
+
+    if columnar_format == 'parquet':
+        try:
+            import pandas  # noqa: F401
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Exporting to parquet requires pandas and pyarrow (pip install pandas pyarrow)")
+
+
+def to_python_value(value):
+    """
+    Converts a single statistic to a python number (or string).
+
+    :param value: Tensor, numpy scalar, number or string (strings representing numbers are parsed).
+
+    :return: int, float, bool or str.
+
+    """
+    # Tensors and numpy scalars.
+    if hasattr(value, 'item'):
+        return value.item()
+
+    if isinstance(value, str):
+        for convert in [int, float]:
+            try:
+                return convert(value)
+            except ValueError:
+                pass
+
+    return value
+
+
+def to_structured_array(columns):
+    """
+    Creates a NumPy structured array from the columns.
+
+    Columns containing only numbers are stored as int64 (or float64, if any of the values is a float or is missing, \
+    i.e. ``None``, which is replaced with NaN). Other columns are stored as strings (``None`` replaced with '').
+
+    :param columns: Ordered dictionary {column name: list of values}, all lists of the same length.
+    :type columns: dict
+
+    :return: Structured array (``numpy.ndarray``).
+
+    """
+    arrays = []
+    for values in columns.values():
+        present = [v for v in values if v is not None]
+        if all(isinstance(v, (bool, int, float)) for v in present):
+            if len(present) < len(values) or any(isinstance(v, float) for v in present):
+                arrays.append(np.array([np.nan if v is None else v for v in values], dtype=np.float64))
+            else:
+                arrays.append(np.array(values, dtype=np.int64))
+        else:
+            arrays.append(np.array(['' if v is None else str(v) for v in values]))
+
+    data = np.empty(len(arrays[0]) if arrays else 0,
+                    dtype=[(name, array.dtype) for name, array in zip(columns.keys(), arrays)])
+    for name, array in zip(columns.keys(), arrays):
+        data[name] = array
+
+    return data
+
+
+def save_columnar(data, filename, columnar_format):
+    """
+    Saves the structured array to a file.
+
+    :param data: Structured array.
+    :type data: ``numpy.ndarray``
+
+    :param filename: Name of the file (without extension).
+    :type filename: str
+
+    :param columnar_format: Format, one of ``COLUMNAR_FORMATS``.
+    :type columnar_format: str
+
+    :return: Name of the created file.
+
+    """
+    check_columnar_format(columnar_format)
+    filename = '{}.{}'.format(filename, columnar_format)
+
+    if columnar_format == 'npy':
+        np.save(filename, data, allow_pickle=False)
+    else:
+        import pandas
+        pandas.DataFrame(data).to_parquet(filename, index=False)
+
+    return filename
+
+
+def load_columnar(filename):
+    """
+    Loads the structured array from a file created by :py:func:`save_columnar`.
+
+    :param filename: Name of the file (with extension).
+    :type filename: str
+
+    :return: Structured array.
+
+    """
+    if filename.endswith('.parquet'):
+        import pandas
+        return pandas.read_parquet(filename).to_records(index=False).view(np.ndarray)
+
+    return np.load(filename, allow_pickle=False)
+
+
+def stack_columnar(arrays):
+    """
+    Stacks structured arrays with the same columns (e.g. consecutive parts of the statistics of a single run). \
+    Columns stored with different types in some arrays (e.g. int64 and float64) are cast to the wider type.
+
+    :param arrays: List of structured arrays.
+    :type arrays: list
+
+    :return: Structured array.
+
+    """
+    return recfunctions.stack_arrays(arrays, usemask=False, autoconvert=True)
+
+
+def concatenate_columnar(arrays, keys, key_name='experiment'):
+    """
+    Concatenates structured arrays (e.g. training statistics of all experiments of a grid), adding a column \
+    identifying the origin of every row. Columns missing in some arrays are filled with default values.
+
+    :param arrays: List of structured arrays.
+    :type arrays: list
+
+    :param keys: List of identifiers (e.g. experiment paths), one per array.
+    :type keys: list
+
+    :param key_name: Name of the added column (DEFAULT: 'experiment').
+    :type key_name: str
+
+    :return: Structured array.
+
+    """
+    arrays = [recfunctions.append_fields(array, key_name, np.full(len(array), key), usemask=False)
+              for array, key in zip(arrays, keys)]
+
+    return stack_columnar(arrays)
@@ -179,13 +179,85 @@ class DataDict(collections.MutableMapping):
 
         return cpu_datadict
 
+    def to(self, device, non_blocking=True):
+        """
+        Returns the DataDict with all its ``torch.tensor`` (s) moved to the given device, in a single pass.
+
+        .. note::
+
+            Wraps call to ``torch.Tensor.to()``: tensors already residing on the device are not copied.
+            If no tensor has to be moved, the original object is returned, otherwise a single new DataDict \
+            is created. If an element of `self` is not a ``torch.tensor``, it is returned as is.
+
+
+        :param device: The destination device, e.g. ``torch.device('cuda')``.
+        :type device: torch.device
+
+        :param non_blocking: If True and the source is in pinned memory, the copy will be asynchronous with respect to \
+        the host. Otherwise, the argument has no effect. Default: ``True``.
+        :type non_blocking: bool
+
+        :return: Moved DataDict.
+
+        """
+        device = torch.device(device)
+        moved = {}
+        for key, value in self.__dict__.items():
+            if isinstance(value, torch.Tensor) and not self.is_on_device(value, device):
+                moved[key] = value.to(device, non_blocking=non_blocking)
+
+        if not moved:
+            return self
+
+        to_datadict = self.__class__(self.__dict__)
+        to_datadict.__dict__.update(moved)
+        return to_datadict
+
+    @staticmethod
+    def is_on_device(tensor, device):
+        """
+        Checks whether the tensor resides on the given device (a device without index, e.g. ``cuda``, \
+        denotes the current device of its type).
+
+        :param tensor: Tensor.
+        :type tensor: torch.Tensor
+
+        :param device: Device.
+        :type device: torch.device
+
+        :return: True if the tensor does not have to be moved.
+
+        """
+        if tensor.device.type != device.type:
+            return False
+        if device.index is None:
+            return device.type != 'cuda' or tensor.device.index == torch.cuda.current_device()
+        return tensor.device.index == device.index
+
+    def pin_memory(self):
+        """
+        Copies the ``torch.tensor`` (s) contained in `self` to pinned (page-locked) memory, enabling the \
+        asynchronous (``non_blocking``) copies to GPU.
+
+        .. note::
+
+            Called by the ``DataLoader`` (when its ``pin_memory`` option is set) on every batch.
+            If an element of `self` is not a ``torch.tensor``, it is returned as is.
+
+
+        :return: Pinned DataDict.
+
+        """
+        return self.__class__({key: value.pin_memory() if isinstance(value, torch.Tensor) else value
+                               for key, value in self.__dict__.items()})
+
     def cuda(self, device=None, non_blocking=False):
         """
         Returns a copy of this object in CUDA memory.
 
         .. note::
 
-            Wraps call to ``torch.Tensor.cuda()``: If this object is already in CUDA memory and on the correct device, \
+            Wraps call to :py:func:`to`: If this object is already in CUDA memory and on the correct device, \
             then no copy is performed and the original object is returned.
             If an element of `self` is not a ``torch.tensor``, it is returned as is, \
             i.e. We only move the ``torch.tensor`` (s) contained in `self`. \
@@ -199,14 +271,11 @@ class DataDict(collections.MutableMapping):
         :type non_blocking: bool
 
         """
-        cuda_datadict = self.__class__({key: None for key in self.keys()})
-        for key in self:
-            if isinstance(self[key], torch.Tensor):
-                cuda_datadict[key] = self[key].cuda(device=device, non_blocking=non_blocking)
-            else:
-                cuda_datadict[key] = self[key]
-
-        return cuda_datadict
+        if device is None:
+            device = torch.device('cuda')
+        elif isinstance(device, int):
+            device = torch.device('cuda', device)
+        return self.to(device, non_blocking=non_blocking)
 
     def detach(self):
         """
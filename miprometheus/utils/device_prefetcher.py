@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+device_prefetcher.py: contains a wrapper of the ``DataLoader`` loading the next batch and copying it to the device \
+(e.g. GPU) in the background, while the current batch is being processed.
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import sys
+import queue
+import threading
+
+import torch
+
+
+class DevicePrefetcher(object):
+    """
+    Iterates over the batches (``DataDict``) of the wrapped iterable (e.g. ``DataLoader``), loading the batch N+1 \
+    and copying it to the device in a background thread while the batch N is being processed.
+
+    >>> for data_dict in DevicePrefetcher(dataloader, torch.device('cuda'), pin_memory=True):
+    >>>     logits = model(data_dict)   # data_dict is already on the GPU.
+
+    On GPU, the copies are issued (``non_blocking``) on a separate CUDA stream, which the stream of the \
+    consumer waits for before using the batch. The batches can be additionally copied to pinned memory first \
+    (required for the copies to be really asynchronous).
+
+    On CPU, only the loading (i.e. the generation) of the batches overlaps with their processing.
+
+    .. note::
+
+        Every iteration starts a new background thread, which stops when the iteration ends \
+        (or is abandoned, e.g. by ``break``).
+
+    .. warning::
+
+        The batches are loaded in a different thread than the one consuming them, so if both use the (global) \
+        random number generator of ``torch`` (e.g. problem generating the samples and model using dropout), \
+        the order of the random draws - and hence the results - are not reproducible.
+
+    """
+
+    def __init__(self, iterable, device, pin_memory=False, depth=1):
+        """
+        Initializes the prefetcher.
+
+        :param iterable: Iterable returning ``DataDict`` (s), e.g. ``DataLoader``.
+
+        :param device: Device the batches are copied to.
+        :type device: torch.device
+
+        :param pin_memory: Copies the batches to pinned memory first (used only for CUDA devices, DEFAULT: False).
+        :type pin_memory: bool
+
+        :param depth: Number of batches prepared in advance (DEFAULT: 1).
+        :type depth: int
+
+        """
+        self.iterable = iterable
+        self.device = torch.device(device)
+        self.depth = depth
+
+        self.use_cuda = (self.device.type == 'cuda')
+        if self.use_cuda and self.device.index is None:
+            # Threads start with the default device, so the current one must be set explicitly.
+            self.device = torch.device('cuda', torch.cuda.current_device())
+        self.pin_memory = pin_memory and self.use_cuda
+
+    def __len__(self):
+        """
+        :return: Length of the wrapped iterable.
+
+        """
+        return len(self.iterable)
+
+    def load(self, batches, stop):
+        """
+        Body of the background thread: loads the batches, copies them to the device and puts them into the queue.
+
+        :param batches: Queue of the prepared batches.
+        :type batches: queue.Queue
+
+        :param stop: Event signaling that the iteration ended.
+        :type stop: threading.Event
+
+        """
+        try:
+            stream = None
+            if self.use_cuda:
+                torch.cuda.set_device(self.device)
+                stream = torch.cuda.Stream(self.device)
+
+            for batch in self.iterable:
+                if self.pin_memory:
+                    batch = batch.pin_memory()
+
+                if stream is not None:
+                    with torch.cuda.stream(stream):
+                        batch = batch.to(self.device, non_blocking=True)
+                        ready = torch.cuda.Event()
+                        ready.record(stream)
+                else:
+                    batch = batch.to(self.device)
+                    ready = None
+
+                if not self.put(batches, stop, (batch, ready)):
+                    return
+
+            self.put(batches, stop, None)
+
+        except Exception:
+            # Pass the exception to the consumer.
+            self.put(batches, stop, sys.exc_info())
+
+    @staticmethod
+    def put(batches, stop, item):
+        """
+        Puts the item into the queue, waiting for a free slot until the iteration ends.
+
+        :return: False if the iteration ended.
+
+        """
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter__(self):
+        """
+        Starts the background thread and returns the prepared batches.
+
+        """
+        batches = queue.Queue(maxsize=self.depth)
+        stop = threading.Event()
+        thread = threading.Thread(target=self.load, args=(batches, stop), daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                item = batches.get()
+                if item is None:
+                    return
+
+                if len(item) == 3:
+                    # Re-raise the exception of the background thread.
+                    raise item[1].with_traceback(item[2])
+
+                batch, ready = item
+                if ready is not None:
+                    current_stream = torch.cuda.current_stream(self.device)
+                    current_stream.wait_event(ready)
+                    # The memory of the tensors (allocated on the other stream) cannot be reused until \
+                    # the consumer is done with them.
+                    for value in batch.values():
+                        if isinstance(value, torch.Tensor) and value.is_cuda:
+                            value.record_stream(current_stream)
+
+                yield batch
+        finally:
+            stop.set()
+
+
+if __name__ == '__main__':
+    """Benchmarks the overlap of loading and processing of the batches, using the CPU as a stand-in for the device."""
+    import time
+    from miprometheus.utils.data_dict import DataDict
+
+    batch_size, size, num_batches = 64, 256, 50
+
+    def batches():
+        # Stand-in for a problem generating the batches on the fly.
+        for _ in range(num_batches):
+            inputs = torch.randn(batch_size, size, size)
+            yield DataDict({'inputs': inputs.sigmoid().bernoulli(), 'targets': inputs.tanh()})
+
+    weights = torch.randn(size, size)
+
+    def process(data_dict):
+        # Stand-in for the forward and backward passes.
+        outputs = data_dict['inputs']
+        for _ in range(4):
+            outputs = torch.matmul(outputs, weights).tanh()
+        return (outputs - data_dict['targets']).pow(2).mean().item()
+
+    def measure(iterable, process_fn):
+        start = time.perf_counter()
+        for data_dict in iterable:
+            process_fn(data_dict)
+        return time.perf_counter() - start
+
+    # Warm-up.
+    measure(batches(), process)
+
+    load_time = measure(batches(), lambda data_dict: None)
+    process_time = measure([next(batches())] * num_batches, process)
+    sequential_time = measure(batches(), process)
+    prefetched_time = measure(DevicePrefetcher(batches(), torch.device('cpu')), process)
+
+    # Fraction of the (shorter of) loading and processing time hidden by the prefetching.
+    overlap = (sequential_time - prefetched_time) / min(load_time, process_time)
+
+    print('Loading:    {:.3f}s'.format(load_time))
+    print('Processing: {:.3f}s'.format(process_time))
+    print('Sequential: {:.3f}s'.format(sequential_time))
+    print('Prefetched: {:.3f}s'.format(prefetched_time))
+    print('Overlap:    {:.1f}%'.format(100 * overlap))
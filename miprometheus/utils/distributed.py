@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+distributed.py: contains helper functions used by the workers for data-parallel training with ``torch.distributed``.
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import torch
+import torch.distributed as dist
+
+from miprometheus.utils.app_state import AppState
+from miprometheus.utils.statistics_collector import StatisticsCollector
+
+
+def initialize_process_group(backend='gloo', init_method='env://'):
+    """
+    Initializes the default process group and stores the rank & world size in the ``AppState``.
+
+    .. note::
+
+        The default ``env://`` initialization method reads ``MASTER_ADDR``, ``MASTER_PORT``, ``RANK`` and \
+        ``WORLD_SIZE`` from the environment, i.e. the variables set by ``torchrun``.
+
+    :param backend: Backend used for communication (DEFAULT: 'gloo').
+    :type backend: str
+
+    :param init_method: URL specifying how to initialize the process group (DEFAULT: 'env://').
+    :type init_method: str
+
+    """
+    if not dist.is_initialized():
+        dist.init_process_group(backend=backend, init_method=init_method)
+
+    AppState().set_distributed(dist.get_rank(), dist.get_world_size())
+
+
+def broadcast_parameters(model, src=0):
+    """
+    Broadcasts the parameters and buffers of the model from the ``src`` process to all the other ones, \
+    so that all replicas start from the same state.
+
+    :param model: Model to be synchronized.
+    :type model: ``torch.nn.Module``
+
+    :param src: Rank of the source process (DEFAULT: 0).
+    :type src: int
+
+    """
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        dist.broadcast(tensor.data, src=src)
+
+
+def average_gradients(model):
+    """
+    Averages the gradients of the model parameters over all processes.
+
+    :param model: Model whose gradients will be averaged (in place).
+    :type model: ``torch.nn.Module``
+
+    """
+    world_size = float(dist.get_world_size())
+    for param in model.parameters():
+        if param.grad is None:
+            continue
+        dist.all_reduce(param.grad.data, op=dist.ReduceOp.SUM)
+        param.grad.data /= world_size
+
+
+def all_reduce_mean(value):
+    """
+    Averages a scalar value over all processes.
+
+    :param value: Scalar (python number or 0-dim tensor) to be averaged.
+
+    :return: Averaged value as a 0-dim tensor.
+
+    """
+    if isinstance(value, torch.Tensor):
+        tensor = value.detach().clone().double().cpu()
+    else:
+        tensor = torch.tensor(value, dtype=torch.float64)
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return (tensor / dist.get_world_size()).float()
+
+
+def all_gather_list(values):
+    """
+    Gathers lists of numbers (possibly of different lengths) from all processes.
+
+    :param values: List of python numbers or 0-dim tensors collected by the current process.
+    :type values: list
+
+    :return: Concatenation of the lists gathered from processes 0, 1, ..., world_size-1.
+
+    """
+    world_size = dist.get_world_size()
+
+    # Convert to floats - remembering whether we should return ints.
+    values = [v.item() if isinstance(v, torch.Tensor) else v for v in values]
+    all_ints = all(isinstance(v, int) for v in values)
+    local = torch.tensor(values, dtype=torch.float64)
+
+    # Exchange the lengths first, as all_gather requires tensors of equal sizes.
+    local_len = torch.tensor([len(values)], dtype=torch.int64)
+    lengths = [torch.zeros(1, dtype=torch.int64) for _ in range(world_size)]
+    dist.all_gather(lengths, local_len)
+    lengths = [int(l.item()) for l in lengths]
+    max_len = max(lengths)
+
+    # Pad, gather and trim.
+    padded = torch.zeros(max_len, dtype=torch.float64)
+    padded[:len(values)] = local
+    gathered = [torch.zeros(max_len, dtype=torch.float64) for _ in range(world_size)]
+    dist.all_gather(gathered, padded)
+
+    result = []
+    for tensor, length in zip(gathered, lengths):
+        result.extend(tensor[:length].tolist())
+
+    if all_ints:
+        result = [int(v) for v in result]
+    return result
+
+
+def gather_statistics(stat_col):
+    """
+    Creates a new ``StatisticsCollector`` containing the statistics collected by all processes.
+
+    .. note::
+
+        Only numerical statistics are gathered. The other ones (e.g. lists of strings) are copied \
+        from the local collector as they are.
+
+    :param stat_col: Local ``StatisticsCollector``.
+
+    :return: ``StatisticsCollector`` with statistics gathered from all processes.
+
+    """
+    gathered_col = StatisticsCollector()
+
+    # Iterate over keys in the same order in all processes.
+    for key in stat_col:
+        gathered_col.add_statistic(key, stat_col.formatting[key])
+
+        values = stat_col[key]
+        numeric = all(isinstance(v, (int, float)) or
+                      (isinstance(v, torch.Tensor) and v.numel() == 1) for v in values)
+
+        # All processes must agree on whether to take part in the collective call.
+        flag = torch.tensor([1 if numeric else 0], dtype=torch.int64)
+        dist.all_reduce(flag, op=dist.ReduceOp.MIN)
+
+        if flag.item() == 1:
+            gathered_col.statistics[key] = all_gather_list(values)
+        else:
+            gathered_col.statistics[key] = list(values)
+
+    return gathered_col
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+fused_lstm.py: contains a helper running a stack of ``torch.nn.LSTMCell`` over whole sequences with a single \
+(multi-layer, cuDNN on GPU) ``torch.nn.LSTM`` call, instead of step by step.
+
+The parameters of the cells are used directly, so the models keep their ``state_dict`` (and hence can load \
+the existing checkpoints).
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import torch
+import logging
+import warnings
+
+
+def get_functional_call():
+    """
+    Returns the function calling a module with substituted parameters (``torch.func.functional_call`` or, \
+    in older versions of PyTorch, ``torch.nn.utils.stateless.functional_call``).
+
+    :return: Function or ``None`` if not available.
+
+    """
+    if hasattr(torch, 'func') and hasattr(torch.func, 'functional_call'):
+        return torch.func.functional_call
+    try:
+        from torch.nn.utils.stateless import functional_call
+        return functional_call
+    except ImportError:
+        return None
+
+
+class FusedLSTM(object):
+    """
+    Runs a stack of ``torch.nn.LSTMCell`` over whole sequences as a single multi-layer ``torch.nn.LSTM``.
+
+    >>> fused_lstm = FusedLSTM([cell_layer_1, cell_layer_2])
+    >>> outputs_BxSxH, (h_LxBxH, c_LxBxH) = fused_lstm(inputs_BxSxI)
+
+    .. warning::
+
+        The object is not a ``torch.nn.Module``, so the parameters of the cells are not registered twice \
+        (which would change the names of the parameters in the state dictionary).
+
+
+    """
+
+    def __init__(self, cells, logger=None):
+        """
+        Initializes the fused LSTM.
+
+        :param cells: List of ``torch.nn.LSTMCell``, the output of each cell being the input of the next one.
+        :type cells: list
+
+        :param logger: Logger used for reporting (DEFAULT: module logger).
+
+        """
+        self.logger = logger if logger is not None else logging.getLogger('FusedLSTM')
+        self.cells = list(cells)
+
+        self.functional_call = get_functional_call()
+        if self.functional_call is None:
+            self.logger.warning("functional_call is not available in PyTorch {}, running the LSTM cells "
+                                "step by step".format(torch.__version__))
+            return
+
+        # Template of the LSTM - its own parameters are never used, so (if possible) they are not even allocated.
+        lstm_args = (self.cells[0].input_size, self.cells[0].hidden_size)
+        lstm_kwargs = {'num_layers': len(self.cells), 'bias': self.cells[0].bias, 'batch_first': True}
+        try:
+            self.lstm = torch.nn.LSTM(*lstm_args, device='meta', **lstm_kwargs)
+        except (TypeError, RuntimeError):
+            self.lstm = torch.nn.LSTM(*lstm_args, **lstm_kwargs)
+
+    def is_available(self):
+        """
+        Checks whether the fused execution is supported by the installed version of PyTorch.
+
+        :return: True if the fused execution is available.
+
+        """
+        return self.functional_call is not None
+
+    def get_parameters(self):
+        """
+        Returns the parameters of the cells, named as the parameters of the corresponding layers of \
+        ``torch.nn.LSTM``.
+
+        :return: Dictionary of parameters.
+
+        """
+        params = {}
+        for layer, cell in enumerate(self.cells):
+            params['weight_ih_l{}'.format(layer)] = cell.weight_ih
+            params['weight_hh_l{}'.format(layer)] = cell.weight_hh
+            if cell.bias:
+                params['bias_ih_l{}'.format(layer)] = cell.bias_ih
+                params['bias_hh_l{}'.format(layer)] = cell.bias_hh
+        return params
+
+    def __call__(self, inputs, hx=None):
+        """
+        Runs the stack of cells over the whole sequences.
+
+        :param inputs: Input sequences [BATCH_SIZE x SEQ_LENGTH x INPUT_SIZE].
+        :type inputs: ``torch.Tensor``
+
+        :param hx: Initial state: tuple (hidden state, memory cell), both of size \
+        [NUM_LAYERS x BATCH_SIZE x HIDDEN_SIZE] (DEFAULT: None, i.e. zeros).
+        :type hx: tuple
+
+        :return: Hidden states of the last layer [BATCH_SIZE x SEQ_LENGTH x HIDDEN_SIZE] and \
+        the final state tuple (hidden state, memory cell).
+
+        """
+        args = (inputs,) if hx is None else (inputs, hx)
+        with warnings.catch_warnings():
+            # The parameters of the cells are not kept in a single contiguous chunk of memory (as cuDNN prefers).
+            warnings.filterwarnings('ignore', message='RNN module weights are not part of single contiguous')
+            return self.functional_call(self.lstm, self.get_parameters(), args)
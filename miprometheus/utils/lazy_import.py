@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+lazy_import.py: contains a function making the attributes of a package (classes, functions) lazily imported, \
+i.e. the module defining a given attribute is imported only when the attribute is accessed for the first time.
+
+This way e.g. building a single problem with :py:class:`miprometheus.problems.ProblemFactory` imports only the \
+module of that problem (and its dependencies), not all the problems (and e.g. ``torchvision``, ``nltk`` or \
+``h5py`` they depend on).
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import sys
+import importlib
+
+
+def lazy_package(package, attributes=None, subpackages=()):
+    """
+    Creates the module-level ``__getattr__`` and ``__dir__`` functions (PEP 562) of a package, \
+    importing its attributes lazily.
+
+    >>> __getattr__, __dir__ = lazy_package(__name__,
+    >>>                                     attributes={'Problem': '.problem'},
+    >>>                                     subpackages=['.image_to_class', '.seq_to_seq'])
+
+    The attributes of the package are:
+
+        - the attributes listed in ``attributes``, each defined in the indicated module,
+        - the attributes listed in ``__all__`` of the ``subpackages`` (re-exported, like with \
+        ``from .subpackage import *``). When the same name is exported by several subpackages, the last one wins,
+        - the subpackages themselves.
+
+    ``__all__`` of the package (containing all the attributes except the subpackages) is computed on demand, \
+    so ``from package import *`` still imports everything.
+
+    .. note::
+
+        The attributes having the same name as the modules defining them (e.g. function ``split_indices`` \
+        defined in module ``split_indices``) are imported eagerly: importing such a module anywhere binds \
+        its name in the package, which would then hide the attribute (``__getattr__`` is not called \
+        for existing names).
+
+    .. note::
+
+        Module ``__getattr__`` is supported starting from Python 3.7. In older versions, all the attributes \
+        are imported eagerly.
+
+    :param package: Name of the package (``__name__``).
+    :type package: str
+
+    :param attributes: Dictionary mapping the names of the attributes to the (relative) names of the modules \
+    defining them (DEFAULT: None).
+    :type attributes: dict
+
+    :param subpackages: List of (relative) names of the subpackages whose attributes are re-exported (DEFAULT: ()).
+    :type subpackages: list
+
+    :return: Tuple of functions (``__getattr__``, ``__dir__``).
+
+    """
+    attributes = dict(attributes or {})
+    subpackages = list(subpackages)
+
+    def get_all():
+        names = list(attributes)
+        for subpackage in subpackages:
+            names += [name for name in importlib.import_module(subpackage, package).__all__ if name not in names]
+        return names
+
+    def __getattr__(name):
+        if name == '__all__':
+            value = get_all()
+        elif name in attributes:
+            value = getattr(importlib.import_module(attributes[name], package), name)
+        elif '.' + name in subpackages:
+            value = importlib.import_module('.' + name, package)
+        else:
+            # Search the subpackages - the last one exporting the name wins.
+            for subpackage in reversed(subpackages):
+                module = importlib.import_module(subpackage, package)
+                if name in module.__all__:
+                    value = getattr(module, name)
+                    break
+            else:
+                raise AttributeError("module '{}' has no attribute '{}'".format(package, name))
+
+        # Store the attribute, so it will not be looked up again.
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(get_all()))
+
+    if sys.version_info < (3, 7):
+        # Import everything eagerly.
+        for name in ['__all__'] + get_all():
+            __getattr__(name)
+    else:
+        # Import eagerly the attributes which would be hidden by the modules defining them.
+        for name, module in attributes.items():
+            if module == '.' + name:
+                __getattr__(name)
+
+    return __getattr__, __dir__
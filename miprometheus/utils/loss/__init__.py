@@ -1,7 +1,6 @@
-from .masked_cross_entropy_loss import MaskedCrossEntropyLoss
-from .masked_bce_with_logits_loss import MaskedBCEWithLogitsLoss
+from miprometheus.utils.lazy_import import lazy_package
 
-
-__all__ = [
-    'MaskedCrossEntropyLoss',
-    'MaskedBCEWithLogitsLoss']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'MaskedCrossEntropyLoss': '.masked_cross_entropy_loss',
+                                                'MaskedBCEWithLogitsLoss': '.masked_bce_with_logits_loss'})
@@ -1,4 +1,6 @@
-from .generate_feature_maps import GenerateFeatureMaps
-from .language import Language
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['GenerateFeatureMaps', 'Language']
\ No newline at end of file
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'GenerateFeatureMaps': '.generate_feature_maps',
+                                                'Language': '.language'})
@@ -24,6 +24,9 @@ __author__ = "Tomasz Kornuta"
 import os
 import logging
 import torch.utils.data.sampler
+import torch.utils.data.distributed
+
+from miprometheus.utils.app_state import AppState
 
 
 class SamplerFactory(object):
@@ -51,8 +54,8 @@ class SamplerFactory(object):
 
         .. warning::
 
-            ``torch.utils.data.sampler.WeightedRandomSampler``, ``torch.utils.data.sampler.BatchSampler``, \
-            ``torch.utils.data.sampler.DistributedSampler`` are not yet supported.
+            ``torch.utils.data.sampler.WeightedRandomSampler`` and ``torch.utils.data.sampler.BatchSampler`` \
+            are not yet supported.
 
         .. note::
 
@@ -71,6 +74,18 @@ class SamplerFactory(object):
             - Option 4: name of the file containing indices.
                 >>> filename = "~/data/mnist/training_indices.txt"
 
+        .. note::
+
+            ``torch.utils.data.distributed.DistributedSampler`` restricts the problem to the subset of samples \
+            handled by the current process. The number of replicas and the rank are taken from the ``AppState`` \
+            (set up by the worker in distributed mode), unless ``num_replicas`` and ``rank`` are indicated. \
+            Optionally, one can also set ``shuffle`` (DEFAULT: True).
+
+        .. note::
+
+            In distributed mode, the indices of ``SubsetRandomSampler`` are sharded between the processes \
+            (every ``world_size``-th index, starting from the rank), while the other samplers are not supported.
+
 
         :return: Instance of a given sampler or ``None`` if the section not present or couldn't build the sampler.
 
@@ -92,12 +107,15 @@ class SamplerFactory(object):
             name = params['name']
 
             # Verify that the specified class is in the samplers package.
-            if name not in dir(torch.utils.data.sampler):
+            if name in dir(torch.utils.data.sampler):
+                # Get the actual class.
+                sampler_class = getattr(torch.utils.data.sampler, name)
+            elif name in dir(torch.utils.data.distributed):
+                # DistributedSampler is defined in a separate module.
+                sampler_class = getattr(torch.utils.data.distributed, name)
+            else:
                 raise Exception("Could not find the specified class '{}' in the samplers package".format(name))
 
-            # Get the actual class.
-            sampler_class = getattr(torch.utils.data.sampler, name)
-
             # Ok, proceed.
             logger.info('Loading the {} sampler from {}'.format(name, sampler_class.__module__))
 
@@ -147,15 +165,44 @@ class SamplerFactory(object):
                                                                                                 len(problem)))
                     exit(-1)
 
+                # In distributed mode every process samples from its own shard of the indices.
+                app_state = AppState()
+                if app_state.distributed:
+                    indices = list(indices)[app_state.rank::app_state.world_size]
+                    if len(indices) == 0:
+                        logger.error("SubsetRandomSampler cannot shard less indices than the number of processes "
+                                     "({})!".format(app_state.world_size))
+                        exit(-3)
+                    logger.info("Using shard {} of the indices ({} samples)".format(app_state.rank, len(indices)))
+
                 # Create the sampler object.
                 sampler = sampler_class(indices)
 
-            elif sampler_class.__name__ in ['WeightedRandomSampler', 'BatchSampler', 'DistributedSampler']:
+            elif sampler_class.__name__ == 'DistributedSampler':
+
+                # Get the number of replicas and rank - by default from the application state.
+                app_state = AppState()
+                params.add_default_params({'num_replicas': app_state.world_size,
+                                           'rank': app_state.rank,
+                                           'shuffle': True})
+
+                # Create the sampler object.
+                sampler = sampler_class(problem, num_replicas=params['num_replicas'],
+                                        rank=params['rank'], shuffle=params['shuffle'])
+
+            elif sampler_class.__name__ in ['WeightedRandomSampler', 'BatchSampler']:
                 # Sorry, don't support those. Yet;)
                 logger.error("Sampler Factory currently does not support {} sampler. Please pick one of the others "
                              "or use defaults random sampling.".format(sampler_class.__name__))
                 exit(-2)
             else:
+                if AppState().distributed:
+                    # The "regular" samplers would make all processes work on the same samples.
+                    logger.error("{} sampler cannot be used in distributed mode. Please use DistributedSampler or "
+                                 "SubsetRandomSampler (sharded between the processes) instead.".format(
+                                    sampler_class.__name__))
+                    exit(-4)
+
                 # Create "regular" sampler.
                 sampler = sampler_class(problem)
 
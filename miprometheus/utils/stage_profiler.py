@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) IBM Corporation 2018
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+stage_profiler.py: contains a lightweight profiler measuring the time spent by the workers in the consecutive \
+stages (data loading, forward pass, backward pass etc.) of every episode.
+
+"""
+__author__ = "Tomasz Kornuta"
+
+import time
+import numpy as np
+from collections import OrderedDict
+
+import torch
+
+
+# Stages of a training episode.
+TRAINING_STAGES = ['data_wait', 'to_device', 'forward', 'loss', 'backward', 'clipping', 'optimizer_step',
+                   'statistics', 'export', 'visualization', 'validation']
+
+# Stages of a test episode.
+TESTING_STAGES = ['data_wait', 'to_device', 'forward', 'loss', 'statistics', 'export', 'visualization']
+
+
+class _NullStage(object):
+    """
+    Context manager doing nothing, returned by a disabled profiler.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class _Stage(object):
+    """
+    Context manager measuring the duration of a single stage.
+    """
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        # Time only the outermost stage, e.g. the forward passes done during validation belong to the latter.
+        if self.profiler.active_stage is None:
+            self.profiler.active_stage = self.name
+            self.profiler.synchronize()
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        if self.start is not None:
+            self.profiler.synchronize()
+            self.profiler.add_time(self.name, time.perf_counter() - self.start)
+            self.profiler.active_stage = None
+            self.start = None
+        return False
+
+
+class StageProfiler(object):
+    """
+    Measures the (wall-clock) time spent in the stages of the episodes and computes its percentiles.
+
+    >>> profiler = StageProfiler(enabled=True, stages=['data_wait', 'forward'])
+    >>> for episode, data_dict in enumerate(profiler.iterate(dataloader)):
+    >>>     with profiler.stage('forward'):
+    >>>         logits = model(data_dict)
+    >>>     profiler.end_episode(episode)
+
+    The times of a stage executed several times during an episode are summed. Stages are not nested: \
+    a stage started inside another one is attributed to the latter.
+
+    Additionally, the profiler measures the total time of the episodes (``total`` stage), starting when \
+    the next batch is requested from the iterable passed to :py:func:`iterate`.
+
+    .. note::
+
+        When disabled, :py:func:`stage` returns a shared context manager doing nothing and :py:func:`iterate` \
+        returns the iterable unchanged, so the instrumented code runs with a negligible overhead.
+
+    .. warning::
+
+        With ``synchronize_cuda`` set, the CUDA device is synchronized at the beginning and end of every stage, \
+        so the asynchronously executed kernels are attributed to the right stages. This prevents the overlapping \
+        of the consecutive stages, so the profiled episodes can be slightly slower.
+
+    """
+
+    def __init__(self, enabled=False, stages=TRAINING_STAGES, percentiles=(50, 90, 99), synchronize_cuda=False):
+        """
+        Initializes the profiler.
+
+        :param enabled: Enables the profiling (DEFAULT: False).
+        :type enabled: bool
+
+        :param stages: List of the names of the profiled stages (DEFAULT: ``TRAINING_STAGES``).
+        :type stages: list
+
+        :param percentiles: Computed percentiles of the times (DEFAULT: (50, 90, 99)).
+        :type percentiles: tuple
+
+        :param synchronize_cuda: Synchronizes the CUDA device at the borders of the stages (DEFAULT: False).
+        :type synchronize_cuda: bool
+
+        """
+        self.enabled = enabled
+        self.stages = list(stages) + ['total']
+        self.percentiles = percentiles
+        self.synchronize_cuda = synchronize_cuda
+
+        self.null_stage = _NullStage()
+        self.active_stage = None
+        self.episode_start = None
+        self.last_episode = 0
+
+        # Times of the current episode and of the episodes profiled since the last reset.
+        self.episode_times = {}
+        self.times = OrderedDict((name, []) for name in self.stages)
+
+    def synchronize(self):
+        """
+        Waits for the CUDA kernels to finish (if ``synchronize_cuda`` is set).
+
+        """
+        if self.synchronize_cuda:
+            torch.cuda.synchronize()
+
+    def stage(self, name):
+        """
+        Returns a context manager measuring the duration of the given stage.
+
+        :param name: Name of the stage.
+        :type name: str
+
+        :return: Context manager.
+
+        """
+        if not self.enabled:
+            return self.null_stage
+        return _Stage(self, name)
+
+    def add_time(self, name, duration):
+        """
+        Adds the duration of a stage to the times of the current episode.
+
+        :param name: Name of the stage.
+        :type name: str
+
+        :param duration: Duration (in seconds).
+        :type duration: float
+
+        """
+        self.episode_times[name] = self.episode_times.get(name, 0.0) + duration
+
+    def iterate(self, iterable, name='data_wait'):
+        """
+        Wraps the iterable (e.g. ``DataLoader``), measuring the time of waiting for its consecutive items.
+
+        :param iterable: Iterable.
+
+        :param name: Name of the stage (DEFAULT: 'data_wait').
+        :type name: str
+
+        :return: Iterable returning the same items.
+
+        """
+        if not self.enabled:
+            return iterable
+        return self._iterate(iterable, name)
+
+    def _iterate(self, iterable, name):
+        """
+        Generator timing the items of the iterable, see :py:func:`iterate`.
+
+        """
+        iterator = iter(iterable)
+        while True:
+            # The episode starts when its batch is requested.
+            self.episode_start = time.perf_counter()
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def end_episode(self, episode):
+        """
+        Ends the current episode, storing the times of its stages.
+
+        :param episode: Index of the episode.
+        :type episode: int
+
+        """
+        if not self.enabled:
+            return
+
+        if self.episode_start is not None:
+            self.episode_times['total'] = time.perf_counter() - self.episode_start
+            self.episode_start = None
+
+        # Stages not executed during the episode are skipped.
+        for name, duration in self.episode_times.items():
+            if name in self.times:
+                self.times[name].append(duration)
+
+        self.episode_times = {}
+        self.last_episode = episode
+
+    def has_episodes(self):
+        """
+        Checks whether any episode was profiled since the last reset.
+
+        :return: True if there are times to export.
+
+        """
+        return any(len(times) > 0 for times in self.times.values())
+
+    def reset(self):
+        """
+        Removes the times of the profiled episodes.
+
+        """
+        for times in self.times.values():
+            del times[:]
+
+    def add_statistics(self, stat_col):
+        """
+        Adds the percentiles of the times of all stages (in milliseconds) to the ``StatisticsCollector``.
+
+        :param stat_col: ``StatisticsCollector``.
+
+        """
+        stat_col.add_statistic('episode', '{:06d}')
+        stat_col.add_statistic('profiled_episodes', '{:06d}')
+        for name in self.stages:
+            for percentile in self.percentiles:
+                stat_col.add_statistic('{}_ms_p{}'.format(name, percentile), '{:.3f}')
+
+    def collect_statistics(self, stat_col):
+        """
+        Computes the percentiles of the times of all stages (in milliseconds) over the episodes profiled since \
+        the last reset, sets them in the ``StatisticsCollector`` and resets the profiler.
+
+        .. note::
+
+            The percentiles of the stages which were not executed are set to NaN.
+
+        :param stat_col: ``StatisticsCollector``.
+
+        """
+        stat_col['episode'] = self.last_episode
+        stat_col['profiled_episodes'] = max(len(times) for times in self.times.values())
+        for name, times in self.times.items():
+            values = np.percentile(np.array(times) * 1000, self.percentiles) if len(times) > 0 \
+                else [float('nan')] * len(self.percentiles)
+            for percentile, value in zip(self.percentiles, values):
+                stat_col['{}_ms_p{}'.format(name, percentile)] = float(value)
+
+        self.reset()
@@ -166,6 +166,10 @@ class StatisticsAggregator(StatisticsCollector):
         # Try to use the remembered one.    
         if csv_file is None:
             csv_file = self.csv_file
+        # Store the (typed) values for the columnar export (if enabled).
+        if self.columnar_columns is not None:
+            self.append_columnar_row(self.aggregators)
+
         # If it is still None - well, we cannot do anything more.
         if csv_file is None:
             return
@@ -22,7 +22,11 @@ statistics_collector.py: contains class used for collection and export of statis
  """
 __author__ = "Tomasz Kornuta & Vincent Marois"
 
-from collections import Mapping
+import os
+from collections import Mapping, OrderedDict
+
+from miprometheus.utils.columnar_export import check_columnar_format, to_python_value, to_structured_array, \
+    save_columnar, load_columnar, stack_columnar
 
 
 class StatisticsCollector(Mapping):
@@ -44,6 +48,14 @@ class StatisticsCollector(Mapping):
         self.tb_writer = None
         self.csv_file = None
 
+        # Columnar export is disabled by default.
+        self.columnar_columns = None
+        self.columnar_filename = None
+        self.columnar_format = None
+        self.columnar_flush_interval = None
+        self.columnar_unflushed_rows = 0
+        self.columnar_parts = []
+
         self.statistics = dict()
         self.formatting = dict()
 
@@ -153,6 +165,10 @@ class StatisticsCollector(Mapping):
         # Try to use the remembered one.    
         if csv_file is None:
             csv_file = self.csv_file
+        # Store the (typed) values for the columnar export (if enabled).
+        if self.columnar_columns is not None:
+            self.append_columnar_row({key: value[-1] for key, value in self.statistics.items()})
+
         # If it is still None - well, we cannot do anything more.
         if csv_file is None:
             return
@@ -171,6 +187,118 @@ class StatisticsCollector(Mapping):
 
         csv_file.write(values_str)
 
+    def initialize_columnar_export(self, log_dir, filename, columnar_format, flush_interval=100):
+        """
+        Enables the export of the statistics to a typed columnar file, in parallel to the csv file.
+
+        .. note::
+
+            The rows are gathered in memory (as python numbers) by :py:func:`export_to_csv` and written every \
+            ``flush_interval`` rows to a separate part file (``<filename>.part<N>.<format>``), so only the \
+            unflushed rows are kept in memory and the parts are available also when the run is interrupted. \
+            :py:func:`finalize_columnar_export` concatenates the parts into the final file.
+
+
+        :param log_dir: Path to file.
+        :type log_dir: str
+
+        :param filename: Filename to be created (without extension).
+        :type filename: str
+
+        :param columnar_format: Format of the file, 'npy' (NumPy structured array) or 'parquet'.
+        :type columnar_format: str
+
+        :param flush_interval: Number of rows written to a single part file (DEFAULT: 100).
+        :type flush_interval: int
+
+        """
+        check_columnar_format(columnar_format)
+
+        self.columnar_columns = OrderedDict()
+        self.columnar_filename = log_dir + filename
+        self.columnar_format = columnar_format
+        self.columnar_flush_interval = flush_interval
+        self.columnar_unflushed_rows = 0
+        self.columnar_parts = []
+
+    def append_columnar_row(self, values):
+        """
+        Appends a row of values to the columns exported to the columnar file (if enabled).
+
+        .. note::
+
+            All rows must contain the same keys (the ones of the first row).
+
+        :param values: Dictionary {key: value}.
+        :type values: dict
+
+        """
+        if self.columnar_columns is None:
+            return
+
+        if len(self.columnar_columns) == 0:
+            # The first row defines the columns.
+            for key in values.keys():
+                self.columnar_columns[key] = []
+
+        elif set(values.keys()) != set(self.columnar_columns.keys()):
+            raise KeyError("The keys of the row {} differ from the columns exported to {} ({})".format(
+                sorted(values.keys()), self.columnar_filename, sorted(self.columnar_columns.keys())))
+
+        for key, column in self.columnar_columns.items():
+            column.append(to_python_value(values[key]))
+
+        # Periodically write the gathered rows.
+        self.columnar_unflushed_rows += 1
+        if self.columnar_unflushed_rows >= self.columnar_flush_interval:
+            self.flush_columnar_export()
+
+    def flush_columnar_export(self):
+        """
+        Writes the rows gathered since the last flush to a new part file (if enabled) and removes them \
+        from memory.
+
+        :return: Name of the created part file (or ``None``).
+
+        """
+        if self.columnar_columns is None or self.columnar_unflushed_rows == 0:
+            return None
+
+        part_filename = save_columnar(to_structured_array(self.columnar_columns),
+                                      '{}.part{}'.format(self.columnar_filename, len(self.columnar_parts)),
+                                      self.columnar_format)
+        self.columnar_parts.append(part_filename)
+
+        # Keep the columns (i.e. the keys), but not the values.
+        for column in self.columnar_columns.values():
+            del column[:]
+        self.columnar_unflushed_rows = 0
+
+        return part_filename
+
+    def finalize_columnar_export(self):
+        """
+        Writes the remaining rows and concatenates all part files into the columnar file (if enabled).
+
+        :return: Name of the created file (or ``None``).
+
+        """
+        self.flush_columnar_export()
+        if self.columnar_columns is None or len(self.columnar_parts) == 0:
+            return None
+
+        filename = '{}.{}'.format(self.columnar_filename, self.columnar_format)
+        if len(self.columnar_parts) == 1:
+            os.replace(self.columnar_parts[0], filename)
+        else:
+            data = stack_columnar([load_columnar(part) for part in self.columnar_parts])
+            save_columnar(data, self.columnar_filename, self.columnar_format)
+            for part in self.columnar_parts:
+                os.remove(part)
+
+        self.columnar_parts = []
+        return filename
+
     def export_to_checkpoint(self):
         """
         This method exports the collected data into a dictionary using the associated formatting.
@@ -1,8 +1,9 @@
-# Base workers.
-from .worker import Worker
-from .trainer import Trainer
-from .offline_trainer import OfflineTrainer
-from .online_trainer import OnlineTrainer
-from .tester import Tester
+from miprometheus.utils.lazy_import import lazy_package
 
-__all__ = ['Worker', 'Trainer', 'OfflineTrainer', 'OnlineTrainer', 'Tester']
+# Attributes are imported lazily, i.e. on first access.
+__getattr__, __dir__ = lazy_package(__name__,
+                                    attributes={'Worker': '.worker',
+                                                'Trainer': '.trainer',
+                                                'OfflineTrainer': '.offline_trainer',
+                                                'OnlineTrainer': '.online_trainer',
+                                                'Tester': '.tester'})
@@ -28,6 +28,8 @@ import torch
 import numpy as np
 
 from miprometheus.workers.trainer import Trainer
+from miprometheus.utils.stage_profiler import TRAINING_STAGES
+from miprometheus.utils.distributed import average_gradients
 
 
 class OfflineTrainer(Trainer):
@@ -161,6 +163,7 @@ class OfflineTrainer(Trainer):
         # Initialize TensorBoard and statistics collection.
         self.initialize_statistics_collection()
         self.initialize_tensorboard()
+        self.initialize_profiling(TRAINING_STAGES, self.log_dir, 'training_profile.csv', self.training_batch_writer)
 
         try:
             '''
@@ -176,11 +179,15 @@ class OfflineTrainer(Trainer):
                 self.logger.info('Starting next epoch: {}'.format(epoch))
                 # Inform the training problem class that epoch has started.
                 self.training_problem.initialize_epoch(epoch)
+                # Reshuffle the subsets of samples handled by the processes in distributed mode.
+                if hasattr(self.training_sampler, 'set_epoch'):
+                    self.training_sampler.set_epoch(epoch)
                 # Empty the statistics collector.
                 self.training_stat_col.empty()
 
                 # Exhaust training set.
-                for training_dict in self.training_dataloader:
+                for training_dict in self.profiler.iterate(
+                        self.prefetch_to_device(self.training_dataloader, self.params['training'])):
                     # "Move on" to the next episode.
                     episode += 1
 
@@ -197,65 +204,79 @@ class OfflineTrainer(Trainer):
                     # Turn on training mode for the model.
                     self.model.train()
 
-                    # 1. Perform forward step, get predictions and compute loss.
-                    logits, loss = self.predict_evaluate_collect(self.model, self.training_problem, 
-                                                                 training_dict, self.training_stat_col, episode, epoch)
+                    if self.truncated_bptt_length > 0:
+                        # 1-2. Perform forward and backward steps window by window (truncated BPTT).
+                        logits, loss = self.predict_evaluate_collect_truncated_bptt(self.model, self.training_problem,
+                                                                                    training_dict, self.training_stat_col,
+                                                                                    episode, epoch)
+                    else:
+                        # 1. Perform forward step, get predictions and compute loss.
+                        logits, loss = self.predict_evaluate_collect(self.model, self.training_problem, 
+                                                                     training_dict, self.training_stat_col, episode, epoch)
+
+                        # 2. Backward gradient flow.
+                        with self.profiler.stage('backward'):
+                            loss.backward()
 
-                    # 2. Backward gradient flow.
-                    loss.backward()
+                    # Average the gradients over all processes in distributed mode.
+                    if self.app_state.distributed:
+                        with self.profiler.stage('backward'):
+                            average_gradients(self.model)
 
                     # Check the presence of the 'gradient_clipping'  parameter.
                     try:
                         # if present - clip gradients to a range (-gradient_clipping, gradient_clipping)
                         val = self.params['training']['gradient_clipping']
-                        torch.nn.utils.clip_grad_value_(self.model.parameters(), val)
+                        with self.profiler.stage('clipping'):
+                            torch.nn.utils.clip_grad_value_(self.model.parameters(), val)
                     except KeyError:
                         # Else - do nothing.
                         pass
 
                     # 3. Perform optimization.
-                    self.optimizer.step()
+                    with self.profiler.stage('optimizer_step'):
+                        self.optimizer.step()
 
                     # 4. Log collected statistics.
+                    with self.profiler.stage('export'):
+                        # 4.1. Export to csv - at every step.
+                        self.training_stat_col.export_to_csv()
 
-                    # 4.1. Export to csv - at every step.
-                    self.training_stat_col.export_to_csv()
+                        # 4.2. Export data to tensorboard - at logging frequency.
+                        if (self.training_batch_writer is not None) and (episode % self.flags.logging_interval == 0):
+                            self.training_stat_col.export_to_tensorboard()
 
-                    # 4.2. Export data to tensorboard - at logging frequency.
-                    if (self.training_batch_writer is not None) and (episode % self.flags.logging_interval == 0):
-                        self.training_stat_col.export_to_tensorboard()
+                            # Export histograms.
+                            if self.flags.tensorboard >= 1:
+                                for name, param in self.model.named_parameters():
+                                    try:
+                                        self.training_batch_writer.add_histogram(name, param.data.cpu().numpy(), episode, bins='doane')
 
-                        # Export histograms.
-                        if self.flags.tensorboard >= 1:
-                            for name, param in self.model.named_parameters():
-                                try:
-                                    self.training_batch_writer.add_histogram(name, param.data.cpu().numpy(), episode, bins='doane')
+                                    except Exception as e:
+                                        self.logger.error("  {} :: data :: {}".format(name, e))
 
-                                except Exception as e:
-                                    self.logger.error("  {} :: data :: {}".format(name, e))
+                            # Export gradients.
+                            if self.flags.tensorboard >= 2:
+                                for name, param in self.model.named_parameters():
+                                    try:
+                                        self.training_batch_writer.add_histogram(name + '/grad', param.grad.data.cpu().numpy(), episode,
+                                                                        bins='doane')
 
-                        # Export gradients.
-                        if self.flags.tensorboard >= 2:
-                            for name, param in self.model.named_parameters():
-                                try:
-                                    self.training_batch_writer.add_histogram(name + '/grad', param.grad.data.cpu().numpy(), episode,
-                                                                    bins='doane')
+                                    except Exception as e:
+                                        self.logger.error("  {} :: grad :: {}".format(name, e))
 
-                                except Exception as e:
-                                    self.logger.error("  {} :: grad :: {}".format(name, e))
-
-                    # 4.3. Log to logger - at logging frequency.
-                    if episode % self.flags.logging_interval == 0:
-                        self.logger.info(self.training_stat_col.export_to_string())
+                        # 4.3. Log to logger - at logging frequency.
+                        if episode % self.flags.logging_interval == 0:
+                            self.logger.info(self.training_stat_col.export_to_string())
 
                     # 5. Check visualization of training data.
                     if self.app_state.visualize:
+                        with self.profiler.stage('visualization'):
+                            # Allow for preprocessing
+                            training_dict, logits = self.training_problem.plot_preprocessing(training_dict, logits)
 
-                        # Allow for preprocessing
-                        training_dict, logits = self.training_problem.plot_preprocessing(training_dict, logits)
-
-                        # Show plot, if user will press Stop then a SystemExit exception will be thrown.
-                        self.model.plot(training_dict, logits)
+                            # Show plot, if user will press Stop then a SystemExit exception will be thrown.
+                            self.model.plot(training_dict, logits)
 
                     #  6. Validate and (optionally) save the model.
                     if (self.partial_validation_interval > 0) and (episode % self.partial_validation_interval) == 0:
@@ -267,7 +288,8 @@ class OfflineTrainer(Trainer):
                             self.app_state.visualize = False
 
                         # Perform validation.
-                        self.validate_on_batch(self.validation_batch, episode, epoch)
+                        with self.profiler.stage('validation'):
+                            self.validate_on_batch(self.validation_batch, episode, epoch)
 
                         # Aggregate statistics, but do not display them in log.
                         # self.aggregate_and_export_statistics(self.model, self.validation_problem,
@@ -276,6 +298,11 @@ class OfflineTrainer(Trainer):
 
                         # Do not save the model: OfflineTrainer uses the full set to determine whether to save or not.
 
+                    # 7. Profile the episode - export the percentiles of the times at logging frequency.
+                    self.profiler.end_episode(episode)
+                    if episode % self.flags.logging_interval == 0:
+                        self.export_profiling_statistics()
+
                     # III. The episodes number limit has been reached.
                     if episode+1 >= self.episode_limit:
                         training_status = "Not converged: Episode Limit reached"
@@ -305,7 +332,8 @@ class OfflineTrainer(Trainer):
                 self.validate_on_set(episode, epoch)
 
                 # Save the model using the average validation loss.
-                self.model.save(self.model_dir, training_status, self.training_stat_agg, self.validation_stat_agg)
+                self.model.save(self.model_dir, training_status, self.training_stat_agg, self.validation_stat_agg,
+                                optimizer=self.optimizer)
 
                 # Terminal conditions.
                 # I - the loss is < threshold (only when curriculum learning is finished if set.)
@@ -318,7 +346,8 @@ class OfflineTrainer(Trainer):
                         training_status = "Converged (Full Validation Loss went below Loss Stop threshold)"
 
                         # ... and THEN try to save the model using the average validation loss.
-                        self.model.save(self.model_dir, training_status, self.training_stat_agg, self.validation_stat_agg)
+                        self.model.save(self.model_dir, training_status, self.training_stat_agg, self.validation_stat_agg,
+                                        optimizer=self.optimizer)
 
                         break
 
@@ -355,7 +384,8 @@ class OfflineTrainer(Trainer):
             # Try to save the model only if we hit the epoch limit.
             if epoch+1 >= self.epoch_limit:
                 # Try to save the model using the average validation loss.
-                self.model.save(self.model_dir, training_status, self.training_stat_agg, self.validation_stat_agg)
+                self.model.save(self.model_dir, training_status, self.training_stat_agg, self.validation_stat_agg,
+                                optimizer=self.optimizer)
 
             self.logger.info('Experiment finished!')
 
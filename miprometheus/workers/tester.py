@@ -26,7 +26,11 @@ tester.py:
 __author__ = "Vincent Marois, Tomasz Kornuta, Younes Bouhadjar"
 
 import os
+import sys
+import copy
+import yaml
 import torch
+import multiprocessing
 from time import sleep
 from datetime import datetime
 
@@ -35,6 +39,7 @@ from miprometheus.models.model_factory import ModelFactory
 from miprometheus.problems.problem_factory import ProblemFactory
 from miprometheus.utils.statistics_collector import StatisticsCollector
 from miprometheus.utils.statistics_aggregator import StatisticsAggregator
+from miprometheus.utils.stage_profiler import TESTING_STAGES
 
 
 class Tester(Worker):
@@ -62,14 +67,31 @@ class Tester(Worker):
                                  dest='visualize',
                                  help='Activate dynamic visualization')
 
+        self.parser.add_argument('--test_processes',
+                                 dest='test_processes',
+                                 type=int,
+                                 default=1,
+                                 help='Number of processes running the multiple tests (indicated by the multi_tests '
+                                      'key of the testing section) in parallel. (Default: 1)')
+
+        # Problem and model(s) are built by the first test and reused by the following ones (if possible).
+        self.problem = None
+        self.problem_params = None
+        self.models = None
+        self.models_default_values = None
+
     def setup_global_experiment(self):
         """
         Sets up the global test experiment for the ``Tester``:
 
-            - Checks that the model to use exists on file:
+            - Checks that the model(s) to use exist on file:
 
                 >>> if not os.path.isfile(flags.model)
 
+            - If several models are indicated (separated with coma ","), checks that they share the same \
+            model configuration (e.g. they are repetitions of the same grid experiment). All of them are then \
+            evaluated on the same batches, so the test problem and dataloader are created only once.
+
             - Checks that the configuration file exists:
 
                 >>> if not os.path.isfile(config_file)
@@ -90,13 +112,19 @@ class Tester(Worker):
             print('Please pass path to and name of the file containing model to be loaded as --m parameter')
             exit(-1)
 
-        # Check if file with model exists.
-        if not os.path.isfile(self.flags.model):
-            print('Model file {} does not exist'.format(self.flags.model))
-            exit(-2)
+        # Get the list of models.
+        self.model_files = self.flags.model.split(',')
 
-        # Extract path.
-        self.abs_path, _ = os.path.split(os.path.dirname(os.path.abspath(self.flags.model)))
+        # Check if files with models exist.
+        for model_file in self.model_files:
+            if not os.path.isfile(model_file):
+                print('Model file {} does not exist'.format(model_file))
+                exit(-2)
+
+        # Extract paths.
+        self.abs_paths = [os.path.split(os.path.dirname(os.path.abspath(model_file)))[0]
+                          for model_file in self.model_files]
+        self.abs_path = self.abs_paths[0]
 
         # Check if config file was indicated by the user.
         if self.flags.config != '':
@@ -115,6 +143,18 @@ class Tester(Worker):
             self.logger.error("Cannot use GPU as there are no CUDA-compatible devices present in the system!")
             exit(-4)
 
+        # Check that all models share the model configuration.
+        if len(self.model_files) > 1:
+            model_configs = []
+            for abs_path in self.abs_paths:
+                with open(os.path.join(abs_path, 'training_configuration.yaml'), 'r') as yaml_file:
+                    model_configs.append(yaml.safe_load(yaml_file).get('model'))
+
+            if any(model_config != model_configs[0] for model_config in model_configs[1:]):
+                self.logger.error("The indicated models have different model configurations, "
+                                  "please test them separately")
+                exit(-7)
+
         # Get the list of configurations which need to be loaded.
         configs_to_load = self.recurrent_config_parse(config_file, [])
 
@@ -129,7 +169,7 @@ class Tester(Worker):
         one test experiment.
 
 
-        - Set up the log directory path:
+        - Set up the log directory path (one per model, in the experiment directory of the model):
 
             >>> os.makedirs(self.log_dir, exist_ok=False)
 
@@ -141,7 +181,7 @@ class Tester(Worker):
 
             >>>  self.set_random_seeds(self.params['testing'], 'testing')
 
-        - Creates problem and model:
+        - Creates problem and model(s):
 
             >>> self.problem = ProblemFactory.build_problem(self.params['training']['problem'])
             >>> self.model = ModelFactory.build_model(self.params['model'], self.dataset.default_values)
@@ -150,6 +190,13 @@ class Tester(Worker):
 
             >>> self.dataloader = DataLoader(dataset=self.problem, ...)
 
+        .. note::
+
+            In the case of multiple tests only the parts affected by the changed parameters are rebuilt: \
+            the problem (and sampler) only when their parameters change, the model(s) (including loading \
+            of the checkpoint) only when the problem default values (e.g. input size) change. \
+            Otherwise the model(s) remain resident between the tests.
+
         """
 
         # Get testing problem name.
@@ -173,16 +220,20 @@ class Tester(Worker):
                 time_str = 'test_{0:%Y%m%d_%H%M%S}'.format(datetime.now())
                 if self.flags.savetag != '':
                     time_str = time_str + "_" + self.flags.savetag
-                self.log_dir = self.abs_path + '/' + time_str + '/'
-                os.makedirs(self.log_dir, exist_ok=False)
+                self.log_dirs = [abs_path + '/' + time_str + '/' for abs_path in self.abs_paths]
+                os.makedirs(self.log_dirs[0], exist_ok=False)
             except FileExistsError:
                 sleep(1)
             else:
                 break
+        for log_dir in self.log_dirs[1:]:
+            os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = self.log_dirs[0]
 
-        # Set log dir and add the handler for the logfile to the logger.
+        # Set log dir and add the handler for the logfile to the logger (the log is shared by all models).
         self.log_file = self.log_dir + 'tester.log'
-        self.add_file_handler_to_logger(self.log_file)
+        for log_dir in self.log_dirs:
+            self.add_file_handler_to_logger(log_dir + 'tester.log')
 
         # Set random seeds in the testing section.
         self.set_random_seeds(self.params['testing'], 'testing')
@@ -192,9 +243,13 @@ class Tester(Worker):
 
         ################# TESTING PROBLEM ################# 
 
-        # Build test problem and dataloader.
-        self.problem, self.sampler, self.dataloader = \
-            self.build_problem_sampler_loader(self.params['testing'],'testing') 
+        # Build test problem and dataloader - reuse the problem if its (and sampler) parameters did not change.
+        if self.problem is None or self.get_problem_params() != self.problem_params:
+            self.problem, self.sampler, self.dataloader = \
+                self.build_problem_sampler_loader(self.params['testing'],'testing') 
+        else:
+            self.logger.info("Reusing the problem for 'testing'")
+            self.dataloader = self.build_dataloader(self.problem, self.sampler, self.params['testing'])
 
         # check if the maximum number of episodes is specified, if not put a
         # default equal to the size of the dataset (divided by the batch size)
@@ -214,66 +269,127 @@ class Tester(Worker):
         self.logger.info("Setting the max number of episodes to: {}".format(
             self.params["testing"]["problem"]["max_test_episodes"]))
 
+        # Remember the parameters of the built problem (including the default ones).
+        self.problem_params = self.get_problem_params()
+
         ################# MODEL #################
 
-        # Create model object.
-        self.model = ModelFactory.build(self.params['model'], self.problem.default_values)
+        # Build the model(s) - unless they are already built for the same problem default values.
+        if self.models is None or self.problem.default_values != self.models_default_values:
+            self.setup_models()
+        else:
+            self.logger.info("Reusing the loaded model(s)")
 
-        # Load the pretrained model from checkpoint.
-        try: 
-            model_name = self.flags.model
-            # Load parameters from checkpoint.
-            self.model.load(model_name)
-        except KeyError:
-            self.logger.error("File {} indicated in the command line (--m) seems not to be a valid model checkpoint".format(model_name))
-            exit(-5)
-        except Exception as e:
-            self.logger.error(e)
-            # Exit by following the logic: if user wanted to load the model but failed, then continuing the experiment makes no sense.
-            exit(-6)
+        # Export and log configuration, optionally asking the user for confirmation.
+        self.export_experiment_configuration(self.log_dir, "testing_configuration.yaml",self.flags.confirm)
+        for log_dir in self.log_dirs[1:]:
+            self.export_experiment_configuration(log_dir, "testing_configuration.yaml", False)
+
+    def get_problem_params(self):
+        """
+        Returns a snapshot of the parameters of the testing problem and sampler (used to decide whether \
+        the problem must be rebuilt).
+
+        :return: Tuple of dictionaries.
 
-        # Turn on evaluation mode.
-        self.model.eval()
+        """
+        return copy.deepcopy((self.params['testing']['problem'].to_dict(),
+                              self.params['testing']['sampler'].to_dict()))
 
-        # Move the model to CUDA if applicable.
-        if self.app_state.use_CUDA:
-            self.model.cuda()
+    def setup_models(self):
+        """
+        Creates the model(s) and loads their parameters from the checkpoint(s).
+
+        """
+        self.models = []
+        for model_name in self.model_files:
+            # Create model object.
+            model = ModelFactory.build(self.params['model'], self.problem.default_values)
+
+            # Load the pretrained model from checkpoint.
+            try: 
+                # Load parameters from checkpoint.
+                model.load(model_name)
+            except KeyError:
+                self.logger.error("File {} indicated in the command line (--m) seems not to be a valid model checkpoint".format(model_name))
+                exit(-5)
+            except Exception as e:
+                self.logger.error(e)
+                # Exit by following the logic: if user wanted to load the model but failed, then continuing the experiment makes no sense.
+                exit(-6)
+
+            # Turn on evaluation mode.
+            model.eval()
+
+            # Move the model to CUDA if applicable.
+            if self.app_state.use_CUDA:
+                model.cuda()
+
+            self.models.append(model)
+
+        self.model = self.models[0]
+        self.models_default_values = copy.deepcopy(self.problem.default_values)
 
         # Log the model summary.
         self.logger.info(self.model.summarize())
-
-        # Export and log configuration, optionally asking the user for confirmation.
-        self.export_experiment_configuration(self.log_dir, "testing_configuration.yaml",self.flags.confirm)
+        if len(self.models) > 1:
+            self.logger.info("Testing {} models on the same batches: {}".format(len(self.models), self.model_files))
 
     def initialize_statistics_collection(self):
         """
         Function initializes all statistics collectors and aggregators used by a given worker,
         creates output files etc.
+
+        Every model has its own collector and aggregator, exporting to the files in its log directory.
         """
-        # Create statistics collector for testing.
-        self.testing_stat_col = StatisticsCollector()
-        self.add_statistics(self.testing_stat_col)
-        self.problem.add_statistics(self.testing_stat_col)
-        self.model.add_statistics(self.testing_stat_col)
-        # Create the csv file to store the testing statistics.
-        self.testing_batch_stats_file = self.testing_stat_col.initialize_csv_file(self.log_dir, 'testing_statistics.csv')
-
-        # Create statistics aggregator for testing.
-        self.testing_stat_agg = StatisticsAggregator()
-        self.add_aggregators(self.testing_stat_agg)
-        self.problem.add_aggregators(self.testing_stat_agg)
-        self.model.add_aggregators(self.testing_stat_agg)
-        # Create the csv file to store the testing statistic aggregations.
-        # Will contain a single row with aggregated statistics.
-        self.testing_set_stats_file = self.testing_stat_agg.initialize_csv_file(self.log_dir, 'testing_set_agg_statistics.csv')
+        self.testing_stat_cols = []
+        self.testing_stat_aggs = []
+        self.testing_stats_files = []
+
+        for model, log_dir in zip(self.models, self.log_dirs):
+            # Create statistics collector for testing.
+            stat_col = StatisticsCollector()
+            self.add_statistics(stat_col)
+            self.problem.add_statistics(stat_col)
+            model.add_statistics(stat_col)
+            # Create the csv file to store the testing statistics.
+            self.testing_stats_files.append(stat_col.initialize_csv_file(log_dir, 'testing_statistics.csv'))
+
+            # Create statistics aggregator for testing.
+            stat_agg = StatisticsAggregator()
+            self.add_aggregators(stat_agg)
+            self.problem.add_aggregators(stat_agg)
+            model.add_aggregators(stat_agg)
+            # Create the csv file to store the testing statistic aggregations.
+            # Will contain a single row with aggregated statistics.
+            self.testing_stats_files.append(stat_agg.initialize_csv_file(log_dir, 'testing_set_agg_statistics.csv'))
+
+            # Export the statistics also to typed columnar files - optional.
+            if self.flags.columnar is not None:
+                stat_col.initialize_columnar_export(log_dir, 'testing_statistics', self.flags.columnar)
+                stat_agg.initialize_columnar_export(log_dir, 'testing_set_agg_statistics', self.flags.columnar)
+
+            self.testing_stat_cols.append(stat_col)
+            self.testing_stat_aggs.append(stat_agg)
+
+        # Statistics of the first model.
+        self.testing_stat_col = self.testing_stat_cols[0]
+        self.testing_stat_agg = self.testing_stat_aggs[0]
 
     def finalize_statistics_collection(self):
         """
         Finalizes statistics collection, closes all files etc.
         """
+        # Export the remaining profiling statistics.
+        self.finalize_profiling()
+
         # Close all files.
-        self.testing_batch_stats_file.close()
-        self.testing_set_stats_file.close()
+        for stats_file in self.testing_stats_files:
+            stats_file.close()
+
+        # Write the columnar files (if enabled).
+        for stat_obj in self.testing_stat_cols + self.testing_stat_aggs:
+            stat_obj.finalize_columnar_export()
 
     def run_experiment(self):
         """
@@ -283,7 +399,7 @@ class Tester(Worker):
 
         The function does the following for each episode:
 
-            - Forwards pass of the model,
+            - Forwards pass of the model(s),
             - Logs statistics & accumulates loss,
             - Activate visualization if set.
 
@@ -291,6 +407,7 @@ class Tester(Worker):
         """
         # Initialize tensorboard and statistics collection.
         self.initialize_statistics_collection()
+        self.initialize_profiling(TESTING_STAGES, self.log_dir, 'testing_profile.csv')
 
         # Set visualization.
         self.app_state.visualize = self.flags.visualize
@@ -313,29 +430,40 @@ class Tester(Worker):
             with torch.no_grad():
 
                 episode = 0
-                for test_dict in self.dataloader:
+                for test_dict in self.profiler.iterate(
+                        self.prefetch_to_device(self.dataloader, self.params['testing'])):
 
                     if episode == self.params["testing"]["problem"]["max_test_episodes"]:
                         break
 
-                    # Evaluate model on a given batch.
-                    logits, _ = self.predict_evaluate_collect(self.model, self.problem, 
-                                                              test_dict, self.testing_stat_col, episode)
+                    # Evaluate all models on a given batch.
+                    for i, (model, stat_col) in enumerate(zip(self.models, self.testing_stat_cols)):
+                        model_logits, _ = self.predict_evaluate_collect(model, self.problem,
+                                                                        test_dict, stat_col, episode)
+                        # Keep the logits of the first model for visualization.
+                        if i == 0:
+                            logits = model_logits
 
-                    # Export to csv - at every step.
-                    self.testing_stat_col.export_to_csv()
+                        with self.profiler.stage('export'):
+                            # Export to csv - at every step.
+                            stat_col.export_to_csv()
 
-                    # Log to logger - at logging frequency.
-                    if episode % self.flags.logging_interval == 0:
-                        self.logger.info(self.testing_stat_col.export_to_string('[Partial Test]'))
+                            # Log to logger - at logging frequency.
+                            if episode % self.flags.logging_interval == 0:
+                                self.logger.info(stat_col.export_to_string(self.get_model_tag('[Partial Test]', i)))
 
                     if self.app_state.visualize:
+                        with self.profiler.stage('visualization'):
+                            # Allow for preprocessing
+                            test_dict, logits = self.problem.plot_preprocessing(test_dict, logits)
 
-                        # Allow for preprocessing
-                        test_dict, logits = self.problem.plot_preprocessing(test_dict, logits)
+                            # Show plot, if user presses Quit - break.
+                            self.model.plot(test_dict, logits)
 
-                        # Show plot, if user presses Quit - break.
-                        self.model.plot(test_dict, logits)
+                    # Profile the episode - export the percentiles of the times at logging frequency.
+                    self.profiler.end_episode(episode)
+                    if episode % self.flags.logging_interval == 0:
+                        self.export_profiling_statistics()
 
                     # move to next episode.
                     episode += 1
@@ -344,9 +472,11 @@ class Tester(Worker):
                 self.logger.info('Test finished')
 
                 # Export aggregated statistics.
-                self.aggregate_and_export_statistics(self.model, self.problem, 
-                                                     self.testing_stat_col, self.testing_stat_agg, episode,
-                                                     '[Full Test]')
+                for i, (model, stat_col, stat_agg) in enumerate(zip(self.models, self.testing_stat_cols,
+                                                                    self.testing_stat_aggs)):
+                    self.aggregate_and_export_statistics(model, self.problem,
+                                                         stat_col, stat_agg, episode,
+                                                         self.get_model_tag('[Full Test]', i))
 
         except SystemExit as e:
             # the training did not end properly
@@ -358,6 +488,23 @@ class Tester(Worker):
             # Finalize statistics collection.
             self.finalize_statistics_collection()
 
+    def get_model_tag(self, tag, index):
+        """
+        Returns the tag identifying the statistics of the given model (if several models are tested).
+
+        :param tag: Tag, e.g. '[Full Test]'.
+        :type tag: str
+
+        :param index: Index of the model.
+        :type index: int
+
+        :return: Tag extended by the model directory.
+
+        """
+        if len(self.models) == 1:
+            return tag
+        return '{} [{}]'.format(tag, self.abs_paths[index])
+
     def check_multi_tests(self):
         """
         Checks if multiple tests are indicated in the testing configuration section.
@@ -442,6 +589,68 @@ class Tester(Worker):
         except KeyError:
             return False
 
+    def run_multi_tests(self, test_indices):
+        """
+        Runs the indicated multiple tests one by one.
+
+        :param test_indices: Indices of the tests to run.
+        :type test_indices: list
+
+        """
+        for test_index in test_indices:
+            self.logger.info('\n' + '=' * 80 + '\n')
+            self.logger.info("Starting test #{}.".format(test_index+1))
+            # update the testing problem config based on the current test index.
+            self.update_config(test_index)
+
+            # finalize the experiment setup (rebuilding only what is required)
+            self.setup_individual_experiment()
+
+            # run the current experiment
+            self.run_experiment()
+
+            # remove the FileHandlers as they will be set again in the next individual test
+            for _ in self.log_dirs:
+                self.logger.removeHandler(self.logger.handlers[0])
+
+    def run_multi_tests_parallel(self):
+        """
+        Distributes the multiple tests between ``--test_processes`` processes. Every process loads the \
+        configuration and model(s) once and runs its subset of tests with :py:func:`run_multi_tests`.
+
+        """
+        num_processes = min(self.flags.test_processes, self.number_tests)
+        self.logger.info("Running {} tests in {} processes".format(self.number_tests, num_processes))
+
+        # Interleave the tests, so the processes get similar workloads.
+        tasks = [(sys.argv, list(range(i, self.number_tests, num_processes))) for i in range(num_processes)]
+
+        # Spawn the processes, so they do not inherit the state (e.g. CUDA context) of the current one.
+        with multiprocessing.get_context('spawn').Pool(processes=num_processes) as pool:
+            pool.map(run_multi_tests_subset, tasks)
+
+    def run_tests(self):
+        """
+        Sets up and runs the test experiment(s): a single test or multiple tests (indicated by the \
+        ``multi_tests`` key of the testing section), possibly in parallel processes.
+
+        """
+        # parse args, load configuration and create all required objects.
+        self.setup_global_experiment()
+
+        if self.check_multi_tests():
+            if self.flags.test_processes > 1:
+                self.run_multi_tests_parallel()
+            else:
+                self.run_multi_tests(range(self.number_tests))
+
+        else:
+            # finalize the experiment setup
+            self.setup_individual_experiment()
+
+            # run the experiment
+            self.run_experiment()
+
     def update_config(self, test_index):
         """
         Update ``self.params['testing']`` using the list of values to change for the multiple tests.
@@ -462,38 +671,34 @@ class Tester(Worker):
         return True
 
 
-def main():
+def run_multi_tests_subset(task):
     """
-    Entry point function for the ``Tester``.
+    Runs a subset of the multiple tests in the current (spawned) process.
+
+    :param task: Tuple (command line arguments, list of indices of the tests to run).
+    :type task: tuple
 
     """
+    argv, test_indices = task
+
+    # The tester parses sys.argv.
+    sys.argv = argv
     tester = Tester()
-    # parse args, load configuration and create all required objects.
     tester.setup_global_experiment()
+    # User interaction is not possible in the spawned processes.
+    tester.flags.confirm = False
 
     if tester.check_multi_tests():
+        tester.run_multi_tests(test_indices)
 
-        for test_index in range(tester.number_tests):
-            tester.logger.info('\n' + '=' * 80 + '\n')
-            tester.logger.info("Starting test #{}.".format(test_index+1))
-            # update the testing problem config based on the current test index.
-            tester.update_config(test_index)
-
-            # finalize the experiment setup
-            tester.setup_individual_experiment()
-
-            # run the current experiment
-            tester.run_experiment()
-
-            # remove the FileHandler as it will be set again in the next individual test
-            tester.logger.removeHandler(tester.logger.handlers[0])
 
-    else:
-        # finalize the experiment setup
-        tester.setup_individual_experiment()
+def main():
+    """
+    Entry point function for the ``Tester``.
 
-        # run the experiment
-        tester.run_experiment()
+    """
+    tester = Tester()
+    tester.run_tests()
 
 
 if __name__ == '__main__':
@@ -25,8 +25,11 @@ trainer.py:
 __author__ = "Vincent Marois, Tomasz Kornuta"
 
 import os
+import copy
 import yaml
 import torch
+import logging
+import numpy as np
 from time import sleep
 from random import randrange
 from datetime import datetime
@@ -34,8 +37,10 @@ from datetime import datetime
 from miprometheus.workers.worker import Worker
 from miprometheus.models.model_factory import ModelFactory
 
+from miprometheus.utils.data_dict import DataDict
 from miprometheus.utils.statistics_collector import StatisticsCollector
 from miprometheus.utils.statistics_aggregator import StatisticsAggregator
+from miprometheus.utils.distributed import initialize_process_group, broadcast_parameters, all_reduce_mean
 
 
 class Trainer(Worker):
@@ -85,12 +90,57 @@ class Trainer(Worker):
                                       "2: Only during validation episodes.\n"
                                       "3: Only during the last validation, after the training is completed.\n")
 
+        self.parser.add_argument('--distributed',
+                                 dest='distributed',
+                                 action='store_true',
+                                 help='Run data-parallel training in several processes using torch.distributed. '
+                                      'The processes should be started with e.g. torchrun, which sets the '
+                                      'MASTER_ADDR, MASTER_PORT, RANK and WORLD_SIZE environment variables. '
+                                      '(Default: False)')
+
+        self.parser.add_argument('--dist_backend',
+                                 dest='dist_backend',
+                                 type=str,
+                                 default='gloo',
+                                 help='Backend used for communication between the processes in distributed mode. '
+                                      '(Default: gloo)')
+
+        self.parser.add_argument('--dist_init_method',
+                                 dest='dist_init_method',
+                                 type=str,
+                                 default='env://',
+                                 help='URL specifying how to initialize the process group in distributed mode. '
+                                      '(Default: env://)')
+
+    def initialize_distributed(self):
+        """
+        Initializes the process group used in the distributed (data-parallel) mode.
+
+        Only the master process (rank 0) logs to the console, writes files (logs, csv, checkpoints) and \
+        exports to TensorBoard. Visualization is deactivated in all the other processes.
+
+        """
+        initialize_process_group(self.flags.dist_backend, self.flags.dist_init_method)
+
+        self.logger.info("Initialized process group (backend: {}): process {} out of {}".format(
+            self.flags.dist_backend, self.app_state.rank, self.app_state.world_size))
+
+        if self.app_state.rank != 0:
+            # Mute the console.
+            logging.getLogger().setLevel(logging.WARNING)
+            self.logger.setLevel(logging.WARNING)
+            # Avoid any user interaction.
+            self.flags.visualize = -1
+            self.flags.confirm = False
+
     def setup_experiment(self):
         """
         Sets up experiment of all trainers:
 
             - Calls base class setup_experiment to parse the command line arguments,
 
+            - Initializes the process group if running in distributed mode,
+
             - Loads the config file(s):
 
                 >>> configs_to_load = self.recurrent_config_parse(flags.config, [])
@@ -123,7 +173,8 @@ class Trainer(Worker):
 
             - Handles the validation of the model:
 
-                - Creates validation problem & DataLoader
+                - Creates validation problem & DataLoader,
+                - Optionally generates and caches the validation set (``cache_set``)
 
             - Set optimizer:
 
@@ -146,7 +197,11 @@ class Trainer(Worker):
         if self.flags.use_gpu and (torch.cuda.device_count() == 0):
             self.logger.error("Cannot use GPU as there are no CUDA-compatible devices present in the system!")
             exit(-2)
-            
+
+        # Initialize the process group.
+        if self.flags.distributed:
+            self.initialize_distributed()
+
         # Get the list of configurations which need to be loaded.
         configs_to_load = self.recurrent_config_parse(self.flags.config, [])
 
@@ -189,7 +244,9 @@ class Trainer(Worker):
                 if self.flags.savetag != '':
                     time_str = time_str + "_" + self.flags.savetag
                 self.log_dir = self.flags.expdir + '/' + training_problem_name + '/' + model_name + '/' + time_str + '/'
-                os.makedirs(self.log_dir, exist_ok=False)
+                # Only the master process writes files.
+                if self.app_state.rank == 0:
+                    os.makedirs(self.log_dir, exist_ok=False)
             except FileExistsError:
                 sleep(1)
             else:
@@ -197,11 +254,13 @@ class Trainer(Worker):
 
         # Set log dir and add the handler for the logfile to the logger.
         self.log_file = self.log_dir + 'trainer.log'
-        self.add_file_handler_to_logger(self.log_file)
+        if self.app_state.rank == 0:
+            self.add_file_handler_to_logger(self.log_file)
 
         # Models dir.
         self.model_dir = self.log_dir + 'models/'
-        os.makedirs(self.model_dir, exist_ok=False)
+        if self.app_state.rank == 0:
+            os.makedirs(self.model_dir, exist_ok=False)
 
         # Set random seeds in the training section.
         self.set_random_seeds(self.params['training'], 'training')
@@ -241,11 +300,15 @@ class Trainer(Worker):
         self.validation_problem, self.validations_sampler, self.validation_dataloader = \
             self.build_problem_sampler_loader(self.params['validation'], 'validation') 
 
+        # Optionally generate the validation set once and replay it for every validation.
+        self.params['validation'].add_default_params({'cache_set': False, 'cache_file': ''})
+        if self.params['validation']['cache_set']:
+            self.validation_set = self.cache_validation_set(self.params['validation'])
+        else:
+            self.validation_set = self.validation_dataloader
+
         # Generate a single batch used for partial validation.
-        #self.validation_batch = self.validation_problem.collate_fn(next(iter(self.validation_problem)))
-        self.validation_batch = next(iter(self.validation_dataloader))
-        #print(self.validation_batch['sequences'].shape )
-        #exit(1)
+        self.validation_batch = next(iter(self.validation_set))
 
         ################# MODEL PROBLEM ################# 
         
@@ -282,9 +345,24 @@ class Trainer(Worker):
         if self.app_state.use_CUDA:
             self.model.cuda()
 
+        # Start all the replicas from the parameters of the master process.
+        if self.app_state.distributed:
+            broadcast_parameters(self.model)
+
         # Log the model summary.
         self.logger.info(self.model.summarize())
 
+        # Parse the truncated backpropagation through time (BPTT) settings.
+        self.params['training'].add_default_params({'truncated_bptt_length': -1})
+        self.truncated_bptt_length = self.params['training']['truncated_bptt_length']
+
+        if self.truncated_bptt_length > 0:
+            if not getattr(self.model, 'supports_truncated_bptt', False):
+                self.logger.error("Model '{}' does not support truncated BPTT, please remove "
+                                  "'truncated_bptt_length' from the training section".format(self.model.name))
+                exit(-7)
+            self.logger.info("Truncated BPTT activated, window length: {}".format(self.truncated_bptt_length))
+
         ################# OPTIMIZER ################# 
 
         # Set the optimizer.
@@ -297,6 +375,38 @@ class Trainer(Worker):
                                                                      self.model.parameters()),
                                                               **optimizer_conf)
 
+        # Restore the state of the optimizer saved along with the loaded model - optional.
+        self.params['model'].add_default_params({'load_optimizer': False})
+        if model_name != "" and self.params['model']['load_optimizer']:
+            chkpt = self.load_checkpoint(model_name)
+            if 'optimizer' in chkpt:
+                self.optimizer.load_state_dict(chkpt['optimizer'])
+                self.logger.info("Restored the state of the optimizer from checkpoint {}".format(model_name))
+            else:
+                self.logger.warning("Checkpoint {} does not contain the state of the optimizer".format(model_name))
+
+    @staticmethod
+    def load_checkpoint(filename):
+        """
+        Loads a checkpoint (or any other file saved with ``torch.save``) to CPU memory.
+
+        .. note::
+
+            The checkpoints contain not only tensors (e.g. timestamps, statistics), so they are loaded with \
+            ``weights_only=False`` in the versions of PyTorch supporting (and defaulting to ``True``) that argument.
+
+        :param filename: Name of the file.
+        :type filename: str
+
+        :return: Loaded object.
+
+        """
+        try:
+            return torch.load(filename, map_location=lambda storage, loc: storage, weights_only=False)
+        except TypeError:
+            # Older versions of PyTorch.
+            return torch.load(filename, map_location=lambda storage, loc: storage)
+
     def add_statistics(self, stat_col):
         """
         Calls base method and adds epoch statistics to ``StatisticsCollector``.
@@ -330,7 +440,7 @@ class Trainer(Worker):
             - For training statistics (adds the statistics of the model & problem),
             - For validation statistics (adds the statistics of the model & problem).
 
-        - Creates the output files (csv).
+        - Creates the output files (csv) - only in the master process.
 
         """
         # TRAINING.
@@ -340,7 +450,9 @@ class Trainer(Worker):
         self.training_problem.add_statistics(self.training_stat_col)
         self.model.add_statistics(self.training_stat_col)
         # Create the csv file to store the training statistics.
-        self.training_batch_stats_file = self.training_stat_col.initialize_csv_file(self.log_dir, 'training_statistics.csv')
+        self.training_batch_stats_file = None
+        if self.app_state.rank == 0:
+            self.training_batch_stats_file = self.training_stat_col.initialize_csv_file(self.log_dir, 'training_statistics.csv')
 
         # Create statistics aggregator for training.
         self.training_stat_agg = StatisticsAggregator()
@@ -348,7 +460,9 @@ class Trainer(Worker):
         self.training_problem.add_aggregators(self.training_stat_agg)
         self.model.add_aggregators(self.training_stat_agg)
         # Create the csv file to store the training statistic aggregations.
-        self.training_set_stats_file = self.training_stat_agg.initialize_csv_file(self.log_dir, 'training_set_agg_statistics.csv')
+        self.training_set_stats_file = None
+        if self.app_state.rank == 0:
+            self.training_set_stats_file = self.training_stat_agg.initialize_csv_file(self.log_dir, 'training_set_agg_statistics.csv')
 
         # VALIDATION.
         # Create statistics collector for validation.
@@ -357,7 +471,9 @@ class Trainer(Worker):
         self.validation_problem.add_statistics(self.validation_stat_col)
         self.model.add_statistics(self.validation_stat_col)
         # Create the csv file to store the validation statistics.
-        self.validation_batch_stats_file = self.validation_stat_col.initialize_csv_file(self.log_dir, 'validation_statistics.csv')
+        self.validation_batch_stats_file = None
+        if self.app_state.rank == 0:
+            self.validation_batch_stats_file = self.validation_stat_col.initialize_csv_file(self.log_dir, 'validation_statistics.csv')
 
         # Create statistics aggregator for validation.
         self.validation_stat_agg = StatisticsAggregator()
@@ -365,26 +481,44 @@ class Trainer(Worker):
         self.validation_problem.add_aggregators(self.validation_stat_agg)
         self.model.add_aggregators(self.validation_stat_agg)
         # Create the csv file to store the validation statistic aggregations.
-        self.validation_set_stats_file = self.validation_stat_agg.initialize_csv_file(self.log_dir, 'validation_set_agg_statistics.csv')
+        self.validation_set_stats_file = None
+        if self.app_state.rank == 0:
+            self.validation_set_stats_file = self.validation_stat_agg.initialize_csv_file(self.log_dir, 'validation_set_agg_statistics.csv')
+
+        # Export the statistics also to typed columnar files - optional.
+        if self.app_state.rank == 0 and self.flags.columnar is not None:
+            for stat_obj, filename in [(self.training_stat_col, 'training_statistics'),
+                                       (self.training_stat_agg, 'training_set_agg_statistics'),
+                                       (self.validation_stat_col, 'validation_statistics'),
+                                       (self.validation_stat_agg, 'validation_set_agg_statistics')]:
+                stat_obj.initialize_columnar_export(self.log_dir, filename, self.flags.columnar)
 
     def finalize_statistics_collection(self):
         """
-        Finalizes the statistics collection by closing the csv files.
+        Finalizes the statistics collection by closing the csv files (and writing the columnar files).
 
         """
+        # Export the remaining profiling statistics.
+        self.finalize_profiling()
+
         # Close all files.
-        self.training_batch_stats_file.close()
-        self.training_set_stats_file.close()
-        self.validation_batch_stats_file.close()
-        self.validation_set_stats_file.close()
+        for stats_file in [self.training_batch_stats_file, self.training_set_stats_file,
+                           self.validation_batch_stats_file, self.validation_set_stats_file]:
+            if stats_file is not None:
+                stats_file.close()
+
+        # Write the columnar files (if enabled).
+        for stat_obj in [self.training_stat_col, self.training_stat_agg,
+                         self.validation_stat_col, self.validation_stat_agg]:
+            stat_obj.finalize_columnar_export()
 
     def initialize_tensorboard(self):
         """
         Initializes the TensorBoard writers, and log directories.
 
         """
-        # Create TensorBoard outputs - if TensorBoard is supposed to be used.
-        if self.flags.tensorboard is not None:
+        # Create TensorBoard outputs - if TensorBoard is supposed to be used (by the master process only).
+        if self.flags.tensorboard is not None and self.app_state.rank == 0:
             from tensorboardX import SummaryWriter
             self.training_batch_writer = SummaryWriter(self.log_dir + '/training')
             self.training_stat_col.initialize_tensorboard(self.training_batch_writer)
@@ -417,6 +551,180 @@ class Trainer(Worker):
         if self.validation_set_writer is not None:
             self.validation_set_writer.close()
 
+    def predict_evaluate_collect_truncated_bptt(self, model, problem, data_dict, stat_col, episode, epoch=None):
+        """
+        Truncated BPTT counterpart of ``predict_evaluate_collect()``, which additionally performs the backward \
+        pass:
+
+            - splits the sequences into consecutive windows of ``truncated_bptt_length`` items,
+            - passes the windows one by one through the model, carrying the cell state between them,
+            - computes the loss and backpropagates the gradients for every window separately, \
+            detaching the carried cell state afterwards,
+            - collects problem and model statistics for the whole sequences.
+
+        .. note::
+
+            The loss of each window is weighted by the fraction of the (masked) outputs it contains, \
+            so the accumulated loss (and gradients) correspond to the loss of the whole sequences.
+
+
+        :param model: trainable model supporting truncated BPTT.
+        :type model: ``models.sequential_model.SequentialModel`` or a subclass
+
+        :param problem: problem generating samples.
+        :type problem: ``problems.problem.problem`` or a subclass
+
+        :param data_dict: contains the batch of samples to pass to the model.
+        :type data_dict: ``DataDict``
+
+        :param stat_col: statistics collector used for logging accuracy etc.
+        :type stat_col: ``StatisticsCollector``
+
+        :param episode: current episode index
+        :type episode: int
+
+        :param epoch: current epoch index.
+        :type epoch: int, optional
+
+        :return:
+
+            - logits (detached),
+            - accumulated loss (detached)
+
+        """
+        # Move to GPU (no copies if the batch was already prefetched).
+        if self.app_state.use_CUDA:
+            with self.profiler.stage('to_device'):
+                data_dict = data_dict.to(self.app_state.device)
+
+        seq_length = data_dict['sequences'].size(1)
+        use_mask = getattr(problem, 'use_mask', False) and ('masks' in data_dict)
+
+        # Total number of outputs taken into account by the loss.
+        if use_mask:
+            total_outputs = data_dict['masks'].sum().item()
+        else:
+            total_outputs = seq_length
+
+        # Initialize the cell state on the basis of the whole sequences.
+        model.start_truncated_bptt(data_dict)
+
+        logits_windows = []
+        loss = torch.tensor(0.0).type(self.app_state.dtype)
+        for start in range(0, seq_length, self.truncated_bptt_length):
+            end = min(start + self.truncated_bptt_length, seq_length)
+
+            # Cut the window from all tensors having the sequence (1st) dimension.
+            window_dict = DataDict({key: value[:, start:end] if isinstance(value, torch.Tensor) and
+                                    value.dim() > 1 and value.size(1) == seq_length else value
+                                    for key, value in data_dict.items()})
+
+            # Perform forward calculation - starting from the carried state.
+            with self.profiler.stage('forward'):
+                window_logits = model(window_dict)
+            logits_windows.append(window_logits.detach())
+
+            # Count the outputs in the window - skip windows without outputs.
+            if use_mask:
+                window_outputs = window_dict['masks'].sum().item()
+            else:
+                window_outputs = end - start
+
+            if window_outputs > 0:
+                # Evaluate the weighted loss and backpropagate.
+                with self.profiler.stage('loss'):
+                    window_loss = problem.evaluate_loss(window_dict, window_logits) * window_outputs / total_outputs
+                with self.profiler.stage('backward'):
+                    window_loss.backward()
+                loss += window_loss.detach()
+
+            # Truncate the backpropagation.
+            model.detach_carried_cell_state()
+
+        model.stop_truncated_bptt()
+
+        # Stack logits along the time axis (1).
+        logits = torch.cat(logits_windows, dim=1)
+
+        with self.profiler.stage('statistics'):
+            # Collect "elementary" statistics - episode and loss.
+            if ('epoch' in stat_col) and (epoch is not None):
+                stat_col['epoch'] = epoch
+
+            stat_col['episode'] = episode
+            # Collect loss as float.
+            stat_col['loss'] = loss
+
+            # Collect other (potential) statistics from problem & model.
+            problem.collect_statistics(stat_col, data_dict, logits)
+            model.collect_statistics(stat_col, data_dict, logits)
+
+        # Return tuple: logits, loss.
+        return logits, loss
+
+    def cache_validation_set(self, params):
+        """
+        Generates the whole validation set once, so that all (full and partial) validations are performed on \
+        exactly the same samples.
+
+        Designed for the problems generating the samples on the fly (e.g. algorithmic ones), where \
+        every iteration over the validation ``DataLoader`` results in a different set, which makes the \
+        validation slower and noisier (e.g. causing spurious updates of the best model).
+
+        The set is generated with the random generators seeded from the validation section (``seed_numpy`` and \
+        ``seed_torch``, random if not indicated). The states of the generators are restored afterwards, so the \
+        training samples remain the same with or without the cache.
+
+        If ``cache_file`` is set, the generated set is stored in that file (along with the parameters of the \
+        validation section) and loaded from it in the next runs - unless the parameters have changed, in which \
+        case the set is generated (and stored) anew.
+
+        :param params: 'ParamInterface' object, referring to the validation section.
+        :type params: miprometheus.utils.ParamInterface
+
+        :return: List of batches (``DataDict``).
+
+        """
+        cache_file = params['cache_file']
+        if cache_file != '' and self.app_state.distributed:
+            # Every process works on its own subset of samples.
+            cache_file += '.rank{}'.format(self.app_state.rank)
+
+        # Parameters the set is generated with (the location of the cache does not matter).
+        cached_params = copy.deepcopy(params.to_dict())
+        cached_params.pop('cache_file', None)
+
+        if cache_file != '' and os.path.isfile(cache_file):
+            cache = self.load_checkpoint(cache_file)
+            if cache['params'] == cached_params:
+                self.logger.info("Loaded the cached validation set ({} batches) from {}".format(
+                    len(cache['batches']), cache_file))
+                return cache['batches']
+
+            self.logger.warning("The parameters of the validation set cached in {} differ from the current ones, "
+                                "generating it anew".format(cache_file))
+
+        # Generate the set with the validation seeds.
+        numpy_state = np.random.get_state()
+        torch_state = torch.get_rng_state()
+        cuda_states = torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None
+        try:
+            self.set_random_seeds(params, 'validation')
+            validation_set = [batch for batch in self.validation_dataloader]
+        finally:
+            np.random.set_state(numpy_state)
+            torch.set_rng_state(torch_state)
+            if cuda_states is not None:
+                torch.cuda.set_rng_state_all(cuda_states)
+
+        self.logger.info("Cached the validation set ({} batches)".format(len(validation_set)))
+
+        if cache_file != '':
+            torch.save({'params': cached_params, 'batches': validation_set}, cache_file)
+            self.logger.info("Stored the cached validation set in {}".format(cache_file))
+
+        return validation_set
+
     def validate_on_batch(self, valid_batch, episode, epoch):
         """
         Performs a validation of the model using the provided batch.
@@ -446,6 +754,10 @@ class Trainer(Worker):
                                                                      valid_batch, self.validation_stat_col,
                                                                      episode, epoch)
 
+        # Average the loss over all processes, so they will all take the same decisions.
+        if self.app_state.distributed:
+            valid_loss = all_reduce_mean(valid_loss)
+
         # Export  collected statistics.
         self.export_statistics(self.validation_stat_col, '[Partial Validation]')
 
@@ -461,7 +773,8 @@ class Trainer(Worker):
 
     def validate_on_set(self, episode, epoch=None):
         """
-        Performs a validation of the model on the whole validation set, using the validation ``DataLoader``.
+        Performs a validation of the model on the whole validation set, using the validation ``DataLoader`` \
+        (or the cached validation set, see :py:func:`cache_validation_set`).
 
         Iterates over the entire validation set (through the `DataLoader``), aggregates the collected statistics \
         and logs that to the console, csv and TensorBoard (if set).
@@ -480,7 +793,7 @@ class Trainer(Worker):
         # Get number of samples - depending whether using sampler or not.
         if self.params['validation']['dataloader']['drop_last']:
             # if we are supposed to drop the last (incomplete) batch.
-            num_samples = len(self.validation_dataloader) * \
+            num_samples = len(self.validation_set) * \
                 self.params['validation']['problem']['batch_size']
         elif self.validations_sampler is not None:
             num_samples = len(self.validations_sampler)
@@ -488,19 +801,20 @@ class Trainer(Worker):
             num_samples = len(self.validation_problem)
         
         self.logger.info('Validating over the entire validation set ({} samples in {} episodes)'.format(
-            num_samples, len(self.validation_dataloader)))
+            num_samples, len(self.validation_set)))
 
         # Turn on evaluation mode.
         self.model.eval()
 
         # Get a random batch index which will be used for visualization
-        vis_index = randrange(len(self.validation_dataloader))
+        vis_index = randrange(len(self.validation_set))
 
         # Reset the statistics.
         self.validation_stat_col.empty()
 
         with torch.no_grad():
-            for ep, valid_batch in enumerate(self.validation_dataloader):
+            for ep, valid_batch in enumerate(self.prefetch_to_device(self.validation_set,
+                                                                     self.params['validation'])):
                 # 1. Perform forward step, get predictions and compute loss.
                 valid_logits, _ = self.predict_evaluate_collect(self.model, self.validation_problem, valid_batch,
                                                                 self.validation_stat_col, ep, epoch)
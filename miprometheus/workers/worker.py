@@ -43,6 +43,10 @@ from miprometheus.problems.problem_factory import ProblemFactory
 # Import utils.
 from miprometheus.utils.app_state import AppState
 from miprometheus.utils.param_interface import ParamInterface
+from miprometheus.utils.distributed import gather_statistics
+from miprometheus.utils.stage_profiler import StageProfiler
+from miprometheus.utils.device_prefetcher import DevicePrefetcher
+from miprometheus.utils.statistics_collector import StatisticsCollector
 
 
 class Worker(object):
@@ -91,6 +95,11 @@ class Worker(object):
         # Initialize logger using the configuration.
         self.initialize_logger()
 
+        # Profiling is disabled until initialized with :py:func:`initialize_profiling`.
+        self.profiler = StageProfiler()
+        self.profiling_stat_col = None
+        self.profiling_stats_file = None
+
         # Create parser with a list of runtime arguments.
         self.parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
 
@@ -109,7 +118,9 @@ class Worker(object):
                                      default='',
                                      dest='model',
                                      help='Path to the file containing the saved parameters'
-                                          ' of the model to load (model checkpoint, should end with a .pt extension.)')
+                                          ' of the model to load (model checkpoint, should end with a .pt extension.)'
+                                          ' The Tester accepts several files (sharing the model configuration), '
+                                          'separated with coma ",".')
 
             self.parser.add_argument('--gpu',
                                      dest='use_gpu',
@@ -152,6 +163,22 @@ class Worker(object):
                                      help='Request user confirmation just after loading the settings, '
                                           'before starting training. (Default: False)')
 
+            self.parser.add_argument('--columnar',
+                                     dest='columnar',
+                                     type=str,
+                                     choices=['npy', 'parquet'],
+                                     default=None,
+                                     help='If present, exports the statistics also to typed columnar files '
+                                          '(NumPy structured arrays or Parquet tables), in addition to csv files.'
+                                          ' (Default: None)')
+
+            self.parser.add_argument('--profile',
+                                     dest='profile',
+                                     action='store_true',
+                                     help='Measures the time spent in the stages of every episode (data loading, '
+                                          'forward and backward passes etc.) and exports its percentiles '
+                                          'at logging frequency. (Default: False)')
+
     def initialize_logger(self):
         """
         Initializes the logger, with a specific configuration:
@@ -248,6 +275,7 @@ class Worker(object):
                                             'batch_sampler': None,
                                             'num_workers': 0,  # Do not use multiprocessing by default - for now.
                                             'pin_memory': False,
+                                            'prefetch': False,  # Load the next batch in the background.
                                             'drop_last': False,
                                             'timeout': 0},
                             'sampler': {},  # not using sampler by default
@@ -274,6 +302,11 @@ class Worker(object):
         # Build the problem.
         problem = ProblemFactory.build(params['problem'])
 
+        # In distributed mode each process must work on its own subset of samples
+        # (the indices of a configured SubsetRandomSampler are sharded by the SamplerFactory).
+        if self.app_state.distributed and not params['sampler']:
+            params['sampler'].add_config_params({'name': 'DistributedSampler'})
+
         # Try to build the sampler.
         sampler = SamplerFactory.build(problem, params['sampler'])
 
@@ -282,17 +315,7 @@ class Worker(object):
             params['dataloader'].add_config_params({'shuffle': False})
 
         # build the DataLoader on top of the validation problem
-        loader = DataLoader(dataset=problem,
-                            batch_size=params['problem']['batch_size'],
-                            shuffle=params['dataloader']['shuffle'],
-                            sampler=sampler,
-                            batch_sampler=params['dataloader']['batch_sampler'],
-                            num_workers=params['dataloader']['num_workers'],
-                            collate_fn=problem.collate_fn,
-                            pin_memory=params['dataloader']['pin_memory'],
-                            drop_last=params['dataloader']['drop_last'],
-                            timeout=params['dataloader']['timeout'],
-                            worker_init_fn=problem.worker_init_fn)
+        loader = self.build_dataloader(problem, sampler, params)
 
         # Display sizes.
         self.logger.info("Problem for '{}' loaded (size: {})".format(section_name, len(problem)))
@@ -303,6 +326,57 @@ class Worker(object):
         # Return sampler - even if it is none :]
         return problem, sampler, loader
 
+    def build_dataloader(self, problem, sampler, params):
+        """
+        Builds the DataLoader on top of the (already built) problem and sampler.
+
+        :param problem: Problem instance.
+
+        :param sampler: Sampler instance (may be None).
+
+        :param params: 'ParamInterface' object, referring to one of main sections (training/validation/testing).
+        :type params: miprometheus.utils.ParamInterface
+
+        :return: DataLoader instance.
+
+        .. note::
+
+            When ``prefetch`` is set, the batches are pinned by the :py:class:`miprometheus.utils.DevicePrefetcher` \
+            (see :py:func:`prefetch_to_device`), not by the ``DataLoader``.
+
+        """
+        return DataLoader(dataset=problem,
+                          batch_size=params['problem']['batch_size'],
+                          shuffle=params['dataloader']['shuffle'],
+                          sampler=sampler,
+                          batch_sampler=params['dataloader']['batch_sampler'],
+                          num_workers=params['dataloader']['num_workers'],
+                          collate_fn=problem.collate_fn,
+                          pin_memory=params['dataloader']['pin_memory'] and not params['dataloader']['prefetch'],
+                          drop_last=params['dataloader']['drop_last'],
+                          timeout=params['dataloader']['timeout'],
+                          worker_init_fn=problem.worker_init_fn)
+
+
+    def prefetch_to_device(self, iterable, params):
+        """
+        Wraps the ``DataLoader`` with a :py:class:`miprometheus.utils.DevicePrefetcher`, loading the next batch \
+        and copying it to the device while the current one is processed (if ``prefetch`` is set in the \
+        ``dataloader`` section).
+
+        :param iterable: ``DataLoader`` (or any iterable returning ``DataDict`` (s)).
+
+        :param params: 'ParamInterface' object, referring to one of main sections (training/validation/testing).
+        :type params: miprometheus.utils.ParamInterface
+
+        :return: ``DevicePrefetcher`` or the original iterable.
+
+        """
+        if not params['dataloader']['prefetch']:
+            return iterable
+
+        return DevicePrefetcher(iterable, self.app_state.device,
+                                pin_memory=params['dataloader']['pin_memory'])
 
     def get_epoch_size(self, problem, sampler, batch_size, drop_last):
         """
@@ -362,6 +436,10 @@ class Worker(object):
         """
         # -> At this point, all configuration for experiment is complete.
 
+        # In distributed mode only the master process exports the configuration.
+        if self.app_state.rank != 0:
+            return
+
         # Display results of parsing.
         self.display_parsing_results()
 
@@ -608,27 +686,31 @@ class Worker(object):
 
 
         """
-        # Convert to CUDA.
+        # Move to GPU (no copies if the batch was already prefetched).
         if self.app_state.use_CUDA:
-            data_dict = data_dict.cuda()
+            with self.profiler.stage('to_device'):
+                data_dict = data_dict.to(self.app_state.device)
 
         # Perform forward calculation.
-        logits = model(data_dict)
+        with self.profiler.stage('forward'):
+            logits = model(data_dict)
 
         # Evaluate loss function.
-        loss = problem.evaluate_loss(data_dict, logits)
+        with self.profiler.stage('loss'):
+            loss = problem.evaluate_loss(data_dict, logits)
 
-        # Collect "elementary" statistics - episode and loss.
-        if ('epoch' in stat_col) and (epoch is not None):
-            stat_col['epoch'] = epoch
+        with self.profiler.stage('statistics'):
+            # Collect "elementary" statistics - episode and loss.
+            if ('epoch' in stat_col) and (epoch is not None):
+                stat_col['epoch'] = epoch
 
-        stat_col['episode'] = episode
-        # Collect loss as float.
-        stat_col['loss'] = loss
+            stat_col['episode'] = episode
+            # Collect loss as float.
+            stat_col['loss'] = loss
 
-        # Collect other (potential) statistics from problem & model.
-        problem.collect_statistics(stat_col, data_dict, logits)
-        model.collect_statistics(stat_col, data_dict, logits)
+            # Collect other (potential) statistics from problem & model.
+            problem.collect_statistics(stat_col, data_dict, logits)
+            model.collect_statistics(stat_col, data_dict, logits)
 
         # Return tuple: logits, loss.
         return logits, loss
@@ -678,6 +760,10 @@ class Worker(object):
         :type export_to_log: bool
 
         """ 
+        # In distributed mode aggregate the statistics collected by all processes.
+        if self.app_state.distributed:
+            stat_col = gather_statistics(stat_col)
+
         # Aggregate statistics.
         self.aggregate_statistics(stat_col, stat_agg)
         problem.aggregate_statistics(stat_col, stat_agg)
@@ -689,6 +775,67 @@ class Worker(object):
         # Export to logger, cvs and TB.
         self.export_statistics(stat_agg, tag, export_to_log)
 
+    def initialize_profiling(self, stages, log_dir, filename, tb_writer=None):
+        """
+        Initializes the profiling of the stages of the episodes (if the ``--profile`` flag is set):
+
+            - Creates the ``StageProfiler`` (synchronizing the CUDA device when running on GPU),
+            - Creates the ``StatisticsCollector`` for the percentiles of the times of the stages,
+            - Creates the output file (csv) and memorizes the TensorBoard writer - only in the master process.
+
+        :param stages: List of the names of the profiled stages.
+        :type stages: list
+
+        :param log_dir: Directory where the csv file will be created.
+        :type log_dir: str
+
+        :param filename: Name of the csv file.
+        :type filename: str
+
+        :param tb_writer: TensorBoard writer, optional (DEFAULT: None).
+        :type tb_writer: :py:class:`tensorboardX.SummaryWriter`
+
+        """
+        self.profiler = StageProfiler(self.flags.profile, stages, synchronize_cuda=self.app_state.use_CUDA)
+        self.profiling_stat_col = None
+        self.profiling_stats_file = None
+
+        if not self.profiler.enabled:
+            return
+
+        self.profiling_stat_col = StatisticsCollector()
+        self.profiler.add_statistics(self.profiling_stat_col)
+        if self.app_state.rank == 0:
+            self.profiling_stats_file = self.profiling_stat_col.initialize_csv_file(log_dir, filename)
+            self.profiling_stat_col.initialize_tensorboard(tb_writer)
+
+    def export_profiling_statistics(self, tag='[Profiling]'):
+        """
+        Computes the percentiles of the times of the stages of the episodes profiled since the last export \
+        and exports them to logger, csv and TB.
+
+        :param tag: Additional tag that will be added to string exported to logger, optional (DEFAULT = '[Profiling]').
+        :type tag: str
+
+        """
+        if self.profiling_stat_col is None or not self.profiler.has_episodes():
+            return
+
+        self.profiler.collect_statistics(self.profiling_stat_col)
+        self.export_statistics(self.profiling_stat_col, tag, self.app_state.rank == 0)
+        self.profiling_stat_col.empty()
+
+    def finalize_profiling(self):
+        """
+        Exports the times of the remaining profiled episodes and closes the csv file.
+
+        """
+        self.export_profiling_statistics()
+
+        if self.profiling_stats_file is not None:
+            self.profiling_stats_file.close()
+            self.profiling_stats_file = None
+
     def cycle(self, iterable):
         """
         Cycle an iterator to prevent its exhaustion.
@@ -708,6 +855,11 @@ class Worker(object):
         Set ``torch`` & ``NumPy`` random seeds from the ``ParamRegistry``: \
         If one was indicated, use it, or set a random one.
 
+        .. note::
+
+            In distributed mode, the rank of the process is added to the seeds, so that every process \
+            generates different samples and random numbers.
+
         :param params: Section in config/param registry that will be changed \
             ("training" or "testing" only will be taken into account.)
 
@@ -723,7 +875,7 @@ class Worker(object):
             params.add_config_params({"seed_numpy": seed})
 
         self.logger.info("Setting numpy random seed in {} to: {}".format(section_name, params["seed_numpy"]))
-        np.random.seed(params["seed_numpy"])
+        np.random.seed((params["seed_numpy"] + self.app_state.rank) % 2 ** 32)
 
         params.add_default_params({"seed_torch": -1})
         if params["seed_torch"] == -1:
@@ -732,5 +884,5 @@ class Worker(object):
             params.add_config_params({"seed_torch": seed})
 
         self.logger.info("Setting torch random seed in {} to: {}".format(section_name, params["seed_torch"]))
-        torch.manual_seed(params["seed_torch"])
-        torch.cuda.manual_seed_all(params["seed_torch"])
+        torch.manual_seed((params["seed_torch"] + self.app_state.rank) % 2 ** 32)
+        torch.cuda.manual_seed_all((params["seed_torch"] + self.app_state.rank) % 2 ** 32)
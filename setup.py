@@ -209,6 +209,7 @@ setup(
     # executes the function `main` from this package when invoked:
     entry_points={  # Optional
          'console_scripts': [
+             'mip-benchmark=miprometheus.helpers.benchmark:main',
              'mip-grid-trainer-cpu=miprometheus.grid_workers.grid_trainer_cpu:main',
              'mip-grid-trainer-gpu=miprometheus.grid_workers.grid_trainer_gpu:main',
              'mip-grid-tester-cpu=miprometheus.grid_workers.grid_tester_cpu:main',
@@ -217,6 +218,7 @@ setup(
              'mip-index-splitter=miprometheus.helpers.index_splitter:main',
              'mip-offline-trainer=miprometheus.workers.offline_trainer:main',
              'mip-online-trainer=miprometheus.workers.online_trainer:main',
+             'mip-pregenerate=miprometheus.helpers.pregenerator:main',
              'mip-tester=miprometheus.workers.tester:main',
          ],
      },